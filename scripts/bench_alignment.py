@@ -0,0 +1,130 @@
+from __future__ import annotations
+
+import argparse
+import resource
+import subprocess
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from src.data.alignment import align_to_grid, ensure_regular_index
+from src.data.calendar import default_calendar
+
+
+def _bars(n_symbols: int, start: str, end: str, missing: float, seed: int = 0) -> pd.DataFrame:
+    """
+    Long RTH minute bars (symbol-major, categorical symbol as loaded from the stores) with a
+    random `missing` fraction of (timestamp, symbol) cells absent.
+    """
+    rng = np.random.default_rng(seed)
+    grid = default_calendar().minute_grid(start, end, "rth")
+    t_idx = np.concatenate([np.flatnonzero(rng.random(len(grid), dtype=np.float32) >= missing) for _ in range(n_symbols)])
+    counts = np.diff(np.r_[0, np.flatnonzero(np.diff(t_idx) < 0) + 1, len(t_idx)])
+    n = len(t_idx)
+    return pd.DataFrame({
+        "timestamp_utc": pd.to_datetime(grid[t_idx], unit="ns", utc=True),
+        "symbol": pd.Categorical.from_codes(
+            np.repeat(np.arange(n_symbols, dtype=np.int16), counts), [f"S{i:03d}" for i in range(n_symbols)]
+        ),
+        "close": 100 + rng.normal(0, 1, n).cumsum() * 0.01,
+        "volume": rng.integers(0, 10_000, n).astype(np.float64),
+    })
+
+
+def _groupby_reindex(
+    df_long: pd.DataFrame,
+    freq: str = "1min",
+    on: str = "timestamp_utc",
+    symbol_col: str = "symbol",
+) -> pd.DataFrame:
+    """
+    The per-symbol loop ensure_regular_index was before align_to_grid (groupby, reindex, concat).
+    """
+    df = df_long.copy()
+    df[on] = pd.to_datetime(df[on], utc=True)
+    out = []
+    for sym, g in df.groupby(symbol_col, sort=True):
+        g = g.sort_values(on).drop_duplicates([on], keep="last")
+        if g.empty:
+            continue
+        full_idx = pd.date_range(g[on].min(), g[on].max(), freq=freq, tz="UTC")
+        g2 = g.set_index(on).reindex(full_idx)
+        g2.index.name = on
+        g2[symbol_col] = sym
+        out.append(g2.reset_index())
+    if not out:
+        return df.iloc[0:0].copy()
+    return pd.concat(out, ignore_index=True)
+
+
+def _child(case: str, args) -> None:
+    df = _bars(args.symbols, args.start, args.end, args.missing)
+    t0 = time.perf_counter()
+    if case == "loop":
+        rows = len(_groupby_reindex(df))
+    elif case == "vectorized":
+        rows = len(ensure_regular_index(df))
+    elif case == "session":
+        rows = len(ensure_regular_index(df, session="rth"))
+    else:
+        panel = align_to_grid(df, session="rth", ffill_limit=args.ffill_limit)
+        rows = panel.to_arrow(with_staleness=True).num_rows
+    dt = time.perf_counter() - t0
+    print(f"{dt:.3f} {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss} {rows}")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark: multi-symbol grid alignment, groupby/reindex loop vs align_to_grid")
+    ap.add_argument("--symbols", type=int, default=100)
+    ap.add_argument("--start", default="2024-01-02")
+    ap.add_argument("--end", default="2024-03-28")
+    ap.add_argument("--missing", type=float, default=0.05)
+    ap.add_argument("--ffill-limit", type=int, default=5)
+    ap.add_argument("--check", action="store_true", help="also assert loop == vectorized output (needs memory for both)")
+    ap.add_argument("--child", default=None, help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    if args.child:
+        _child(args.child, args)
+        return
+
+    n_grid = len(default_calendar().minute_grid(args.start, args.end, "rth"))
+    print(
+        f"[bench_alignment] symbols={args.symbols} {args.start}..{args.end} "
+        f"input={n_grid:,} RTH minutes, missing={args.missing:.0%}"
+    )
+    if args.check:
+        df = _bars(args.symbols, args.start, args.end, args.missing)
+        new = ensure_regular_index(df)
+        ref = _groupby_reindex(df)
+        ref["symbol"] = ref["symbol"].astype(new["symbol"].dtype)
+        pd.testing.assert_frame_equal(new, ref[new.columns], check_dtype=False)
+        print("  check: vectorized == loop")
+        del df, new, ref
+
+    # each case in a fresh process, so peak RSS is its own
+    cases = [
+        ("loop", "groupby/reindex loop"),
+        ("vectorized", "ensure_regular_index"),
+        ("session", "ensure_regular_index session=rth"),
+        ("panel", f"align_to_grid ffill<={args.ffill_limit} + to_arrow"),
+    ]
+    base = None
+    for case, label in cases:
+        cmd = [sys.executable, "-m", "scripts.bench_alignment", "--child", case,
+               "--symbols", str(args.symbols), "--start", args.start, "--end", args.end,
+               "--missing", str(args.missing), "--ffill-limit", str(args.ffill_limit)]
+        res = subprocess.run(cmd, capture_output=True, text=True)
+        if res.returncode != 0:
+            print(f"  {label:<34} failed (exit {res.returncode}, likely out of memory)")
+            continue
+        secs, peak_kib, rows = res.stdout.split()[-3:]
+        secs = float(secs)
+        base = base or secs
+        print(f"  {label:<34} {secs:7.2f}s  ({base / secs:4.1f}x)  peak_rss={int(peak_kib) / 1024:7.0f} MiB  rows={int(rows):,}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from scripts.bench_dataset_memory import _window, _write_stores
+from src.data.calendar import default_calendar
+from src.labeling.pipeline import LABELS_STAGE
+from src.pipelines.build_dataset_window import build_dataset_window
+from src.pipelines.dataset_loader import shard_paths
+from src.utils.fingerprint import PartitionFingerprint, write_fingerprint
+from src.utils.io import atomic_write_parquet
+
+
+def _read(path: Path) -> pd.DataFrame:
+    return pd.concat([pd.read_parquet(p) for p in shard_paths(path)], ignore_index=True)
+
+
+def _relabel(path: Path) -> None:
+    """
+    Rewrites a labels partition with tb_label 1 <-> -1 swapped: same size, dtypes and
+    min/max statistics, different values (as a relabel with new pt/sl multipliers can be).
+    The partition sidecar is left as it was.
+    """
+    y = pd.read_parquet(path)
+    y["tb_label"] = -y["tb_label"]
+    atomic_write_parquet(y, path)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark: extending a window dataset by one day vs a build from scratch")
+    ap.add_argument("--symbols", type=int, default=20)
+    ap.add_argument("--days", type=int, default=10)
+    ap.add_argument("--bars-per-day", type=int, default=960)
+    ap.add_argument("--shard-by", default="day", choices=("none", "day", "rows"))
+    args = ap.parse_args()
+
+    start, end = _window(args.days)
+    first_end = default_calendar().sessions(start, end)[-2]
+    symbols = [f"S{i:03d}" for i in range(args.symbols)]
+    print(f"[bench_dataset_extend] symbols={args.symbols} days={args.days} shard_by={args.shard_by}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        _write_stores(root, args.symbols, args.days, args.bars_per_day, typed=True)
+        labels = sorted((root / "labels_1m").rglob("labels.parquet"))
+        for p in labels:
+            fp = PartitionFingerprint(inputs={p.parent.name: "bench"}, config="bench", code="bench")
+            write_fingerprint(p.parent, LABELS_STAGE, fp, rows=1)
+
+        kw = dict(symbols=symbols, out_dir=root / "datasets", features_root=root / "features_1m",
+                  labels_root=root / "labels_1m", shard_by=args.shard_by, reuse=False)
+        build_dataset_window(start=start, end=first_end, name="base", **kw)
+
+        t0 = time.perf_counter()
+        ext, _ = build_dataset_window(start=start, end=end, name="ext", base="base", **kw)
+        t_ext = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        scratch, _ = build_dataset_window(start=start, end=end, name="scratch", **kw)
+        t_scratch = time.perf_counter() - t0
+        pd.testing.assert_frame_equal(_read(ext), _read(scratch))
+        print(f"  +1 day      extend {t_ext:6.2f}s  from scratch {t_scratch:6.2f}s  ({t_scratch / t_ext:4.1f}x)")
+
+        # changed values, same stats: the extension must re-join the partition, not copy it
+        _relabel(labels[0])
+        t0 = time.perf_counter()
+        ext, _ = build_dataset_window(start=start, end=end, name="ext2", base="ext", **kw)
+        t_ext = time.perf_counter() - t0
+        scratch, _ = build_dataset_window(start=start, end=end, name="scratch2", **kw)
+        got = _read(ext)
+        pd.testing.assert_frame_equal(got, _read(scratch))
+        day = pd.Timestamp(labels[0].parent.name.split("=", 1)[1], tz="UTC")
+        sym = labels[0].parent.parent.name.split("=", 1)[1]
+        y = pd.read_parquet(labels[0])
+        rows = got[(got["symbol"] == sym) & (got["timestamp_utc"].dt.normalize() == day)]
+        assert np.array_equal(rows["tb_label"].to_numpy(), y["tb_label"].to_numpy()), "relabelled partition was not re-joined"
+        print(f"  relabelled  extend {t_ext:6.2f}s  (1 partition re-joined)")
+
+
+if __name__ == "__main__":
+    main()
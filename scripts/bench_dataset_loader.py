@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+import argparse
+import json
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+from scripts.bench_dataset_memory import _window, _write_stores
+from src.pipelines.build_dataset_window import build_dataset_window
+from src.pipelines.dataset_loader import ShardBatchIterator, export_memmap
+
+
+def _consume(batches, consumer_ms: float) -> tuple[int, float]:
+    """
+    Pulls every batch, touching the float columns and simulating `consumer_ms` of work
+    (e.g. a training step) per batch. Returns (rows, seconds).
+    """
+    rows = 0
+    t0 = time.perf_counter()
+    for b in batches:
+        cols = b.values() if isinstance(b, dict) else [b]
+        for v in cols:
+            if v.dtype.kind == "f":
+                float(v.sum())
+        rows += len(next(iter(cols)))
+        if consumer_ms:
+            time.sleep(consumer_ms / 1000)
+    return rows, time.perf_counter() - t0
+
+
+def _monolithic(path: Path, batch_size: int):
+    df = pd.read_parquet(path)
+    arrays = {c: df[c].to_numpy() for c in df.columns}
+    for i in range(0, len(df), batch_size):
+        yield {c: v[i : i + batch_size] for c, v in arrays.items()}
+
+
+def _memmap_batches(mm_dir: Path, batch_size: int, shuffle: bool, seed: int = 0):
+    X = np.load(mm_dir / "X.npy", mmap_mode="r")
+    y = np.load(mm_dir / "y.npy", mmap_mode="r")
+    n = len(X)
+    starts = np.arange(0, n, batch_size)
+    if shuffle:
+        starts = np.random.default_rng(seed).permutation(starts)  # shuffled contiguous blocks
+    for i in starts:
+        yield {"X": np.asarray(X[i : i + batch_size]), "y": np.asarray(y[i : i + batch_size])}
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark: rows/s delivered by dataset readers (monolithic vs sharded vs memmap)")
+    ap.add_argument("--symbols", type=int, default=20)
+    ap.add_argument("--days", type=int, default=20)
+    ap.add_argument("--bars-per-day", type=int, default=960)
+    ap.add_argument("--batch-size", type=int, default=4096)
+    ap.add_argument("--consumer-ms", type=float, default=1.0, help="simulated work per batch")
+    ap.add_argument("--threads", type=int, default=4)
+    args = ap.parse_args()
+
+    start, end = _window(args.days)
+    symbols = [f"S{i:03d}" for i in range(args.symbols)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        _write_stores(root, args.symbols, args.days, args.bars_per_day, typed=True)
+        kw = dict(symbols=symbols, start=start, end=end, out_dir=root / "datasets",
+                  features_root=root / "features_1m", labels_root=root / "labels_1m")
+        mono, _ = build_dataset_window(name="mono", **kw)
+        sharded, _ = build_dataset_window(name="sharded", shard_by="day", **kw)
+        mm_dir = export_memmap(sharded)
+        n_shards = len(json.loads((sharded / "_manifest.json").read_text())["shards"])
+
+        print(
+            f"[bench_dataset_loader] symbols={args.symbols} days={args.days} shards={n_shards} "
+            f"batch={args.batch_size} consumer={args.consumer_ms}ms/batch"
+        )
+        bs = args.batch_size
+        # a single-file dataset is split across workers by row group
+        n_mono = sum(_consume(ShardBatchIterator(mono, bs, worker_id=w, num_workers=2), 0)[0] for w in range(2))
+        assert n_mono == pq.ParquetFile(mono).metadata.num_rows, "workers 0 and 1 of 2 do not cover the file"
+        cases = [
+            ("monolithic read_parquet", lambda: _monolithic(mono, bs)),
+            ("shards, no prefetch", lambda: ShardBatchIterator(sharded, bs, prefetch=0)),
+            (f"shards, prefetch x{args.threads}", lambda: ShardBatchIterator(sharded, bs, prefetch=args.threads, threads=args.threads)),
+            ("shards, shuffle buffer", lambda: ShardBatchIterator(
+                sharded, bs, shuffle=True, shuffle_buffer=8 * bs, prefetch=args.threads, threads=args.threads)),
+            ("shards, worker 0 of 2", lambda: ShardBatchIterator(
+                sharded, bs, worker_id=0, num_workers=2, prefetch=args.threads, threads=args.threads)),
+            ("file, worker 1 of 2", lambda: ShardBatchIterator(
+                mono, bs, worker_id=1, num_workers=2, prefetch=args.threads, threads=args.threads)),
+            ("memmap sequential", lambda: _memmap_batches(mm_dir, bs, shuffle=False)),
+            ("memmap shuffled blocks", lambda: _memmap_batches(mm_dir, bs, shuffle=True)),
+        ]
+        for label, make in cases:
+            rows, secs = _consume(make(), args.consumer_ms)
+            print(f"  {label:<26} rows={rows:>9,d}  {secs:6.2f}s  {rows / max(secs, 1e-9):>12,.0f} rows/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+import argparse
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from src.data.calendar import default_calendar
+from src.data.dtypes import FEATURES_DTYPE_POLICY, LABELS_DTYPE_POLICY, NO_DTYPE_POLICY
+from src.utils.io import atomic_write_parquet
+
+_FEATURE_COLS = [
+    "open", "high", "low", "close", "volume",
+    "ret_1", "logret_1", "vol_logret_30", "vol_logret_60", "vol_logret_390", "true_range", "atr_14",
+    "dollar_volume", "hl_range", "hl_range_pct",
+    "ret_lag_1", "ret_lag_5", "ret_lag_15", "ret_lag_30", "ret_lag_60",
+]
+
+
+def _window(n_days: int, start: str = "2024-01-02") -> tuple[str, str]:
+    """
+    First and last of n_days trading sessions from `start`.
+    """
+    days = default_calendar().sessions(start, (pd.Timestamp(start) + pd.Timedelta(days=2 * n_days + 14)).date().isoformat())
+    return days[0], days[n_days - 1]
+
+
+def _write_stores(root: Path, n_symbols: int, n_days: int, bars_per_day: int, typed: bool) -> None:
+    fpol = FEATURES_DTYPE_POLICY if typed else NO_DTYPE_POLICY
+    lpol = LABELS_DTYPE_POLICY if typed else NO_DTYPE_POLICY
+    rng = np.random.default_rng(0)
+    start, end = _window(n_days)
+    days = pd.DatetimeIndex(default_calendar().sessions(start, end), tz="UTC")
+    for i in range(n_symbols):
+        sym = f"S{i:03d}"
+        for d in days:
+            ts = pd.date_range(d + pd.Timedelta(hours=9), periods=bars_per_day, freq="min")
+            X = pd.DataFrame({"timestamp_utc": ts, "symbol": sym})
+            for c in _FEATURE_COLS:
+                X[c] = rng.normal(0, 1e-3, bars_per_day)
+            y = pd.DataFrame({"timestamp_utc": ts, "symbol": sym})
+            for h in (30, 60, 390):
+                y[f"fwd_ret_{h}m"] = rng.normal(0, 1e-3, bars_per_day)
+            y["tb_label"] = rng.integers(-1, 2, bars_per_day).astype(float)
+            y["tb_touched"] = y["tb_label"]
+            y["tb_ret"] = rng.normal(0, 1e-3, bars_per_day)
+            day = d.date().isoformat()
+            atomic_write_parquet(fpol.apply(X), root / "features_1m" / f"symbol={sym}" / f"date={day}" / "features.parquet")
+            atomic_write_parquet(lpol.apply(y), root / "labels_1m" / f"symbol={sym}" / f"date={day}" / "labels.parquet")
+
+
+def _child(root: Path, n_symbols: int, start: str, end: str) -> None:
+    from src.pipelines.build_dataset_window import build_dataset_window
+
+    t0 = time.perf_counter()
+    out_pq, _ = build_dataset_window(
+        symbols=[f"S{i:03d}" for i in range(n_symbols)],
+        start=start,
+        end=end,
+        out_dir=root / "datasets",
+        features_root=root / "features_1m",
+        labels_root=root / "labels_1m",
+        name="bench",
+    )
+    dt = time.perf_counter() - t0
+    peak_kib = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(f"{peak_kib} {dt:.3f} {out_pq.stat().st_size}")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Peak RSS of build_dataset_window: float64/object vs dtype policy")
+    ap.add_argument("--symbols", type=int, default=20)
+    ap.add_argument("--days", type=int, default=20)
+    ap.add_argument("--bars-per-day", type=int, default=960)
+    ap.add_argument("--child", default=None, help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    start, end = _window(args.days)
+
+    if args.child:
+        _child(Path(args.child), args.symbols, start, end)
+        return
+
+    print(f"[bench_dataset_memory] symbols={args.symbols} days={args.days} bars/day={args.bars_per_day}")
+    for label, typed in (("before (float64/object)", False), ("after (dtype policy)", True)):
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            _write_stores(root, args.symbols, args.days, args.bars_per_day, typed)
+            res = subprocess.run(
+                [sys.executable, "-m", "scripts.bench_dataset_memory", "--child", str(root),
+                 "--symbols", str(args.symbols), "--days", str(args.days)],
+                check=True, capture_output=True, text=True,
+            )
+            peak_kib, secs, size = res.stdout.split()[-3:]
+            print(f"  {label:<24} peak_rss={int(peak_kib) / 1024:8.1f} MiB  build={float(secs):6.2f}s  file={int(size) / 2**20:7.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+import argparse
+import logging
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from src.data.bars_store import BarsStore
+from src.data.calendar import default_calendar
+from src.data.info_bars import InfoBarConfig, build_info_bars, update_info_bars
+from src.utils.io import atomic_write_parquet
+
+
+def _bars(start: str, end: str, seed: int = 0) -> dict[str, pd.DataFrame]:
+    """
+    One symbol's extended-hours 1-minute bars per session (thin pre/post, U-shaped RTH volume).
+    """
+    rng = np.random.default_rng(seed)
+    cal = default_calendar()
+    out, last = {}, 100.0
+    for day in cal.sessions(start, end):
+        ts = pd.to_datetime(cal.session_grid(day, "eth"), unit="ns", utc=True)
+        c = last * np.exp(np.cumsum(rng.normal(0, 1e-3, len(ts))))
+        last = c[-1]
+        rth = pd.to_datetime(cal.session_grid(day, "rth"), unit="ns", utc=True)
+        u = np.linspace(-1, 1, len(rth))
+        vol = np.full(len(ts), 200.0)
+        vol[ts.isin(rth)] = 2000.0 * (1 + 2 * u * u)
+        out[day] = pd.DataFrame({
+            "timestamp_utc": ts, "symbol": "AAA", "open": np.r_[c[0], c[:-1]],
+            "high": c * 1.0005, "low": c * 0.9995, "close": c, "volume": rng.poisson(vol).astype(float),
+        })
+    return out
+
+
+def _loop_bars(df: pd.DataFrame, kind: str, theta: float) -> pd.DataFrame:
+    """
+    The per-row loop: accumulate, close a bar when the running total reaches the threshold
+    (overshoot carried, as in build_info_bars).
+    """
+    rows, acc, cur = [], 0.0, None
+    px = (df["high"] + df["low"] + df["close"]).to_numpy() / 3.0
+    for i, r in enumerate(df.itertuples(index=False)):
+        amt = r.volume if kind == "volume" else px[i] * r.volume
+        if cur is None:
+            cur = {"t_start": r.timestamp_utc, "open": r.open, "high": r.high, "low": r.low, "volume": 0.0, "n_bars": 0}
+        cur["high"] = max(cur["high"], r.high)
+        cur["low"] = min(cur["low"], r.low)
+        cur["volume"] += r.volume
+        cur["n_bars"] += 1
+        acc += amt
+        if acc >= theta:
+            acc -= theta * (acc // theta)
+            rows.append({"timestamp_utc": r.timestamp_utc, **cur, "close": r.close})
+            cur = None
+    return pd.DataFrame(rows)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark: volume/dollar bars, per-row loop vs cumsum/searchsorted")
+    ap.add_argument("--start", default="2024-01-02")
+    ap.add_argument("--end", default="2024-12-31")
+    ap.add_argument("--bars-per-day", type=float, default=50.0)
+    args = ap.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    days = _bars(args.start, args.end)
+    full = pd.concat(days.values(), ignore_index=True)
+    print(f"[bench_info_bars] 1 symbol, {len(days)} sessions, {len(full):,} 1-minute bars")
+
+    for kind in ("volume", "dollar"):
+        px = (full["high"] + full["low"] + full["close"]) / 3.0
+        total = full["volume"].sum() if kind == "volume" else (px * full["volume"]).sum()
+        theta = float(total / len(days) / args.bars_per_day)
+        cfg = InfoBarConfig(kind=kind, threshold=theta)
+
+        t0 = time.perf_counter()
+        ref = _loop_bars(full, kind, theta)
+        t_loop = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        got, _ = build_info_bars(full, "AAA", cfg)
+        t_vec = time.perf_counter() - t0
+        cols = ["timestamp_utc", "t_start", "open", "high", "low", "close", "volume", "n_bars"]
+        pd.testing.assert_frame_equal(got[cols].reset_index(drop=True), ref[cols], check_dtype=False)
+        print(f"  {kind:<7} {len(got):>6,} bars  loop {t_loop:6.2f}s  vectorized {t_vec:6.3f}s  ({t_loop / t_vec:5.0f}x)")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp) / "bars_1m"
+        for day, df in days.items():
+            atomic_write_parquet(df, root / "symbol=AAA" / f"date={day}" / "bars.parquet")
+        *history, new_day = list(days)
+        (root / "symbol=AAA" / f"date={new_day}").rename(Path(tmp) / "held_back")
+        cfg = InfoBarConfig(kind="dollar", bars_per_day=args.bars_per_day)
+
+        t0 = time.perf_counter()
+        update_info_bars(root, cfg)
+        t_full = time.perf_counter() - t0
+        (Path(tmp) / "held_back").rename(root / "symbol=AAA" / f"date={new_day}")
+        t0 = time.perf_counter()
+        n = update_info_bars(root, cfg)
+        t_append = time.perf_counter() - t0
+        bars = BarsStore(root_dir=root).info_store("dollar").load_bars("AAA")
+        per_day = bars.groupby(bars["timestamp_utc"].dt.date).size()
+        print(
+            f"  dollar store: build {len(history)} days {t_full:6.2f}s, append {new_day} {t_append:6.3f}s "
+            f"({n} partition written); bars/day mean {per_day.mean():.1f} (target {args.bars_per_day:g})"
+        )
+
+
+if __name__ == "__main__":
+    main()
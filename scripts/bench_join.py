@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from src.pipelines.merge_join import merge_join_frames
+
+
+def _frame(n_symbols: int, n_bars: int, drop: float, cols: list[str], seed: int) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    ts = pd.date_range("2024-01-02 14:30", periods=n_bars, freq="min", tz="UTC")
+    idx = pd.MultiIndex.from_product([ts, [f"S{i:03d}" for i in range(n_symbols)]], names=["timestamp_utc", "symbol"])
+    df = pd.DataFrame({c: rng.normal(size=len(idx)).astype("float32") for c in cols}, index=idx)
+    keep = np.sort(rng.choice(len(df), int(len(df) * (1 - drop)), replace=False))
+    return df.iloc[keep]
+
+
+def _time(fn, repeats: int) -> float:
+    best = float("inf")
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark: features/labels join, hash (X.join) vs sort-merge")
+    ap.add_argument("--symbols", type=int, default=500)
+    ap.add_argument("--bars", type=int, default=8000)
+    ap.add_argument("--repeats", type=int, default=3)
+    args = ap.parse_args()
+
+    X = _frame(args.symbols, args.bars, 0.02, [f"f{i}" for i in range(8)], seed=1)
+    y = _frame(args.symbols, args.bars, 0.10, ["l0", "l1", "l2"], seed=2)
+    print(f"[bench_join] X={len(X):,} rows  y={len(y):,} rows")
+
+    layouts = {
+        "(timestamp, symbol)": (X, y),
+        "(symbol, timestamp)": (
+            X.sort_index(level=["symbol", "timestamp_utc"]),
+            y.sort_index(level=["symbol", "timestamp_utc"]),
+        ),
+    }
+    for name, (xx, yy) in layouts.items():
+        ref = xx.join(yy, how="inner").sort_index()
+        got = merge_join_frames(xx, yy).sort_index()
+        pd.testing.assert_frame_equal(got, ref)
+        t_hash = _time(lambda: xx.join(yy, how="inner"), args.repeats)
+        t_merge = _time(lambda: merge_join_frames(xx, yy), args.repeats)
+        print(f"  {name:<20} X.join {t_hash:6.2f}s  merge_join_frames {t_merge:6.2f}s  ({t_hash / t_merge:4.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+import pyarrow.parquet as pq
+
+from scripts.bench_dataset_memory import _window, _write_stores
+from src.data.dtypes import column_chunk_bytes, estimate_load_bytes, project_columns
+from src.data.features_store import FeaturesStore
+from src.pipelines.build_dataset_window import build_dataset_window
+from src.pipelines.dataset_loader import shard_paths
+
+
+def _split(s: str | None) -> list[str] | None:
+    return [c for c in s.split(",") if c] if s else None
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark: full vs column-projected dataset builds and store loads")
+    ap.add_argument("--symbols", type=int, default=20)
+    ap.add_argument("--days", type=int, default=10)
+    ap.add_argument("--bars-per-day", type=int, default=960)
+    ap.add_argument("--feature-cols", default="vol_*,ret_1")
+    ap.add_argument("--label-cols", default="fwd_ret_30m")
+    args = ap.parse_args()
+
+    start, end = _window(args.days)
+    symbols = [f"S{i:03d}" for i in range(args.symbols)]
+    fsel, lsel = _split(args.feature_cols), _split(args.label_cols)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        _write_stores(root, args.symbols, args.days, args.bars_per_day, typed=True)
+        feats = sorted((root / "features_1m").rglob("*.parquet"))
+        labels = sorted((root / "labels_1m").rglob("*.parquet"))
+        fcols = project_columns(pq.read_schema(feats[0]).names, fsel) or pq.read_schema(feats[0]).names
+        lcols = project_columns(pq.read_schema(labels[0]).names, lsel) or pq.read_schema(labels[0]).names
+        read_cols = set(fcols) | set(lcols)
+        print(
+            f"[bench_projection] symbols={args.symbols} days={args.days} "
+            f"features={args.feature_cols!r} labels={args.label_cols!r}"
+        )
+
+        paths = feats + labels
+        for label, cols in (("full", None), ("projected", read_cols)):
+            print(
+                f"  {label:<10} column chunks {column_chunk_bytes(paths, cols) / 2**20:8.1f} MiB on disk  "
+                f"~{estimate_load_bytes(paths, cols) / 2**20:8.1f} MiB decoded"
+            )
+
+        kw = dict(symbols=symbols, start=start, end=end, out_dir=root / "datasets",
+                  features_root=root / "features_1m", labels_root=root / "labels_1m", reuse=False)
+        t0 = time.perf_counter()
+        full, _ = build_dataset_window(name="full", **kw)
+        t_full = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        narrow, _ = build_dataset_window(name="narrow", feature_cols=fsel, label_cols=lsel, **kw)
+        t_narrow = time.perf_counter() - t0
+
+        # synthetic labels have no nulls, so both builds keep the same rows
+        narrow_df = pd.read_parquet(narrow)
+        pd.testing.assert_frame_equal(narrow_df, pd.read_parquet(full, columns=list(narrow_df.columns)))
+        size = lambda p: sum(s.stat().st_size for s in shard_paths(p))
+        print(
+            f"  build_dataset_window  full {t_full:6.2f}s ({size(full) / 2**20:.1f} MiB)  "
+            f"projected {t_narrow:6.2f}s ({size(narrow) / 2**20:.1f} MiB)  ({t_full / t_narrow:4.1f}x)"
+        )
+
+        store = FeaturesStore(root / "features_1m")
+        t0 = time.perf_counter()
+        store.load_panel(symbols, start, end)
+        t_full = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        store.load_panel(symbols, start, end, feature_cols=fsel)
+        t_narrow = time.perf_counter() - t0
+        print(f"  FeaturesStore.load_panel  full {t_full:6.2f}s  projected {t_narrow:6.2f}s  ({t_full / t_narrow:4.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
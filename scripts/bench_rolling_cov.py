@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from src.features.rolling_cov import RollingCovariance
+
+
+def _returns(rows: int, n: int, nan_frac: float, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    f = rng.normal(0, 1e-3, (rows, 1))  # one common factor so correlations are non-trivial
+    x = 0.5 * f + rng.normal(0, 1e-3, (rows, n))
+    x[rng.random(x.shape) < nan_frac] = np.nan
+    return x
+
+
+def _recompute(x: np.ndarray, window: int) -> RollingCovariance:
+    # the from-scratch baseline: rebuild all pairwise sums from the last `window` rows
+    eng = RollingCovariance([str(i) for i in range(x.shape[1])], window=window)
+    eng.extend(x[-window:])
+    eng.cov()
+    return eng
+
+
+def _rate(fn, steps: int) -> float:
+    t0 = time.perf_counter()
+    for i in range(steps):
+        fn(i)
+    return steps / (time.perf_counter() - t0)
+
+
+def _check(window: int, halflife: float, nan_frac: float) -> None:
+    x = _returns(400, 12, nan_frac, seed=1)
+    df = pd.DataFrame(x)
+    for eng, ref in [
+        (RollingCovariance([str(i) for i in range(12)], window=window, min_periods=window // 2),
+         df.rolling(window, min_periods=window // 2).cov()),
+        (RollingCovariance([str(i) for i in range(12)], halflife=halflife), df.ewm(halflife=halflife).cov()),
+    ]:
+        for t, (_, c) in enumerate(eng.run(x)):
+            np.testing.assert_allclose(c, ref.loc[t].to_numpy(), rtol=1e-9, atol=1e-18)
+    print("  check: rolling and ewm cov == pandas (pairwise, with NaN)")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark: incremental rolling covariance updates vs recomputing per window")
+    ap.add_argument("--sizes", default="100,500,1000")
+    ap.add_argument("--window", type=int, default=390)
+    ap.add_argument("--halflife", type=float, default=60.0)
+    ap.add_argument("--nan-frac", type=float, default=0.01)
+    ap.add_argument("--steps", type=int, default=300)
+    args = ap.parse_args()
+
+    print(f"[bench_rolling_cov] window={args.window} halflife={args.halflife} nan={args.nan_frac:.0%} steps={args.steps}")
+    _check(60, 20.0, 0.1)
+    print(f"{'N':>6} {'recompute/s':>12} {'update/s':>10} {'+cov/s':>10} {'ewm/s':>10} {'bars/s @5-bar':>15} {'speedup':>8}")
+    for n in [int(s) for s in args.sizes.split(",") if s]:
+        x = _returns(args.window + args.steps * 5, n, args.nan_frac)
+        live = x[args.window:]
+        steps_rc = max(3, args.steps // 50)
+        r_recompute = _rate(lambda i: _recompute(x[: args.window + i + 1], args.window), steps_rc)
+
+        eng = RollingCovariance([str(i) for i in range(n)], window=args.window)
+        eng.extend(x[: args.window])
+        r_update = _rate(lambda i: eng.update(live[i]), args.steps)
+        r_cov = _rate(lambda i: (eng.update(live[args.steps + i]), eng.cov()), args.steps)
+
+        ew = RollingCovariance([str(i) for i in range(n)], halflife=args.halflife)
+        ew.extend(x[: args.window])
+        r_ewm = _rate(lambda i: ew.update(live[i]), args.steps)
+
+        blk = RollingCovariance([str(i) for i in range(n)], window=args.window)
+        blk.extend(x[: args.window])
+        r_blk = _rate(lambda i: (blk.extend(live[5 * i : 5 * i + 5]), blk.cov()), args.steps) * 5  # in bars/s
+        print(
+            f"{n:>6} {r_recompute:>12.1f} {r_update:>10.1f} {r_cov:>10.1f} {r_ewm:>10.1f} {r_blk:>15.1f} "
+            f"{r_cov / r_recompute:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+from __future__ import annotations
+
+import argparse
+import multiprocessing as mp
+import os
+import signal
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from src.data.bars_store import BarsStore
+from src.data.calendar import default_calendar
+from src.data.shared_panel import PanelDescriptor, attach_panel
+from src.utils.io import atomic_write_parquet
+
+
+def _write_bars(root: Path, n_symbols: int, start: str, end: str) -> list[str]:
+    rng = np.random.default_rng(0)
+    cal = default_calendar()
+    symbols = [f"S{i:03d}" for i in range(n_symbols)]
+    for sym in symbols:
+        for day in cal.sessions(start, end):
+            ts = pd.to_datetime(cal.session_grid(day, "eth"), unit="ns", utc=True)
+            close = 100 * np.exp(np.cumsum(rng.normal(0, 1e-3, len(ts))))
+            df = pd.DataFrame({
+                "timestamp_utc": ts, "open": close, "high": close * 1.001, "low": close * 0.999,
+                "close": close, "volume": rng.integers(100, 10_000, len(ts)).astype(float),
+            })
+            atomic_write_parquet(df, root / f"symbol={sym}" / f"date={day}" / "bars.parquet")
+    return symbols
+
+
+def _pss_kib() -> int:
+    """
+    Proportional set size of this process (shared pages split between their users).
+    """
+    try:
+        for line in Path("/proc/self/smaps_rollup").read_text().splitlines():
+            if line.startswith("Pss:"):
+                return int(line.split()[1])
+    except OSError:
+        pass
+    return 0
+
+
+def _work(close: np.ndarray, offsets: np.ndarray, codes: list[int]) -> float:
+    # stand-in for per-symbol feature work: 60-bar rolling std of log returns
+    acc = 0.0
+    for k in codes:
+        c = close[offsets[k] : offsets[k + 1]]
+        r = np.diff(np.log(c))
+        acc += float(pd.Series(r).rolling(60).std().sum())
+    return acc
+
+
+def _reload_worker(args) -> tuple[float, int]:
+    root, symbols, start, end, codes = args
+    panel = BarsStore(root_dir=Path(root)).load_panel(symbols, start, end)
+    panel = panel.sort_values(["symbol", "timestamp_utc"], kind="stable")
+    counts = panel.groupby("symbol", sort=True).size().to_numpy()
+    offsets = np.r_[0, np.cumsum(counts)]
+    out = _work(panel["close"].to_numpy(), offsets, codes)
+    return out, _pss_kib()
+
+
+def _shared_worker(args) -> tuple[float, int]:
+    desc, codes = args
+    with attach_panel(desc) as view:
+        out = _work(view.arrays()["close"], view.offsets, codes)
+        return out, _pss_kib()
+
+
+def _crash_worker(desc: PanelDescriptor) -> None:
+    view = attach_panel(desc)
+    float(view.arrays()["close"].sum())
+    os.kill(os.getpid(), signal.SIGKILL)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark: workers re-reading bars vs attaching a shared-memory panel")
+    ap.add_argument("--symbols", type=int, default=100)
+    ap.add_argument("--start", default="2024-01-02")
+    ap.add_argument("--end", default="2024-01-12")
+    ap.add_argument("--workers", type=int, default=4)
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp) / "bars_1m"
+        symbols = _write_bars(root, args.symbols, args.start, args.end)
+        chunks = [list(c) for c in np.array_split(np.arange(len(symbols)), args.workers)]
+        print(f"[bench_shared_panel] symbols={args.symbols} {args.start}..{args.end} workers={args.workers}")
+
+        ctx = mp.get_context("fork")
+        t0 = time.perf_counter()
+        with ctx.Pool(args.workers) as pool:
+            res = pool.map(_reload_worker, [(str(root), symbols, args.start, args.end, c) for c in chunks])
+        t_reload = time.perf_counter() - t0
+        ref = sum(r for r, _ in res)
+        print(f"  each worker reloads      {t_reload:6.2f}s  workers' PSS {sum(p for _, p in res) / 1024:8.1f} MiB")
+
+        t0 = time.perf_counter()
+        with BarsStore(root_dir=root).load_panel_shared(symbols, args.start, args.end) as panel:
+            t_load = time.perf_counter() - t0
+            with ctx.Pool(args.workers) as pool:
+                res = pool.map(_shared_worker, [(panel.descriptor, c) for c in chunks])
+            t_shared = time.perf_counter() - t0
+            got = sum(r for r, _ in res)
+            assert np.isclose(got, ref), (got, ref)
+            print(
+                f"  load once + attach       {t_shared:6.2f}s  workers' PSS {sum(p for _, p in res) / 1024:8.1f} MiB"
+                f"  (load {t_load:.2f}s, block {panel.nbytes / 2**20:.1f} MiB)  ({t_reload / t_shared:4.1f}x)"
+            )
+
+            # a worker dying mid-task leaves the panel intact for everyone else
+            p = ctx.Process(target=_crash_worker, args=(panel.descriptor,))
+            p.start()
+            p.join()
+            with attach_panel(panel.descriptor) as view:
+                ok = len(view) == panel.descriptor.n_rows and np.isfinite(view.arrays()["close"]).all()
+            print(f"  worker SIGKILL (exit {p.exitcode}): panel still readable={ok}")
+            shm_path = Path("/dev/shm") / panel.name
+        print(f"  after close: block unlinked={not shm_path.exists()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from src.features.technical import add_technical_features
+from src.labeling.triple_barrier import triple_barrier_labels
+
+
+def _synthetic_bars(n_symbols: int, rows: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    frames = []
+    for i in range(n_symbols):
+        ts = pd.date_range("2024-01-02 09:30", periods=rows, freq="min", tz="UTC")
+        c = 100 * np.exp(np.cumsum(rng.normal(0, 1e-3, rows)))
+        c[rng.random(rows) < 0.001] = np.nan  # a few missing prints
+        frames.append(
+            pd.DataFrame(
+                {"timestamp_utc": ts, "symbol": f"S{i:03d}", "open": c, "high": c, "low": c, "close": c, "volume": 1.0}
+            )
+        )
+    bars = pd.concat(frames, ignore_index=True)
+    return add_technical_features(bars, vol_windows=[60])
+
+
+def _bit_identical(a: pd.DataFrame, b: pd.DataFrame) -> bool:
+    if not a.index.equals(b.index) or list(a.columns) != list(b.columns):
+        return False
+    def bits(s: pd.Series) -> np.ndarray:
+        if isinstance(s.dtype, pd.DatetimeTZDtype):
+            return pd.DatetimeIndex(s).as_unit("ns").asi8
+        return s.to_numpy().view(np.int64)
+
+    return all(np.array_equal(bits(a[c]), bits(b[c])) for c in a.columns)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark: vectorized vs python triple-barrier engine")
+    ap.add_argument("--symbols", type=int, default=4)
+    ap.add_argument("--rows", type=int, default=20_000, help="bars per symbol")
+    ap.add_argument("--horizons", default="15,30,60,120,390")
+    ap.add_argument("--skip-python", action="store_true", help="only time the vectorized engine")
+    args = ap.parse_args()
+
+    bars = _synthetic_bars(args.symbols, args.rows)
+    print(f"[bench_triple_barrier] symbols={args.symbols} rows/symbol={args.rows}")
+    print(f"{'horizon':>8} {'python_s':>10} {'vector_s':>10} {'speedup':>8} {'identical':>10}")
+
+    for h in [int(x) for x in args.horizons.split(",") if x]:
+        t0 = time.perf_counter()
+        fast = triple_barrier_labels(bars, vol_col="vol_logret_60", max_horizon=h, engine="vectorized")
+        t_vec = time.perf_counter() - t0
+
+        if args.skip_python:
+            print(f"{h:>8} {'-':>10} {t_vec:>10.3f} {'-':>8} {'-':>10}")
+            continue
+
+        t0 = time.perf_counter()
+        ref = triple_barrier_labels(bars, vol_col="vol_logret_60", max_horizon=h, engine="python")
+        t_py = time.perf_counter() - t0
+
+        same = _bit_identical(ref, fast)
+        print(f"{h:>8} {t_py:>10.3f} {t_vec:>10.3f} {t_py / max(t_vec, 1e-12):>7.1f}x {str(same):>10}")
+        if not same:
+            raise AssertionError(f"vectorized output differs from python reference at horizon={h}")
+
+
+if __name__ == "__main__":
+    main()
@@ -25,6 +25,11 @@ def main():
     ap.add_argument("--labels", default="data/labels/labels.parquet")
     ap.add_argument("--out", default="data/datasets")
     ap.add_argument("--name", default=None)
+    ap.add_argument(
+        "--no-reuse",
+        action="store_true",
+        help="Rebuild even if a dataset with identical content already exists in the output dir",
+    )
     args = ap.parse_args()
 
     feat_path = Path(args.features)
@@ -56,6 +61,7 @@ def main():
         labels_path=lab_path,
         out_dir=Path(args.out),
         dataset_name=args.name,
+        reuse=not args.no_reuse,
     )
 
     logging.info("Dataset written: %s", out_parquet)
@@ -4,7 +4,8 @@ import argparse
 import logging
 from pathlib import Path
 
-from src.pipelines.build_dataset_window import build_dataset_window
+from src.pipelines.build_dataset_window import REQUIRED_LABELS, SHARD_MODES, build_dataset_window
+from src.pipelines.dataset_loader import export_memmap
 from src.utils.universe import load_symbols
 
 logging.basicConfig(level=logging.INFO)
@@ -19,6 +20,39 @@ def main():
     ap.add_argument("--labels-root", default="data/labels_1m")
     ap.add_argument("--out-dir", default="data/datasets")
     ap.add_argument("--name", default=None)
+    ap.add_argument(
+        "--shard-by",
+        choices=list(SHARD_MODES),
+        default="none",
+        help="Write the dataset as a directory of shards (per day or per --shard-rows rows) with a manifest",
+    )
+    ap.add_argument("--shard-rows", type=int, default=1_000_000, help="Rows per shard with --shard-by rows")
+    ap.add_argument("--memmap", action="store_true", help="Also export dense X/y .npy memmaps next to the dataset")
+    ap.add_argument(
+        "--no-reuse",
+        action="store_true",
+        help="Rebuild even if a dataset with identical content already exists in the output dir",
+    )
+    ap.add_argument(
+        "--base",
+        default=None,
+        help="Tag of an earlier dataset in the output dir to extend/roll (unchanged partitions are reused)",
+    )
+    ap.add_argument(
+        "--feature-cols",
+        default=None,
+        help="Comma-separated feature names/globs to keep, e.g. 'vol_*,ret_1' (default: all)",
+    )
+    ap.add_argument(
+        "--label-cols",
+        default=None,
+        help="Comma-separated label names/globs to keep, e.g. 'fwd_ret_30m' (default: all)",
+    )
+    ap.add_argument(
+        "--required-labels",
+        default=",".join(REQUIRED_LABELS),
+        help="Comma-separated labels/globs a row must have to be kept ('*' = every label; default: %(default)s)",
+    )
     args = ap.parse_args()
 
     symbols = load_symbols(Path(args.universe))
@@ -30,10 +64,19 @@ def main():
         features_root=Path(args.features_root),
         labels_root=Path(args.labels_root),
         name=args.name,
+        shard_by=args.shard_by,
+        shard_rows=args.shard_rows,
+        reuse=not args.no_reuse,
+        base=args.base,
+        feature_cols=[c for c in args.feature_cols.split(",") if c] if args.feature_cols else None,
+        label_cols=[c for c in args.label_cols.split(",") if c] if args.label_cols else None,
+        required_labels=[c for c in args.required_labels.split(",") if c],
     )
 
     print("[build_dataset_window] wrote:", out_pq)
     print("[build_dataset_window] meta:", out_js)
+    if args.memmap:
+        print("[build_dataset_window] memmap:", export_memmap(out_pq))
 
 
 if __name__ == "__main__":
@@ -5,7 +5,8 @@ import logging
 from pathlib import Path
 
 from src.data.bars_store import BarsStore
-from src.features.pipeline import FeatureConfig, build_feature_partitions
+from src.features.cross_sectional import CrossSectionalConfig
+from src.features.pipeline import FeatureConfig, build_cross_sectional_partitions, build_feature_partitions
 from src.utils.universe import load_symbols
 
 logging.basicConfig(level=logging.INFO)
@@ -18,6 +19,7 @@ def main():
     ap.add_argument("--universe", default="config/universe.yaml")
     ap.add_argument("--bars-root", default="data/bars_1m")
     ap.add_argument("--out-root", default="data/features_1m")
+    ap.add_argument("--no-cross-sectional", action="store_true", help="Skip the cross-sectional stage")
     args = ap.parse_args()
 
     symbols = load_symbols(Path(args.universe))
@@ -32,6 +34,14 @@ def main():
         cfg=cfg,
         out_root=Path(args.out_root),
     )
+    if not args.no_cross_sectional:
+        build_cross_sectional_partitions(
+            symbols=symbols,
+            start=args.start,
+            end=args.end,
+            cfg=CrossSectionalConfig(),
+            features_root=Path(args.out_root),
+        )
 
     print(f"[build_features] wrote partitions under: {args.out_root}")
 
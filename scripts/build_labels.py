@@ -5,6 +5,7 @@ import logging
 from pathlib import Path
 
 from src.data.bars_store import BarsStore
+from src.labeling.event_sampling import EVENT_SAMPLERS
 from src.labeling.pipeline import LabelConfig, build_label_partitions
 from src.utils.universe import load_symbols
 
@@ -18,11 +19,23 @@ def main():
     ap.add_argument("--universe", default="config/universe.yaml")
     ap.add_argument("--bars-root", default="data/bars_1m")
     ap.add_argument("--out-root", default="data/labels_1m")
+    ap.add_argument(
+        "--event-sampler",
+        choices=list(EVENT_SAMPLERS),
+        default="every_bar",
+        help="Label only sampled events (cusum: vol-scaled CUSUM filter; volume/dollar: activity clock)",
+    )
+    ap.add_argument(
+        "--event-threshold",
+        type=float,
+        default=1.0,
+        help="cusum: multiple of the TB vol column; volume/dollar: shares/dollars per event",
+    )
     args = ap.parse_args()
 
     symbols = load_symbols(Path(args.universe))
     store = BarsStore(root_dir=Path(args.bars_root))
-    cfg = LabelConfig()
+    cfg = LabelConfig(event_sampler=args.event_sampler, event_threshold=args.event_threshold)
 
     build_label_partitions(
         store=store,
@@ -7,16 +7,22 @@ from datetime import datetime, timezone
 import pandas as pd
 
 from src.data.bars_store import BarsStore
-from src.features.pipeline import FeatureConfig, build_feature_partitions
-from src.labeling.pipeline import LabelConfig, build_label_partitions
-from src.pipelines.build_dataset_window import build_dataset_window
+from src.data.calendar import default_calendar
+from src.features.cross_sectional import CrossSectionalConfig
+from src.features.pipeline import (
+    FeatureConfig,
+    build_cross_sectional_partitions,
+    plan_cross_sectional_partitions,
+    plan_feature_partitions,
+)
+from src.labeling.event_sampling import EVENT_SAMPLERS
+from src.labeling.pipeline import LabelConfig, plan_label_partitions
+from src.pipelines.build_dataset_window import REQUIRED_LABELS, SHARD_MODES, build_dataset_window
+from src.pipelines.dataset_loader import export_memmap
+from src.pipelines.build_partitions import build_feature_label_partitions
 from src.utils.universe import load_symbols
 
 
-def _date_str(d: pd.Timestamp) -> str:
-    return d.date().isoformat()
-
-
 def main():
     ap = argparse.ArgumentParser()
     ap.add_argument("--start", required=True, help="YYYY-MM-DD (inclusive)")
@@ -32,14 +38,65 @@ def main():
     ap.add_argument(
         "--refresh-days",
         type=int,
-        default=7,
-        help="Force rebuild last N days within requested window (default: 7)",
+        default=0,
+        help="Force rebuild last N days within requested window (default: 0; changed inputs are detected by fingerprint)",
+    )
+    ap.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="List the feature/label partitions that would be (re)built, with the reason, and exit",
+    )
+
+    ap.add_argument(
+        "--event-sampler",
+        choices=list(EVENT_SAMPLERS),
+        default="every_bar",
+        help="Label only sampled events (cusum: vol-scaled CUSUM filter; volume/dollar: activity clock)",
+    )
+    ap.add_argument(
+        "--event-threshold",
+        type=float,
+        default=1.0,
+        help="cusum: multiple of the TB vol column; volume/dollar: shares/dollars per event",
     )
 
     # Execution modes
     ap.add_argument("--no-features", action="store_true", help="Do not build features partitions")
     ap.add_argument("--no-labels", action="store_true", help="Do not build labels partitions")
     ap.add_argument("--no-dataset", action="store_true", help="Do not build dataset window artifact")
+    ap.add_argument(
+        "--shard-by",
+        choices=list(SHARD_MODES),
+        default="none",
+        help="Write the dataset as a directory of shards (per day or per --shard-rows rows) with a manifest",
+    )
+    ap.add_argument("--shard-rows", type=int, default=1_000_000, help="Rows per shard with --shard-by rows")
+    ap.add_argument("--memmap", action="store_true", help="Also export dense X/y .npy memmaps next to the dataset")
+    ap.add_argument(
+        "--no-reuse",
+        action="store_true",
+        help="Rebuild even if a dataset with identical content already exists in the output dir",
+    )
+    ap.add_argument(
+        "--base",
+        default=None,
+        help="Tag of an earlier dataset in the output dir to extend/roll (unchanged partitions are reused)",
+    )
+    ap.add_argument(
+        "--feature-cols",
+        default=None,
+        help="Comma-separated feature names/globs to keep, e.g. 'vol_*,ret_1' (default: all)",
+    )
+    ap.add_argument(
+        "--label-cols",
+        default=None,
+        help="Comma-separated label names/globs to keep, e.g. 'fwd_ret_30m' (default: all)",
+    )
+    ap.add_argument(
+        "--required-labels",
+        default=",".join(REQUIRED_LABELS),
+        help="Comma-separated labels/globs a row must have to be kept ('*' = every label; default: %(default)s)",
+    )
 
     args = ap.parse_args()
 
@@ -54,68 +111,77 @@ def main():
     features_root = Path(args.features_root)
     labels_root = Path(args.labels_root)
 
-    # Build list of days in requested window (inclusive)
-    days = pd.date_range(start=args.start, end=args.end, freq="D")
-    day_strs = [_date_str(d) for d in days]
+    # Partition days in the requested window (inclusive) that overlap a trading session
+    day_strs = list(default_calendar().partition_days(args.start, args.end))
     if not day_strs:
-        raise RuntimeError("No days generated for the given start/end range.")
+        raise RuntimeError("No trading sessions in the given start/end range.")
 
     # Force rebuild the last N days (within the requested range)
     n = max(0, int(args.refresh_days))
     n = min(n, len(day_strs))
     force_days = set(day_strs[-n:]) if n > 0 else set()
 
-    # Detect missing partitions (for reporting)
-    missing_feat = 0
-    missing_lab = 0
-    for sym in symbols:
-        for day in day_strs:
-            fp = features_root / f"symbol={sym}" / f"date={day}" / "features.parquet"
-            lp = labels_root / f"symbol={sym}" / f"date={day}" / "labels.parquet"
-            if (not fp.exists()) or (day in force_days):
-                missing_feat += 1
-            if (not lp.exists()) or (day in force_days):
-                missing_lab += 1
+    bars_store = BarsStore(root_dir=Path(args.bars_root))
+    fcfg = FeatureConfig()
+    cscfg = CrossSectionalConfig()
+    lcfg = LabelConfig(event_sampler=args.event_sampler, event_threshold=args.event_threshold)
+
+    # Partitions whose input fingerprint changed (bars incl. lookback/lookahead, config, code)
+    feat_tasks = [] if args.no_features else plan_feature_partitions(
+        bars_store, symbols, args.start, args.end, fcfg, out_root=features_root, force_days=force_days
+    )
+    cs_tasks = [] if args.no_features else plan_cross_sectional_partitions(
+        symbols, args.start, args.end, cscfg, features_root=features_root, force_days=force_days
+    )
+    # a rebuilt feature partition drops its cs_* columns, so its whole day is redone
+    cs_days = {t.day for t in cs_tasks}
+    cs_pending = sorted({t.day for t in feat_tasks} - cs_days)
+    lab_tasks = [] if args.no_labels else plan_label_partitions(
+        bars_store, symbols, args.start, args.end, lcfg, out_root=labels_root, force_days=force_days
+    )
 
     print(f"[make_dataset] symbols={len(symbols)} days={len(day_strs)}")
-    print(f"[make_dataset] features to (re)build: {missing_feat} (root={features_root})")
-    print(f"[make_dataset] labels   to (re)build: {missing_lab} (root={labels_root})")
+    print(f"[make_dataset] features to (re)build: {len(feat_tasks)} (root={features_root})")
+    print(f"[make_dataset] cross-sectional days to (re)build: {len(cs_days) + len(cs_pending)}")
+    print(f"[make_dataset] labels   to (re)build: {len(lab_tasks)} (root={labels_root})")
     if force_days:
         s = sorted(force_days)
         print(f"[make_dataset] forcing rebuild for days: {s[0]} .. {s[-1]} (count={len(s)})")
 
-    bars_store = BarsStore(root_dir=Path(args.bars_root))
+    if args.dry_run:
+        for kind, tasks in (("features", feat_tasks), ("labels", lab_tasks)):
+            for t in tasks:
+                print(f"[make_dataset] {kind:<8} symbol={t.symbol} date={t.day}: {t.reason}")
+        for day in sorted(cs_days):
+            reason = next(t.reason for t in cs_tasks if t.day == day)
+            print(f"[make_dataset] cs       date={day}: {reason}")
+        for day in cs_pending:
+            print(f"[make_dataset] cs       date={day}: features rebuilt")
+        return
+
+    # Build changed/forced feature and label partitions from one bars load per symbol
+    build_feature_label_partitions(
+        store=bars_store,
+        feature_tasks=feat_tasks,
+        label_tasks=lab_tasks,
+        fcfg=fcfg,
+        lcfg=lcfg,
+        features_root=features_root,
+        labels_root=labels_root,
+    )
 
-    # Build missing/forced feature partitions
     if not args.no_features:
-        fcfg = FeatureConfig()
-        build_feature_partitions(
-            store=bars_store,
+        build_cross_sectional_partitions(
             symbols=symbols,
             start=args.start,
             end=args.end,
-            cfg=fcfg,
-            out_root=features_root,
-            skip_existing=True,
+            cfg=cscfg,
+            features_root=features_root,
             force_days=force_days,
         )
     else:
         print("[make_dataset] skipping features build (--no-features)")
-
-    # Build missing/forced label partitions
-    if not args.no_labels:
-        lcfg = LabelConfig()
-        build_label_partitions(
-            store=bars_store,
-            symbols=symbols,
-            start=args.start,
-            end=args.end,
-            cfg=lcfg,
-            out_root=labels_root,
-            skip_existing=True,
-            force_days=force_days,
-        )
-    else:
+    if args.no_labels:
         print("[make_dataset] skipping labels build (--no-labels)")
 
     # Build dataset window artifact (bounded training file)
@@ -135,10 +201,19 @@ def main():
         features_root=features_root,
         labels_root=labels_root,
         name=tag,
+        shard_by=args.shard_by,
+        shard_rows=args.shard_rows,
+        reuse=not args.no_reuse,
+        base=args.base,
+        feature_cols=[c for c in args.feature_cols.split(",") if c] if args.feature_cols else None,
+        label_cols=[c for c in args.label_cols.split(",") if c] if args.label_cols else None,
+        required_labels=[c for c in args.required_labels.split(",") if c],
     )
 
     print("[make_dataset] dataset:", out_pq)
     print("[make_dataset] meta   :", out_meta)
+    if args.memmap:
+        print("[make_dataset] memmap :", export_memmap(out_pq))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,39 @@
+from __future__ import annotations
+
+import argparse
+import logging
+from pathlib import Path
+
+from src.pipelines.splits import SPLIT_SCHEMES, load_splits, make_splits
+
+logging.basicConfig(level=logging.INFO)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Write purged CV / walk-forward row-index splits beside a built dataset")
+    ap.add_argument("--dataset", required=True, help="data/datasets/{tag}.parquet or a sharded data/datasets/{tag}/")
+    ap.add_argument("--scheme", choices=list(SPLIT_SCHEMES), default="purged_kfold")
+    ap.add_argument("--n-splits", type=int, default=5)
+    ap.add_argument("--embargo", default="0min", help="pandas Timedelta string, e.g. 390min")
+    ap.add_argument("--t1-col", default="tb_t1", help="label end-time column used for purging")
+    ap.add_argument("--horizon", default=None, help="longest target horizon, e.g. 390min; label end = max(t1 column, t0 + horizon). Required without a t1 column")
+    ap.add_argument("--max-train-blocks", type=int, default=None, help="walk_forward: rolling instead of expanding train")
+    args = ap.parse_args()
+
+    out = make_splits(
+        Path(args.dataset),
+        scheme=args.scheme,
+        n_splits=args.n_splits,
+        embargo=args.embargo,
+        t1_col=args.t1_col,
+        horizon=args.horizon,
+        max_train_blocks=args.max_train_blocks,
+    )
+    folds, meta = load_splits(out)
+    print(f"[make_splits] wrote: {out}")
+    for k, (train, test) in enumerate(folds):
+        print(f"[make_splits] fold {k}: train={len(train)} test={len(test)}")
+
+
+if __name__ == "__main__":
+    main()
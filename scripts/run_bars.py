@@ -9,6 +9,7 @@ from pathlib import Path
 import yaml
 from src.ibkr.connect import connect_ib
 from src.collectors.historical import BarsConfig, fetch_bars_days, store_bars
+from src.data.rollups import update_rollups
 from src.ibkr.health import wait_for_ushmds_ok
 
 ROOT = Path.home() / "market_data_server"
@@ -83,6 +84,12 @@ def main() -> None:
             df = df.sort_values(["date"]).drop_duplicates(subset=["symbol", "date"], keep="last")
             written = store_bars(df, DATADIR, symbol)
             log.info("Stored %s rows for %s into %d partitions", len(df), symbol, len(written))
+
+            # Refresh 5m/15m/1h/1d rollups for the partitions that just changed
+            written_days = sorted(p.parent.name.split("date=", 1)[1] for p in written)
+            if written_days:
+                n = update_rollups(DATADIR, symbols=[symbol], start=written_days[0], end=written_days[-1])
+                log.info("Updated %d rollup partitions for %s", n, symbol)
     finally:
         ib.disconnect()
 
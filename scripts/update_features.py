@@ -6,7 +6,8 @@ from datetime import datetime, timedelta, timezone
 from pathlib import Path
 
 from src.data.bars_store import BarsStore
-from src.features.pipeline import FeatureConfig, build_feature_partitions
+from src.features.cross_sectional import CrossSectionalConfig
+from src.features.pipeline import FeatureConfig, build_cross_sectional_partitions, build_feature_partitions
 from src.utils.universe import load_symbols
 
 
@@ -16,6 +17,7 @@ def main():
     ap.add_argument("--universe", default="config/universe.yaml")
     ap.add_argument("--bars-root", default="data/bars_1m")
     ap.add_argument("--out-root", default="data/features_1m")
+    ap.add_argument("--no-cross-sectional", action="store_true", help="Skip the cross-sectional stage")
     args = ap.parse_args()
 
     end = datetime.now(timezone.utc).date()
@@ -26,6 +28,15 @@ def main():
     cfg = FeatureConfig()
 
     build_feature_partitions(store, symbols, start.isoformat(), end.isoformat(), cfg, Path(args.out_root))
+    # rewritten feature partitions lose their cs_*/beta_* columns; the stage puts them back
+    if not args.no_cross_sectional:
+        build_cross_sectional_partitions(
+            symbols=symbols,
+            start=start.isoformat(),
+            end=end.isoformat(),
+            cfg=CrossSectionalConfig(),
+            features_root=Path(args.out_root),
+        )
     print(f"[update_features] updated last {args.days} days")
 
 
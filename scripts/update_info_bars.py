@@ -0,0 +1,33 @@
+from __future__ import annotations
+
+import argparse
+import logging
+from pathlib import Path
+
+from src.data.info_bars import INFO_BAR_KINDS, InfoBarConfig, update_info_bars
+from src.utils.universe import load_symbols
+
+logging.basicConfig(level=logging.INFO)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--bars-root", default="data/bars_1m")
+    ap.add_argument("--universe", default=None, help="default: every symbol in the bars store")
+    ap.add_argument("--start", default=None, help="YYYY-MM-DD (inclusive)")
+    ap.add_argument("--end", default=None, help="YYYY-MM-DD (inclusive)")
+    ap.add_argument("--kinds", default=",".join(INFO_BAR_KINDS), help=f"subset of {list(INFO_BAR_KINDS)}")
+    ap.add_argument("--bars-per-day", type=float, default=50.0, help="adaptive threshold: trailing ADV / bars per day")
+    ap.add_argument("--adv-days", type=int, default=20)
+    ap.add_argument("--threshold", type=float, default=None, help="fixed threshold for every symbol (disables adaptive)")
+    args = ap.parse_args()
+
+    symbols = load_symbols(Path(args.universe)) if args.universe else None
+    for kind in [k for k in args.kinds.split(",") if k]:
+        cfg = InfoBarConfig(kind=kind, bars_per_day=args.bars_per_day, adv_days=args.adv_days, threshold=args.threshold)
+        n = update_info_bars(Path(args.bars_root), cfg, symbols=symbols, start=args.start, end=args.end)
+        print(f"[update_info_bars] {kind}: wrote {n} partitions")
+
+
+if __name__ == "__main__":
+    main()
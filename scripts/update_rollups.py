@@ -0,0 +1,34 @@
+from __future__ import annotations
+
+import argparse
+import logging
+from pathlib import Path
+
+from src.data.rollups import ROLLUP_FREQS, update_rollups
+from src.utils.universe import load_symbols
+
+logging.basicConfig(level=logging.INFO)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--bars-root", default="data/bars_1m")
+    ap.add_argument("--universe", default=None, help="default: every symbol in the bars store")
+    ap.add_argument("--start", default=None, help="YYYY-MM-DD (inclusive)")
+    ap.add_argument("--end", default=None, help="YYYY-MM-DD (inclusive)")
+    ap.add_argument("--freqs", default=",".join(ROLLUP_FREQS), help=f"subset of {list(ROLLUP_FREQS)}")
+    args = ap.parse_args()
+
+    symbols = load_symbols(Path(args.universe)) if args.universe else None
+    n = update_rollups(
+        bars_root=Path(args.bars_root),
+        symbols=symbols,
+        start=args.start,
+        end=args.end,
+        freqs=[f for f in args.freqs.split(",") if f],
+    )
+    print(f"[update_rollups] wrote {n} rollup partitions")
+
+
+if __name__ == "__main__":
+    main()
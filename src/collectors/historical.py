@@ -9,6 +9,7 @@ from pathlib import Path
 import pandas as pd
 from ib_insync import Stock, util
 
+from src.data.calendar import PARTITION_TZ, TradingCalendar, default_calendar
 from src.storage.parquet_writer import write_daily_partitioned
 
 logger = logging.getLogger(__name__)
@@ -95,20 +96,27 @@ def fetch_bars_days(
     currency: str,
     days: int,
     bars_cfg: BarsConfig,
+    calendar: TradingCalendar | None = None,
 ) -> pd.DataFrame:
     """
-    Fetch N days as N separate 1-day requests (more reliable than '{days} D' in one shot).
+    Fetch the last N trading sessions as N separate 1-day requests (more reliable than
+    '{days} D' in one shot), each ending at its session close (or now, for a session in
+    progress); weekends and holidays are never requested.
     Always returns a DataFrame (possibly empty).
     """
     if days <= 0:
         return pd.DataFrame()
 
-    # Request most-recent day first, then go back day-by-day.
+    cal = calendar or default_calendar()
+    session = "rth" if bars_cfg.use_rth else "eth"
     now_utc = datetime.now(timezone.utc)
+    today = pd.Timestamp(now_utc).tz_convert(cal.tz).date().isoformat()
+    sessions = [d for d in cal.previous_sessions(today, days + 1) if cal.session_bounds(d, session)[0] <= now_utc]
     dfs: list[pd.DataFrame] = []
 
-    for i in range(days):
-        end_dt = now_utc - pd.Timedelta(days=i)
+    # Request most-recent session first, then go back session-by-session.
+    for day in reversed(sessions[-days:]):
+        end_dt = min(now_utc, cal.session_bounds(day, session)[1].to_pydatetime())
         df_day = _fetch_one_day(
             ib,
             symbol=symbol,
@@ -121,7 +129,7 @@ def fetch_bars_days(
             dfs.append(df_day)
 
     if not dfs:
-        logger.warning("No data for %s across %d day(s).", symbol, days)
+        logger.warning("No data for %s across %d session(s).", symbol, days)
         return pd.DataFrame()
 
     df = pd.concat(dfs, ignore_index=True)
@@ -137,6 +145,6 @@ def store_bars(
     out_root: Path,
     symbol: str,
 ) -> list[Path]:
-    return write_daily_partitioned(df, out_root, symbol=symbol, ts_col="date", partition_tz="America/New_York")
+    return write_daily_partitioned(df, out_root, symbol=symbol, ts_col="date", partition_tz=PARTITION_TZ)
 
 
@@ -1,6 +1,275 @@
 from __future__ import annotations
 
+import logging
+from dataclasses import dataclass
+
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+
+from src.data.calendar import TradingCalendar, default_calendar
+
+logger = logging.getLogger(__name__)
+
+
+def _ts_ns(s: pd.Series) -> np.ndarray:
+    """
+    int64 UTC ns values of a timestamp column.
+    """
+    return pd.to_datetime(s, utc=True).dt.as_unit("ns").array.asi8
+
+
+def session_grid_between(
+    lo_ns: int,
+    hi_ns: int,
+    calendar: TradingCalendar | None = None,
+    session: str = "eth",
+    freq: str = "1min",
+) -> np.ndarray:
+    """
+    The calendar's session timestamps (int64 UTC ns) within [lo_ns, hi_ns].
+    """
+    cal = calendar or default_calendar()
+    # session dates are exchange-local; pad by a day and trim to [lo, hi]
+    lo = pd.Timestamp(lo_ns, tz="UTC").tz_convert(cal.tz) - pd.Timedelta(days=1)
+    hi = pd.Timestamp(hi_ns, tz="UTC").tz_convert(cal.tz) + pd.Timedelta(days=1)
+    grid = cal.minute_grid(lo.date().isoformat(), hi.date().isoformat(), session, freq)
+    return grid[(grid >= lo_ns) & (grid <= hi_ns)]
+
+
+@dataclass(frozen=True)
+class AlignedPanel:
+    """
+    Symbols scattered onto one timestamp grid; every column is a (len(grid), len(symbols))
+    array, time-major like the cross-sectional matrices.
+
+      grid       int64 UTC ns timestamps, sorted
+      symbols    symbol of each array column
+      values     column -> (T, S) array; float64 (float32 kept) for numeric columns and
+                 object otherwise, NaN / None where no bar is available
+      observed   (T, S) bool, True where the symbol had a bar at that timestamp
+      on_grid    (T,) bool, False for off-grid timestamps that were kept because a bar
+                 sits there
+    """
+    grid: np.ndarray
+    symbols: np.ndarray
+    values: dict[str, np.ndarray]
+    observed: np.ndarray
+    on_grid: np.ndarray
+
+    @property
+    def timestamps(self) -> pd.DatetimeIndex:
+        return pd.DatetimeIndex(pd.to_datetime(self.grid, unit="ns", utc=True), name="timestamp_utc")
+
+    def frame(self, column: str) -> pd.DataFrame:
+        """
+        One column as a wide timestamp x symbol frame.
+        """
+        return pd.DataFrame(self.values[column], index=self.timestamps, columns=pd.Index(self.symbols, name="symbol"))
+
+    @property
+    def staleness(self) -> np.ndarray:
+        """
+        (T, S) int32 grid steps since the symbol's last bar (0 when observed, -1 before its
+        first bar); forward-filled cells are those with 0 < staleness <= ffill_limit.
+        """
+        return _staleness(_last_observed(self.observed))
+
+    def span_mask(self) -> np.ndarray:
+        """
+        (T, S) rows of the long form: on-grid timestamps between each symbol's first and
+        last bar, plus its off-grid bars.
+        """
+        T = len(self.grid)
+        seen = self.observed.any(axis=0)
+        first = np.where(seen, self.observed.argmax(axis=0), T)
+        last = np.where(seen, T - 1 - self.observed[::-1].argmax(axis=0), -1)
+        t = np.arange(T)[:, None]
+        return (t >= first) & (t <= last) & (self.on_grid[:, None] | self.observed)
+
+    def _long_rows(self, mask: np.ndarray | None) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Symbol-major (one symbol's rows in time order, then the next symbol): the (S, T)
+        row mask and each row's time and symbol position.
+        """
+        mask_t = np.ascontiguousarray((self.span_mask() if mask is None else mask).T)
+        t_idx = np.nonzero(mask_t)[1].astype(np.int32)
+        s_idx = np.repeat(np.arange(len(self.symbols), dtype=np.int32), mask_t.sum(axis=1))
+        return mask_t, t_idx, s_idx
+
+    def _long_values(self, column: str, mask_t: np.ndarray) -> np.ndarray:
+        # transposed copy first, so the masked read is sequential
+        return np.ascontiguousarray(self.values[column].T)[mask_t]
+
+    def to_arrow(
+        self,
+        mask: np.ndarray | None = None,
+        on: str = "timestamp_utc",
+        symbol_col: str = "symbol",
+        with_staleness: bool = False,
+    ) -> pa.Table:
+        """
+        Long Arrow table of the `mask` rows (default span_mask), symbol-major, with a
+        dictionary-encoded symbol column and optionally the staleness of every row.
+        """
+        mask_t, t_idx, s_idx = self._long_rows(mask)
+        cols = {
+            on: pa.array(self.grid[t_idx], type=pa.int64()).cast(pa.timestamp("ns", tz="UTC")),
+            symbol_col: pa.DictionaryArray.from_arrays(
+                pa.array(s_idx.astype(np.int32)), pa.array(self.symbols.astype(str))
+            ),
+        }
+        for c in self.values:
+            cols[c] = pa.array(self._long_values(c, mask_t), from_pandas=True)
+        if with_staleness:
+            cols["staleness"] = pa.array(np.ascontiguousarray(self.staleness.T)[mask_t])
+        return pa.table(cols)
+
+    def to_long(
+        self,
+        mask: np.ndarray | None = None,
+        on: str = "timestamp_utc",
+        symbol_col: str = "symbol",
+        column_order: list[str] | None = None,
+    ) -> pd.DataFrame:
+        """
+        Long DataFrame of the `mask` rows (default span_mask), symbol-major, with a
+        categorical symbol column.
+        """
+        mask_t, t_idx, s_idx = self._long_rows(mask)
+        cols = {
+            on: pd.to_datetime(self.grid[t_idx], unit="ns", utc=True),
+            symbol_col: pd.Categorical.from_codes(s_idx, self.symbols),
+            **{c: self._long_values(c, mask_t) for c in self.values},
+        }
+        order = column_order or list(cols)
+        return pd.DataFrame({c: cols[c] for c in order}, copy=False)
+
+
+def _scatter_rows(pos: np.ndarray, codes: np.ndarray, T: int, S: int) -> np.ndarray:
+    """
+    (T, S) source row per cell (-1 where empty). Duplicate cells keep their last row.
+    """
+    n = len(pos)
+    dt = np.int32 if n < 2**31 else np.int64
+    src = np.full((T, S), -1, dtype=dt)
+    rows = np.arange(n, dtype=dt)
+    cell = pos.astype(np.int64) * S + codes
+    src.ravel()[cell] = rows
+    if np.count_nonzero(src >= 0) < n:
+        # duplicate (timestamp, symbol) cells: make "last row wins" explicit
+        order = np.argsort(cell, kind="stable")
+        cs = cell[order]
+        keep = order[np.r_[cs[1:] != cs[:-1], True]]
+        logger.debug("Alignment: %d duplicate (timestamp, symbol) rows, keeping the last", n - len(keep))
+        src.ravel()[cell[keep]] = rows[keep]
+    return src
+
+
+def _last_observed(observed: np.ndarray) -> np.ndarray:
+    """
+    (T, S) int32 position of each symbol's latest bar at or before every grid step (-1: none).
+    """
+    last = np.where(observed, np.arange(len(observed), dtype=np.int32)[:, None], np.int32(-1))
+    np.maximum.accumulate(last, axis=0, out=last)
+    return last
+
+
+def _staleness(last: np.ndarray) -> np.ndarray:
+    t = np.arange(len(last), dtype=np.int32)[:, None]
+    return np.where(last >= 0, t - last, np.int32(-1))
+
+
+def _gather(col: np.ndarray, src: np.ndarray) -> np.ndarray:
+    """
+    col[src] with NaN (None for non-numeric columns) where src < 0.
+    """
+    missing = src < 0
+    if col.dtype.kind in "fiub":
+        out_dtype = col.dtype if col.dtype.kind == "f" else np.float64
+        out = col.astype(out_dtype, copy=False)[np.where(missing, 0, src)] if len(col) else np.full(src.shape, np.nan, out_dtype)
+        out[missing] = np.nan
+        return out
+    out = np.asarray(col, dtype=object)[np.where(missing, 0, src)] if len(col) else np.full(src.shape, None, object)
+    out[missing] = None
+    return out
+
+
+def align_to_grid(
+    df_long: pd.DataFrame,
+    columns: list[str] | None = None,
+    grid: np.ndarray | None = None,
+    freq: str = "1min",
+    on: str = "timestamp_utc",
+    symbol_col: str = "symbol",
+    calendar: TradingCalendar | None = None,
+    session: str | None = None,
+    ffill_limit: int = 0,
+) -> AlignedPanel:
+    """
+    Aligns a long [timestamp_utc, symbol, ...] frame onto one timestamp grid in a single
+    vectorized pass: timestamps map to grid positions (searchsorted), symbols to codes, and
+    every row is scattered into a preallocated (T, S) array of source rows from which each
+    column is gathered.
+
+      grid         int64 UTC ns timestamps; default: every `freq` step from the data's first
+                   to its last timestamp (wall clock, nights and weekends included), or with
+                   `session` ("rth" / "eth") the calendar's session grid over that span. Any
+                   off-grid bar timestamps are added (flagged in on_grid). With an explicit
+                   grid, off-grid bars are dropped (logged).
+      ffill_limit  carry a symbol's last bar forward over at most this many grid steps (0:
+                   no filling); the panel's staleness tells filled cells from observed ones
+    """
+    if columns is None:
+        columns = [c for c in df_long.columns if c not in (on, symbol_col)]
+    ts = _ts_ns(df_long[on])
+    codes, symbols = pd.factorize(df_long[symbol_col], sort=True)
+    symbols = np.asarray(symbols, dtype=object)
+
+    if grid is None:
+        if not len(ts):
+            grid = np.zeros(0, np.int64)
+        elif session is None:
+            step = pd.Timedelta(freq).value
+            grid = np.arange(ts.min(), ts.max() + 1, step, dtype=np.int64)
+        else:
+            grid = session_grid_between(ts.min(), ts.max(), calendar, session, freq)
+        pos = np.searchsorted(grid, ts)
+        off = grid[np.minimum(pos, len(grid) - 1)] != ts if len(grid) else np.ones(len(ts), dtype=bool)
+        if off.any():
+            extra = np.unique(ts[off])
+            full = np.union1d(grid, extra)
+            on_grid = np.ones(len(full), dtype=bool)
+            on_grid[np.searchsorted(full, extra)] = False
+            grid = full
+            pos = np.searchsorted(grid, ts)
+        else:
+            on_grid = np.ones(len(grid), dtype=bool)
+    else:
+        grid = np.asarray(grid, dtype=np.int64)
+        on_grid = np.ones(len(grid), dtype=bool)
+        pos = np.searchsorted(grid, ts)
+
+    T, S = len(grid), len(symbols)
+    hit = (codes >= 0) & (pos < T)
+    hit[hit] = grid[pos[hit]] == ts[hit]
+    if hit.all():
+        src = _scatter_rows(pos, codes, T, S)
+    else:
+        logger.info("Alignment: dropping %d rows off the grid (or without symbol)", int((~hit).sum()))
+        rows = np.flatnonzero(hit)
+        src = _scatter_rows(pos[rows], codes[rows], T, S)
+        src = np.where(src >= 0, rows[np.maximum(src, 0)], -1).astype(src.dtype, copy=False)
+    observed = src >= 0
+
+    if ffill_limit > 0:
+        last = _last_observed(observed)
+        fill = (last >= 0) & (_staleness(last) <= ffill_limit)
+        src = np.where(fill, np.take_along_axis(src, np.maximum(last, 0), axis=0), -1).astype(src.dtype, copy=False)
+        del last, fill
+
+    values = {c: _gather(df_long[c].to_numpy(), src) for c in columns}
+    return AlignedPanel(grid=grid, symbols=symbols, values=values, observed=observed, on_grid=on_grid)
 
 
 def ensure_regular_index(
@@ -8,34 +277,172 @@ def ensure_regular_index(
     freq: str = "1min",
     on: str = "timestamp_utc",
     symbol_col: str = "symbol",
+    calendar: TradingCalendar | None = None,
+    session: str | None = None,
 ) -> pd.DataFrame:
     """
     Ensures a regular timestamp grid *per symbol* without forward filling.
     Missing rows are inserted with NaNs.
 
+    The grid runs every `freq` between the symbol's first and last bar, around the clock
+    (as pd.date_range(first, last, freq) per symbol). With `session` ("rth" or "eth") it is
+    the calendar's session grid instead (cached per session), so nights, weekends and
+    holidays are not filled in; bars off that grid (e.g. ETH bars with session="rth") are
+    kept as they are. All symbols are aligned in one pass (align_to_grid).
+
     Input long: [timestamp_utc, symbol, ...]
     Output long with complete grids per symbol.
     """
-    df = df_long.copy()
-    df[on] = pd.to_datetime(df[on], utc=True)
-    out = []
-    for sym, g in df.groupby(symbol_col, sort=True):
-        g = g.sort_values(on).drop_duplicates([on], keep="last")
-        if g.empty:
-            continue
-        full_idx = pd.date_range(g[on].min(), g[on].max(), freq=freq, tz="UTC")
-        g2 = g.set_index(on).reindex(full_idx)
-        g2.index.name = on
-        g2[symbol_col] = sym
-        out.append(g2.reset_index())
-    if not out:
-        return df.iloc[0:0].copy()
-    return pd.concat(out, ignore_index=True)
+    if df_long.empty:
+        return df_long.iloc[0:0].copy()
+    panel = align_to_grid(df_long, freq=freq, on=on, symbol_col=symbol_col, calendar=calendar, session=session)
+    order = [on, *[c for c in df_long.columns if c != on]]
+    return panel.to_long(on=on, symbol_col=symbol_col, column_order=order)
 
 
 def common_timestamp_index(df_long: pd.DataFrame, on: str = "timestamp_utc") -> pd.DatetimeIndex:
     """
     Union of all timestamps.
     """
-    ts = pd.to_datetime(df_long[on], utc=True)
-    return pd.DatetimeIndex(sorted(ts.unique()))
+    return pd.DatetimeIndex(pd.to_datetime(np.unique(_ts_ns(df_long[on])), unit="ns", utc=True))
+
+
+ASOF_DIRECTIONS = ("backward", "forward", "nearest")
+
+
+@dataclass(frozen=True)
+class AsofSource:
+    """
+    One right-hand source of asof_join.
+
+      frame        long frame with a time column and (unless symbol_col is None) a symbol
+                   column; need not be sorted
+      columns      columns to bring over (default: all but the keys)
+      on           time column of frame. Join on when a value becomes *available*: e.g.
+                   rollups are labelled by bucket start, so pass delay=freq
+      symbol_col   symbol column of frame; None for market-wide sources (index levels,
+                   calendar events) that match every left symbol
+      direction    "backward" (last row at or before), "forward" (first row at or after) or
+                   "nearest" (ties go backward)
+      tolerance    max distance between left and matched right time (Timedelta string)
+      allow_exact_matches  False: strictly before / after
+      delay        added to the right times before matching
+      suffix       appended to the joined column names
+      stamp        if set, name of an extra column with the matched right time (incl. delay)
+    """
+    frame: pd.DataFrame
+    columns: tuple[str, ...] | None = None
+    on: str = "timestamp_utc"
+    symbol_col: str | None = "symbol"
+    direction: str = "backward"
+    tolerance: str | pd.Timedelta | None = None
+    allow_exact_matches: bool = True
+    delay: str | pd.Timedelta | None = None
+    suffix: str = ""
+    stamp: str | None = None
+
+    def out_columns(self) -> list[str]:
+        cols = self.columns
+        if cols is None:
+            cols = [c for c in self.frame.columns if c not in (self.on, self.symbol_col)]
+        return [f"{c}{self.suffix}" for c in cols] + ([self.stamp] if self.stamp else [])
+
+
+def _asof_positions(
+    rt: np.ndarray,
+    lt: np.ndarray,
+    direction: str,
+    tol: int | None,
+    exact: bool,
+) -> np.ndarray:
+    """
+    Positions in sorted right times `rt` matched by each left time (-1: no match).
+    """
+    n = len(rt)
+    if n == 0:
+        return np.full(len(lt), -1, dtype=np.int64)
+    back = np.searchsorted(rt, lt, side="right" if exact else "left") - 1
+    fwd = np.searchsorted(rt, lt, side="left" if exact else "right")
+    if direction == "backward":
+        pos = back
+    elif direction == "forward":
+        pos = np.where(fwd < n, fwd, -1)
+    else:
+        db = np.where(back >= 0, lt - rt[np.maximum(back, 0)], np.iinfo(np.int64).max)
+        df = np.where(fwd < n, rt[np.minimum(fwd, n - 1)] - lt, np.iinfo(np.int64).max)
+        pos = np.where(df < db, fwd, back)
+        pos = np.where((db == np.iinfo(np.int64).max) & (df == np.iinfo(np.int64).max), -1, pos)
+    if tol is not None:
+        ok = pos >= 0
+        ok[ok] = np.abs(lt[ok] - rt[pos[ok]]) <= tol
+        pos = np.where(ok, pos, -1)
+    return pos
+
+
+def _group_bounds(codes_sorted: np.ndarray, n_groups: int) -> np.ndarray:
+    return np.searchsorted(codes_sorted, np.arange(n_groups + 1))
+
+
+def asof_join(
+    left: pd.DataFrame,
+    sources: list[AsofSource],
+    on: str = "timestamp_utc",
+    symbol_col: str = "symbol",
+) -> pd.DataFrame:
+    """
+    As-of joins several sources onto `left` (e.g. 1-minute bars) by symbol, in one pass.
+
+    Left is grouped by symbol once (a stable argsort of its symbol codes, shared by all
+    sources) and never sorted or copied per source. Each source is sorted by (symbol, time)
+    and matched per symbol with np.searchsorted on its sorted time array (direction,
+    tolerance, exact matches as in pd.merge_asof). The result is left with the joined
+    columns appended, rows in left order.
+    """
+    new_names = [c for s in sources for c in s.out_columns()]
+    clash = set(new_names) & set(left.columns) or {c for c in new_names if new_names.count(c) > 1}
+    if clash:
+        raise ValueError(f"asof_join: columns overlap, set a suffix: {sorted(clash)}")
+
+    lt = _ts_ns(left[on])
+    lcodes, lsyms = pd.factorize(left[symbol_col], sort=True)
+    lsyms = pd.Index(lsyms)
+    lorder = np.argsort(lcodes, kind="stable")
+    lbounds = _group_bounds(lcodes[lorder], len(lsyms))
+
+    out: dict[str, object] = {}
+    for src in sources:
+        if src.direction not in ASOF_DIRECTIONS:
+            raise ValueError(f"direction must be one of {ASOF_DIRECTIONS}, got {src.direction!r}")
+        right = src.frame
+        rt = _ts_ns(right[src.on])
+        if src.delay is not None:
+            rt = rt + pd.Timedelta(src.delay).value
+        tol = None if src.tolerance is None else pd.Timedelta(src.tolerance).value
+
+        match = np.full(len(left), -1, dtype=np.int64)
+        if src.symbol_col is None:
+            rorder = np.argsort(rt, kind="stable")
+            pos = _asof_positions(rt[rorder], lt, src.direction, tol, src.allow_exact_matches)
+            match = np.where(pos >= 0, rorder[np.maximum(pos, 0)], -1)
+        else:
+            # right symbols as left codes (-1: symbol not in left)
+            rcodes = lsyms.get_indexer(right[src.symbol_col])
+            rorder = np.lexsort((rt, rcodes))
+            rbounds = _group_bounds(rcodes[rorder], len(lsyms))
+            rt_sorted = rt[rorder]
+            for k in range(len(lsyms)):
+                ra, rb = rbounds[k], rbounds[k + 1]
+                if ra == rb:
+                    continue
+                rows = lorder[lbounds[k] : lbounds[k + 1]]
+                pos = _asof_positions(rt_sorted[ra:rb], lt[rows], src.direction, tol, src.allow_exact_matches)
+                match[rows] = np.where(pos >= 0, rorder[ra + np.maximum(pos, 0)], -1)
+
+        cols = src.columns or [c for c in right.columns if c not in (src.on, src.symbol_col)]
+        for c in cols:
+            out[f"{c}{src.suffix}"] = right[c].array.take(match, allow_fill=True)
+        if src.stamp:
+            out[src.stamp] = pd.to_datetime(rt[np.maximum(match, 0)], unit="ns", utc=True).where(match >= 0)
+
+    joined = pd.DataFrame(out, index=left.index, copy=False)
+    return pd.concat([left, joined], axis=1)
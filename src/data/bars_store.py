@@ -8,10 +8,18 @@ from typing import Iterable, Optional
 
 import pandas as pd
 
+from src.data import info_bars
+from src.data.rollups import ROLLUP_FREQS, freq_delta, merge_buckets, rollup_bars, store_dir_for
+from src.data.shared_panel import SharedPanel, share_panel
+
 logger = logging.getLogger(__name__)
 
 _TS_CANDIDATES = ["timestamp_utc", "timestamp", "ts", "datetime", "date_time", "time", "date"]
 
+# Extra columns carried by rollup stores (see src/data/rollups.py) and information-driven
+# bar stores (see src/data/info_bars.py)
+_OPTIONAL_COLS = ["vwap", "n_bars", "dollar_volume", "t_start", "threshold", "imbalance"]
+
 
 
 @dataclass(frozen=True)
@@ -57,7 +65,8 @@ class BarsStore:
         end: Optional[date],
     ) -> Iterable[Path]:
         """
-        Yields bars.parquet paths for symbol within [start, end] date bounds (UTC date partitions).
+        Yields bars.parquet paths for symbol within [start, end] date bounds (date= partitions,
+        session dates in the calendar's partition_tz).
         """
         sdir = self._symbol_dir(symbol)
         if not sdir.exists():
@@ -168,7 +177,7 @@ class BarsStore:
         if missing:
             raise ValueError(f"Missing required columns {missing}. Columns={list(df.columns)}")
 
-        df = df[keep]
+        df = df[keep + [c for c in _OPTIONAL_COLS if c in df.columns]]
 
         # Dedupe/sort
         df = df.sort_values(["symbol", "timestamp_utc"])
@@ -181,28 +190,65 @@ class BarsStore:
 
         return df
 
-    def load_bars(
+    def partition_paths(
         self,
         symbol: str,
         start: Optional[str | datetime] = None,
         end: Optional[str | datetime] = None,
-    ) -> pd.DataFrame:
+    ) -> list[Path]:
         """
-        Load a single symbol into long format:
-          timestamp_utc, symbol, open, high, low, close, volume
-        start/end can be ISO strings or datetimes (interpreted in UTC).
+        The bars.parquet files `load_bars(symbol, start, end)` reads (used for input fingerprints).
         """
         start_dt = pd.to_datetime(start, utc=True) if start is not None else None
         end_dt = pd.to_datetime(end, utc=True) if end is not None else None
-
-        # Partition day bounds (UTC)
         start_d = start_dt.date() if start_dt is not None else None
         end_d = end_dt.date() if end_dt is not None else None
+        return list(self._iter_partitions(symbol, start_d, end_d))
 
-        parts = list(self._iter_partitions(symbol, start_d, end_d))
-        if not parts:
-            return pd.DataFrame(columns=["timestamp_utc", "symbol", "open", "high", "low", "close", "volume"])
+    def read_partition(self, path: Path, symbol: str) -> pd.DataFrame:
+        """
+        One partition file, normalized (no date/time filtering).
+        """
+        return self._normalize_schema(pd.read_parquet(path), symbol=symbol)
+
+    def rollup_store(self, freq: str) -> "BarsStore":
+        """
+        The materialized rollup store for `freq` (data/bars_1m -> data/bars_5m, ...).
+        """
+        return BarsStore(root_dir=store_dir_for(self.root_dir, freq), bar_freq=freq)
+
+    def info_store(self, kind: str) -> "BarsStore":
+        """
+        The information-driven bar store for `kind` (data/bars_1m -> data/bars_vol, ...).
+        Its bars are irregular in time, so `freq` does not apply when loading from it.
+        """
+        return BarsStore(root_dir=info_bars.store_dir_for(self.root_dir, kind), bar_freq=kind)
+
+    def _sources_for(self, freq: str) -> list["BarsStore"]:
+        """
+        Existing stores whose bar size evenly divides `freq`, coarsest first, ending with
+        this store.
+        """
+        want = freq_delta(freq)
+        if want % freq_delta(self.bar_freq) != pd.Timedelta(0):
+            raise ValueError(f"freq={freq} is not a multiple of this store's bar_freq={self.bar_freq}")
+        out = [self]
+        for f in ROLLUP_FREQS:
+            d = freq_delta(f)
+            if d <= freq_delta(self.bar_freq) or d > want or want % d != pd.Timedelta(0):
+                continue
+            cand = self.rollup_store(f)
+            if cand.root_dir.exists():
+                out.append(cand)
+        return sorted(out, key=lambda st: freq_delta(st.bar_freq), reverse=True)
 
+    def _read_parts(
+        self,
+        symbol: str,
+        parts: list[Path],
+        start_dt: Optional[pd.Timestamp],
+        end_dt: Optional[pd.Timestamp],
+    ) -> pd.DataFrame:
         frames: list[pd.DataFrame] = []
         for p in parts:
             try:
@@ -222,6 +268,57 @@ class BarsStore:
             out = out[out["timestamp_utc"] >= start_dt]
         if end_dt is not None:
             out = out[out["timestamp_utc"] <= end_dt]
+        return out
+
+    def load_bars(
+        self,
+        symbol: str,
+        start: Optional[str | datetime] = None,
+        end: Optional[str | datetime] = None,
+        freq: Optional[str] = None,
+    ) -> pd.DataFrame:
+        """
+        Load a single symbol into long format:
+          timestamp_utc, symbol, open, high, low, close, volume
+        start/end can be ISO strings or datetimes (interpreted in UTC).
+
+        freq (e.g. "5min", "30min", "1h", "1D") reads each date partition from the coarsest
+        materialized rollup store that divides it and has that partition, falling back to
+        finer stores (down to this one) for dates a rollup store does not have yet, and
+        aggregates the rest on the fly; rollup stores also carry vwap and n_bars. A bucket
+        split across two date partitions (e.g. a daily bucket of a UTC-dated store) is
+        combined from its pieces (merge_buckets). Coarse bars are selected by bucket start,
+        so the last bucket may extend past `end`.
+        """
+        start_dt = pd.to_datetime(start, utc=True) if start is not None else None
+        end_dt = pd.to_datetime(end, utc=True) if end is not None else None
+
+        if freq is not None and freq_delta(freq) != freq_delta(self.bar_freq):
+            sources = [(st, st.partition_paths(symbol, start_dt, end_dt)) for st in self._sources_for(freq)]
+            todo = {p.parent.name for _, paths in sources for p in paths}
+            frames = []
+            for st, paths in sources:
+                use = [p for p in paths if p.parent.name in todo]
+                todo.difference_update(p.parent.name for p in use)
+                for p in use:
+                    part = st._read_parts(symbol, [p], start_dt, end_dt)
+                    if part.empty:
+                        continue
+                    if freq_delta(st.bar_freq) != freq_delta(freq):
+                        part = rollup_bars(part, freq)
+                    frames.append((p.parent.name, part))
+            if not frames:
+                return pd.DataFrame(columns=["timestamp_utc", "symbol", "open", "high", "low", "close", "volume"])
+            # pieces of a bucket spanning two partitions are combined, in partition order
+            frames.sort(key=lambda f: f[0])
+            out = merge_buckets(pd.concat([f for _, f in frames], ignore_index=True))
+        else:
+            parts = self.partition_paths(symbol, start_dt, end_dt)
+            if not parts:
+                return pd.DataFrame(columns=["timestamp_utc", "symbol", "open", "high", "low", "close", "volume"])
+            out = self._read_parts(symbol, parts, start_dt, end_dt)
+            if out.empty:
+                return out
 
         out = out.sort_values(["symbol", "timestamp_utc"]).drop_duplicates(["symbol", "timestamp_utc"], keep="last")
         return out.reset_index(drop=True)
@@ -231,6 +328,7 @@ class BarsStore:
         symbols: list[str],
         start: Optional[str | datetime] = None,
         end: Optional[str | datetime] = None,
+        freq: Optional[str] = None,
     ) -> pd.DataFrame:
         """
         Load multi-symbol long panel:
@@ -238,9 +336,23 @@ class BarsStore:
         """
         frames = []
         for s in symbols:
-            frames.append(self.load_bars(s, start=start, end=end))
+            frames.append(self.load_bars(s, start=start, end=end, freq=freq))
         if not frames:
             return pd.DataFrame(columns=["timestamp_utc", "symbol", "open", "high", "low", "close", "volume"])
         out = pd.concat(frames, ignore_index=True)
         out = out.sort_values(["timestamp_utc", "symbol"]).drop_duplicates(["timestamp_utc", "symbol"], keep="last")
         return out.reset_index(drop=True)
+
+    def load_panel_shared(
+        self,
+        symbols: list[str],
+        start: Optional[str | datetime] = None,
+        end: Optional[str | datetime] = None,
+        freq: Optional[str] = None,
+    ) -> SharedPanel:
+        """
+        load_panel, normalized once here and copied into shared memory. Hand the returned
+        panel's `descriptor` to worker processes, which attach_panel() it zero-copy instead of
+        re-reading the parquet partitions. Use as a context manager (or close()) to free it.
+        """
+        return share_panel(self.load_panel(symbols, start=start, end=end, freq=freq))
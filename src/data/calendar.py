@@ -1,19 +1,53 @@
 from __future__ import annotations
 
+import logging
 from dataclasses import dataclass
 from datetime import datetime, date, timezone
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import yaml
+
+logger = logging.getLogger(__name__)
+
+SESSIONS = ("rth", "eth")
+# date= partitions of the bars stores are session dates (collectors.historical.store_bars)
+PARTITION_TZ = "America/New_York"
+DEFAULT_CALENDAR_PATH = Path(__file__).resolve().parents[2] / "config" / "market_calendar.yaml"
+
+_warned_years: set[int] = set()
+
+
+def _iso(d) -> str:
+    return pd.Timestamp(str(d)).date().isoformat()
 
 
 @dataclass(frozen=True)
 class TradingCalendar:
     """
-    Minimal calendar helper.
+    Exchange calendar (US equities by default) driven by a local holiday file.
 
-    Current design decision:
-    - Your parquet partitions are by UTC date.
-    - We do not enforce RTH here (your collector may use use_rth=False).
+      tz               exchange time zone; session times below are local to it, so the
+                       UTC grids follow DST
+      rth / eth        regular / extended session (open, close) as "HH:MM"
+      early_close(_eth) RTH / ETH close on half days (early_closes)
+      holidays         ISO dates without a session
+      partition_tz     time zone of the date= partitions (PARTITION_TZ: the collector
+                       writes exchange-local session dates)
+
+    Sessions, session bounds and minute grids are computed once per calendar and cached;
+    grids are read-only int64 arrays of UTC ns timestamps.
     """
-    partition_tz: str = "UTC"
+    partition_tz: str = PARTITION_TZ
+    tz: str = "America/New_York"
+    rth: tuple[str, str] = ("09:30", "16:00")
+    eth: tuple[str, str] = ("04:00", "20:00")
+    early_close: str = "13:00"
+    early_close_eth: str = "17:00"
+    holidays: frozenset[str] = frozenset()
+    early_closes: frozenset[str] = frozenset()
 
     @staticmethod
     def to_utc(dt: datetime) -> datetime:
@@ -24,3 +58,152 @@ class TradingCalendar:
     @staticmethod
     def utc_date(dt: datetime) -> date:
         return TradingCalendar.to_utc(dt).date()
+
+    @classmethod
+    def from_file(cls, path: Path = DEFAULT_CALENDAR_PATH) -> TradingCalendar:
+        """
+        Calendar from a YAML holiday file (see config/market_calendar.yaml); keys that are
+        missing keep their defaults.
+        """
+        obj = yaml.safe_load(Path(path).read_text()) or {}
+        kw: dict = {}
+        for k in ("partition_tz", "tz", "early_close", "early_close_eth"):
+            if k in obj:
+                kw[k] = str(obj[k])
+        for k in ("rth", "eth"):
+            if k in obj:
+                kw[k] = tuple(str(t) for t in obj[k])
+        kw["holidays"] = frozenset(_iso(d) for d in obj.get("holidays") or [])
+        kw["early_closes"] = frozenset(_iso(d) for d in obj.get("early_closes") or [])
+        return cls(**kw)
+
+    def _check_coverage(self, start: pd.Timestamp, end: pd.Timestamp) -> None:
+        years = {int(d[:4]) for d in self.holidays}
+        if not years:
+            return
+        for y in range(start.year, end.year + 1):
+            if (y < min(years) or y > max(years)) and y not in _warned_years:
+                _warned_years.add(y)
+                logger.warning("Trading calendar has no holidays for %d; treating all its weekdays as sessions", y)
+
+    @lru_cache(maxsize=1024)
+    def sessions(self, start: str, end: str) -> tuple[str, ...]:
+        """
+        Session dates (ISO, exchange-local) in [start, end]: weekdays that are not holidays.
+        """
+        s, e = pd.Timestamp(start), pd.Timestamp(end)
+        self._check_coverage(s, e)
+        return tuple(d for d in (x.date().isoformat() for x in pd.bdate_range(s, e)) if d not in self.holidays)
+
+    def is_session(self, day: str) -> bool:
+        return bool(self.sessions(day, day))
+
+    def previous_sessions(self, end: str, n: int) -> tuple[str, ...]:
+        """
+        The last n sessions on or before `end`, oldest first.
+        """
+        if n <= 0:
+            return ()
+        e = pd.Timestamp(end)
+        span = 2 * n + 14
+        while True:
+            out = self.sessions((e - pd.Timedelta(days=span)).date().isoformat(), e.date().isoformat())
+            if len(out) >= n:
+                return out[-n:]
+            span *= 2
+
+    def _times(self, day: str, session: str) -> tuple[str, str]:
+        if session not in SESSIONS:
+            raise ValueError(f"session must be one of {SESSIONS}, got {session!r}")
+        open_, close = self.rth if session == "rth" else self.eth
+        if day in self.early_closes:
+            close = self.early_close if session == "rth" else self.early_close_eth
+        return open_, close
+
+    @lru_cache(maxsize=8192)
+    def session_bounds(self, day: str, session: str = "rth") -> tuple[pd.Timestamp, pd.Timestamp]:
+        """
+        [open, close) of one session in UTC (DST-correct), half days included.
+        """
+        open_, close = self._times(day, session)
+        return (
+            pd.Timestamp(f"{day} {open_}", tz=self.tz).tz_convert("UTC"),
+            pd.Timestamp(f"{day} {close}", tz=self.tz).tz_convert("UTC"),
+        )
+
+    @lru_cache(maxsize=8192)
+    def session_grid(self, day: str, session: str = "rth", freq: str = "1min") -> np.ndarray:
+        """
+        Bar timestamps (int64 UTC ns) of one session: [open, close) every `freq`.
+        Empty for non-session days.
+        """
+        if not self.is_session(day):
+            grid = np.zeros(0, dtype=np.int64)
+        else:
+            lo, hi = self.session_bounds(day, session)
+            grid = pd.date_range(lo, hi, freq=freq, inclusive="left").as_unit("ns").asi8.copy()
+        grid.setflags(write=False)
+        return grid
+
+    @lru_cache(maxsize=256)
+    def minute_grid(self, start: str, end: str, session: str = "rth", freq: str = "1min") -> np.ndarray:
+        """
+        Concatenated session_grid of every session in [start, end] (sorted, read-only).
+        """
+        parts = [self.session_grid(d, session, freq) for d in self.sessions(start, end)]
+        grid = np.concatenate(parts) if parts else np.zeros(0, dtype=np.int64)
+        grid.setflags(write=False)
+        return grid
+
+    def shift_bars(self, ts: pd.Timestamp, n: int, session: str = "rth", freq: str = "1min") -> pd.Timestamp:
+        """
+        The bar timestamp n bars of the session grid away from `ts`, stepping over nights,
+        weekends and holidays: for n < 0 the |n|-th bar before ts (so [result, ts) holds |n|
+        grid bars), for n > 0 the n-th bar at or after ts. n == 0 returns ts.
+        """
+        ts = pd.Timestamp(ts)
+        if n == 0:
+            return ts
+        t = ts.tz_convert("UTC").as_unit("ns").value
+        day = ts.tz_convert(self.tz).date()
+        k = abs(n) // 180 + 2  # sessions; 180 minutes is shorter than any half day
+        while True:
+            if n < 0:
+                days = self.previous_sessions(day.isoformat(), k)
+            else:
+                days = self.sessions(day.isoformat(), (day + pd.Timedelta(days=2 * k + 14)).isoformat())[:k]
+            grid = np.concatenate([self.session_grid(d, session, freq) for d in days])
+            sel = grid[grid < t] if n < 0 else grid[grid >= t]
+            if len(sel) >= abs(n):
+                return pd.Timestamp(sel[n] if n < 0 else sel[n - 1], unit="ns", tz="UTC")
+            k *= 2
+
+    @lru_cache(maxsize=1024)
+    def partition_days(self, start: str, end: str, session: str = "eth") -> tuple[str, ...]:
+        """
+        Partition dates (ISO, in partition_tz) in [start, end] that can hold bars: those
+        overlapping a session. With UTC partitions an ETH session can spill into the next
+        UTC date (e.g. 00:00-01:00 UTC in winter), so that date is included as well.
+        """
+        s, e = pd.Timestamp(start), pd.Timestamp(end)
+        pad = pd.Timedelta(days=1)
+        days: set[str] = set()
+        for d in self.sessions((s - pad).date().isoformat(), (e + pad).date().isoformat()):
+            lo, hi = self.session_bounds(d, session)
+            first = lo.tz_convert(self.partition_tz).date()
+            last = (hi - pd.Timedelta(1)).tz_convert(self.partition_tz).date()
+            for x in pd.date_range(first, last, freq="D"):
+                days.add(x.date().isoformat())
+        lo_s, hi_s = s.date().isoformat(), e.date().isoformat()
+        return tuple(sorted(d for d in days if lo_s <= d <= hi_s))
+
+
+@lru_cache(maxsize=1)
+def default_calendar() -> TradingCalendar:
+    """
+    The US equities calendar from config/market_calendar.yaml (no holidays if it is missing).
+    """
+    if not DEFAULT_CALENDAR_PATH.exists():
+        logger.warning("No holiday file at %s; calendar has weekday sessions only", DEFAULT_CALENDAR_PATH)
+        return TradingCalendar()
+    return TradingCalendar.from_file(DEFAULT_CALENDAR_PATH)
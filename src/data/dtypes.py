@@ -0,0 +1,153 @@
+from __future__ import annotations
+
+import fnmatch
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+
+def match_cols(columns: Iterable[str], patterns: Iterable[str]) -> list[str]:
+    """
+    Columns matching any of the (fnmatch-style) patterns, in column order.
+    """
+    pats = list(patterns)
+    return [c for c in columns if any(fnmatch.fnmatchcase(c, p) for p in pats)]
+
+
+KEY_COLS = ("timestamp_utc", "symbol")
+
+
+def project_columns(
+    columns: Iterable[str],
+    patterns: str | Iterable[str] | None,
+    keep: Iterable[str] = KEY_COLS,
+) -> list[str] | None:
+    """
+    Columns to read for a projection: `keep` plus those matching `patterns` (fnmatch, e.g.
+    "vol_*"), in column order. None (read everything) when patterns is None.
+    """
+    if patterns is None:
+        return None
+    pats = [patterns] if isinstance(patterns, str) else list(patterns)
+    keep = set(keep)
+    return [c for c in columns if c in keep or any(fnmatch.fnmatchcase(c, p) for p in pats)]
+
+
+def read_parquet_projected(path: Path, patterns: str | Iterable[str] | None = None) -> pd.DataFrame:
+    """
+    pd.read_parquet with the project_columns selection pushed down to the reader, resolved
+    against this file's footer schema (columns the file lacks are skipped).
+    """
+    if patterns is None:
+        return pd.read_parquet(path)
+    return pd.read_parquet(path, columns=project_columns(pq.read_schema(path).names, patterns))
+
+
+@dataclass(frozen=True)
+class DtypePolicy:
+    """
+    Storage dtypes for a derived store, applied on the write path.
+
+      float32_cols:     patterns of float columns stored as float32
+      int8_cols:        patterns of small integer codes stored as nullable Int8
+      categorical_cols: patterns of string columns stored as categorical
+                        (parquet dictionary encoding, read back as pandas category)
+    """
+    float32_cols: tuple[str, ...] = ()
+    int8_cols: tuple[str, ...] = ()
+    categorical_cols: tuple[str, ...] = ("symbol",)
+
+    def apply(self, df: pd.DataFrame) -> pd.DataFrame:
+        out = df.copy()
+        for c in match_cols(out.columns, self.float32_cols):
+            if pd.api.types.is_float_dtype(out[c]):
+                out[c] = out[c].astype("float32")
+        for c in match_cols(out.columns, self.int8_cols):
+            out[c] = out[c].astype("Int8")
+        for c in match_cols(out.columns, self.categorical_cols):
+            if not isinstance(out[c].dtype, pd.CategoricalDtype):
+                out[c] = out[c].astype("category")
+        return out
+
+
+NO_DTYPE_POLICY = DtypePolicy(categorical_cols=())
+
+FEATURES_DTYPE_POLICY = DtypePolicy(
+    float32_cols=(
+        "ret_*",
+        "logret_*",
+        "vol_*",
+        "atr_*",
+        "true_range",
+        "hl_range*",
+        "dollar_volume",
+        "cs_*",
+        "beta_*",
+    ),
+)
+
+LABELS_DTYPE_POLICY = DtypePolicy(int8_cols=("tb_label", "tb_touched"))
+
+
+def as_symbol_categorical(df: pd.DataFrame, categories: list[str], col: str = "symbol") -> pd.DataFrame:
+    """
+    Pins a categorical symbol column to a fixed category list so frames loaded from
+    different partitions concatenate (and merge) without falling back to object.
+    """
+    if col in df.columns and isinstance(df[col].dtype, pd.CategoricalDtype):
+        df[col] = df[col].cat.set_categories(categories)
+    return df
+
+
+def _field_bytes(t: pa.DataType) -> float:
+    if pa.types.is_dictionary(t):
+        return t.index_type.bit_width / 8
+    if pa.types.is_string(t) or pa.types.is_large_string(t):
+        return 60.0  # pandas object string: pointer + small str object
+    if pa.types.is_boolean(t):
+        return 1.0
+    try:
+        return t.bit_width / 8
+    except ValueError:
+        return 8.0
+
+
+def estimate_load_bytes(paths: Iterable[Path], columns: list[str] | None = None) -> int:
+    """
+    In-memory size estimate (bytes) of loading `paths` into pandas, from parquet footers only.
+    Nullable integer columns are counted with their validity mask.
+    """
+    total = 0.0
+    for p in paths:
+        md = pq.read_metadata(p)
+        schema = md.schema.to_arrow_schema()
+        per_row = 0.0
+        for f in schema:
+            if columns is not None and f.name not in columns:
+                continue
+            per_row += _field_bytes(f.type)
+            if pa.types.is_integer(f.type) and f.nullable:
+                per_row += 1.0
+        total += per_row * md.num_rows
+    return int(total)
+
+
+def column_chunk_bytes(paths: Iterable[Path], columns: list[str] | None = None) -> int:
+    """
+    Compressed on-disk bytes of the column chunks a (projected) read fetches, from parquet
+    footers only.
+    """
+    total = 0
+    for p in paths:
+        md = pq.read_metadata(p)
+        for rg in range(md.num_row_groups):
+            g = md.row_group(rg)
+            for i in range(g.num_columns):
+                c = g.column(i)
+                if columns is None or c.path_in_schema in columns:
+                    total += c.total_compressed_size
+    return total
@@ -0,0 +1,369 @@
+from __future__ import annotations
+
+import logging
+from dataclasses import asdict, dataclass, replace
+from pathlib import Path
+from typing import Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+from src.utils.io import atomic_write_parquet
+from src.utils.fingerprint import (
+    PartitionFingerprint,
+    bars_content_sha1,
+    code_version,
+    config_sha1,
+    read_fingerprint,
+    rebuild_reason,
+    write_fingerprint,
+)
+
+logger = logging.getLogger(__name__)
+
+INFO_BARS_STAGE = "info_bars"
+
+# bar kind -> store directory suffix (data/bars_{suffix}, siblings of the 1-minute store)
+INFO_BAR_KINDS: dict[str, str] = {
+    "volume": "vol",
+    "dollar": "dollar",
+    "tick_imbalance": "tib",
+}
+
+INFO_BAR_COLS = [
+    "timestamp_utc", "symbol", "open", "high", "low", "close", "volume", "dollar_volume", "vwap",
+    "n_bars", "t_start", "threshold", "imbalance",
+]
+
+
+@dataclass(frozen=True)
+class InfoBarConfig:
+    """
+    How information-driven bars are cut from 1-minute bars.
+
+      kind          one of INFO_BAR_KINDS
+      bars_per_day  target bars per session; the threshold of a day is the mean daily
+                    volume / dollar volume of the previous adv_days sessions / bars_per_day
+                    (tick_imbalance: the initial expected bar length, in 1-minute bars)
+      adv_days      sessions in that trailing average
+      threshold     fixed threshold for every symbol instead of the adaptive one
+      thresholds    per-symbol fixed thresholds, ((symbol, threshold), ...); win over `threshold`
+      ewma_bars     tick_imbalance: span (in bars) of the E[T] and E[b] moving averages
+    """
+    kind: str = "volume"
+    bars_per_day: float = 50.0
+    adv_days: int = 20
+    threshold: Optional[float] = None
+    thresholds: tuple[tuple[str, float], ...] = ()
+    ewma_bars: int = 20
+
+    def fixed_threshold(self, symbol: str) -> Optional[float]:
+        return dict(self.thresholds).get(symbol, self.threshold)
+
+
+@dataclass(frozen=True)
+class InfoBarState:
+    """
+    What carries over from one day's build to the next (stored in the partition fingerprint
+    sidecar, so appending a day never re-reads earlier days):
+
+      acc        volume / dollar volume past the last threshold crossing, or the signed tick
+                 imbalance of the open bar
+      n_open     1-minute bars in the open (unfinished) bar, 0 when none; its OHLCV follow
+      history    daily totals (volume, dollar volume or 1-minute bar count) of recent sessions
+      ewma_t     tick_imbalance: E[T], expected bar length in 1-minute bars (0 = not started)
+      ewma_b     tick_imbalance: E[b], expected tick sign
+      last_close, last_sign  tick rule state across the day boundary
+    """
+    acc: float = 0.0
+    n_open: int = 0
+    open: float = 0.0
+    high: float = 0.0
+    low: float = 0.0
+    close: float = 0.0
+    volume: float = 0.0
+    dollar_volume: float = 0.0
+    t_start: int = 0
+    history: tuple[float, ...] = ()
+    ewma_t: float = 0.0
+    ewma_b: float = 0.0
+    last_close: Optional[float] = None
+    last_sign: int = 0
+
+    @staticmethod
+    def from_dict(d: dict) -> InfoBarState:
+        return InfoBarState(**{**d, "history": tuple(d.get("history", ()))})
+
+
+def store_dir_for(bars_root: Path, kind: str) -> Path:
+    """
+    data/bars_1m -> data/bars_vol, data/bars_dollar, data/bars_tib.
+    """
+    return bars_root.parent / f"bars_{INFO_BAR_KINDS[kind]}"
+
+
+def _daily_total(df: pd.DataFrame, kind: str) -> float:
+    if kind == "tick_imbalance":
+        return float(len(df))
+    v = np.nan_to_num(df["volume"].to_numpy(dtype=float))
+    if kind == "volume":
+        return float(v.sum())
+    return float(np.nan_to_num(_typical_price(df) * v).sum())
+
+
+def _typical_price(df: pd.DataFrame) -> np.ndarray:
+    if "vwap" in df.columns:
+        return df["vwap"].to_numpy(dtype=float)
+    return (df["high"].to_numpy(dtype=float) + df["low"].to_numpy(dtype=float) + df["close"].to_numpy(dtype=float)) / 3.0
+
+
+def _tick_signs(close: np.ndarray, last_close: Optional[float], last_sign: int) -> np.ndarray:
+    """
+    Tick rule on 1-minute closes: sign of the close change, an unchanged close repeats the
+    previous sign.
+    """
+    prev = np.empty_like(close)
+    prev[0] = close[0] if last_close is None else last_close
+    prev[1:] = close[:-1]
+    s = np.sign(close - prev)
+    idx = np.where(s != 0, np.arange(len(s)), -1)
+    np.maximum.accumulate(idx, out=idx)
+    return np.where(idx >= 0, s[np.maximum(idx, 0)], float(last_sign))
+
+
+def _first_cross(s: np.ndarray, i: int, base: float, h: float) -> int:
+    """
+    First index >= i with |s - base| >= h (-1 if none), scanning doubling chunks.
+    """
+    step = 64
+    while i < len(s):
+        hit = np.flatnonzero(np.abs(s[i : i + step] - base) >= h)
+        if len(hit):
+            return i + int(hit[0])
+        i += step
+        step *= 2
+    return -1
+
+
+def _imbalance_ends(
+    b: np.ndarray, state: InfoBarState, cfg: InfoBarConfig, fixed: Optional[float], t0: float
+) -> tuple[np.ndarray, np.ndarray, np.ndarray, InfoBarState]:
+    """
+    Tick imbalance bars (Lopez de Prado): a bar closes once |sum of tick signs| >= h with
+    h = E[T] |E[b]|, the expectations being EWMAs over closed bars. h is floored at the
+    random-walk scale sqrt(E[T]) so it cannot collapse to one-row bars when buys and sells
+    balance. Thresholds only move at bar closes, so this loops over bars, not rows.
+    """
+    s = state.acc + np.cumsum(b)
+    alpha = 2.0 / (cfg.ewma_bars + 1.0)
+    e_t = state.ewma_t or t0
+    e_b = state.ewma_b
+    ends, hs, imb = [], [], []
+    base, start, carried = 0.0, 0, state.n_open
+    while True:
+        h = fixed if fixed is not None else max(e_t * abs(e_b), np.sqrt(e_t), 1.0)
+        j = _first_cross(s, start, base, h)
+        if j < 0:
+            break
+        t = j - start + 1 + carried
+        theta = s[j] - base
+        e_t += alpha * (t - e_t)
+        e_b += alpha * (theta / t - e_b)
+        ends.append(j)
+        hs.append(h)
+        imb.append(theta)
+        base, start, carried = s[j], j + 1, 0
+    state = replace(state, acc=float(s[-1] - base), ewma_t=float(e_t), ewma_b=float(e_b))
+    return np.asarray(ends, dtype=np.int64), np.asarray(hs), np.asarray(imb), state
+
+
+def build_info_bars(
+    df: pd.DataFrame, symbol: str, cfg: InfoBarConfig, state: Optional[InfoBarState] = None
+) -> tuple[pd.DataFrame, InfoBarState]:
+    """
+    Cuts one symbol's time-sorted 1-minute bars (typically one day) into cfg.kind bars,
+    continuing the open bar in `state` (None = fresh start). Returns (bars, state to carry).
+
+    volume / dollar bars close at the 1-minute bar where the running total (carried amount
+    + cumsum) first reaches the next multiple of the threshold, found for all multiples at
+    once with searchsorted. Overshoot counts towards the next bar; a single 1-minute bar
+    crossing several multiples closes one bar. The threshold is fixed per day.
+
+    Output bars are labelled by their last 1-minute bar (timestamp_utc; t_start is the first)
+    and reduced with np.*.reduceat like the rollups: open=first, high=max, low=min,
+    close=last, volume, dollar_volume (vwap or typical price x volume), vwap, n_bars,
+    threshold in force when the bar closed and (tick_imbalance) the signed imbalance.
+    """
+    if cfg.kind not in INFO_BAR_KINDS:
+        raise ValueError(f"kind must be one of {list(INFO_BAR_KINDS)}, got {cfg.kind!r}")
+    state = state or InfoBarState()
+    if df.empty:
+        return pd.DataFrame(columns=INFO_BAR_COLS), state
+
+    df = df.sort_values("timestamp_utc")
+    ts = pd.DatetimeIndex(pd.to_datetime(df["timestamp_utc"], utc=True)).as_unit("ns").asi8
+    o = df["open"].to_numpy(dtype=float)
+    h = df["high"].to_numpy(dtype=float)
+    lo = df["low"].to_numpy(dtype=float)
+    c = df["close"].to_numpy(dtype=float)
+    v = np.nan_to_num(df["volume"].to_numpy(dtype=float))
+    dv = np.nan_to_num(_typical_price(df) * v)
+    n = len(df)
+
+    total = _daily_total(df, cfg.kind)
+    hist = state.history[-cfg.adv_days:] if cfg.adv_days > 0 else ()
+    if not hist:
+        logger.info("Info bars %s %s: no history, sizing the threshold from the day itself", cfg.kind, symbol)
+    ref = float(np.mean(hist)) if hist else total
+    fixed = cfg.fixed_threshold(symbol)
+
+    if cfg.kind == "tick_imbalance":
+        b = _tick_signs(c, state.last_close, state.last_sign)
+        ends, thr, imb, state = _imbalance_ends(b, state, cfg, fixed, t0=max(ref / cfg.bars_per_day, 1.0))
+        state = replace(state, last_close=float(c[-1]), last_sign=int(b[-1]))
+    else:
+        theta = fixed if fixed is not None else ref / cfg.bars_per_day
+        cum = state.acc + np.cumsum(v if cfg.kind == "volume" else dv)
+        k = int(cum[-1] // theta) if theta > 0 else 0
+        ends = np.unique(np.searchsorted(cum, theta * np.arange(1, k + 1), side="left"))
+        thr = np.full(len(ends), float(theta))
+        imb = np.full(len(ends), np.nan)
+        state = replace(state, acc=float(cum[-1] - k * theta))
+
+    state = replace(state, history=(*hist, total)[-max(cfg.adv_days, 1):])
+
+    out = pd.DataFrame(columns=INFO_BAR_COLS)
+    if len(ends):
+        starts = np.r_[0, ends[:-1] + 1]
+        m = int(ends[-1]) + 1  # reduceat's last segment would otherwise run to the end
+        bo, bh, bl = o[starts], np.maximum.reduceat(h[:m], starts), np.minimum.reduceat(lo[:m], starts)
+        bv, bdv = np.add.reduceat(v[:m], starts), np.add.reduceat(dv[:m], starts)
+        nb = np.diff(np.r_[starts, ends[-1] + 1])
+        t_start = ts[starts]
+        if state.n_open:
+            # the first bar continues the one left open by the previous day
+            bo[0] = state.open
+            bh[0] = max(bh[0], state.high)
+            bl[0] = min(bl[0], state.low)
+            bv[0] += state.volume
+            bdv[0] += state.dollar_volume
+            nb[0] += state.n_open
+            t_start[0] = state.t_start
+        with np.errstate(invalid="ignore", divide="ignore"):
+            vwap = np.where(bv > 0, bdv / bv, c[ends])
+        out = pd.DataFrame({
+            "timestamp_utc": pd.to_datetime(ts[ends], unit="ns", utc=True),
+            "symbol": symbol,
+            "open": bo,
+            "high": bh,
+            "low": bl,
+            "close": c[ends],
+            "volume": bv,
+            "dollar_volume": bdv,
+            "vwap": vwap,
+            "n_bars": nb.astype(np.int64),
+            "t_start": pd.to_datetime(t_start, unit="ns", utc=True),
+            "threshold": thr,
+            "imbalance": imb,
+        })
+        state = replace(state, n_open=0)
+
+    # rows after the last close stay open (merged into whatever was already open)
+    rest = slice(int(ends[-1]) + 1 if len(ends) else 0, n)
+    if rest.start < n:
+        first = state.n_open == 0
+        state = replace(
+            state,
+            n_open=state.n_open + (n - rest.start),
+            open=float(o[rest.start]) if first else state.open,
+            high=float(h[rest].max()) if first else max(state.high, float(h[rest].max())),
+            low=float(lo[rest].min()) if first else min(state.low, float(lo[rest].min())),
+            close=float(c[-1]),
+            volume=(0.0 if first else state.volume) + float(v[rest].sum()),
+            dollar_volume=(0.0 if first else state.dollar_volume) + float(dv[rest].sum()),
+            t_start=int(ts[rest.start]) if first else state.t_start,
+        )
+    return out, state
+
+
+def _seed_state(src, symbol: str, earlier: list[Path], cfg: InfoBarConfig) -> InfoBarState:
+    """
+    Fresh state whose history holds the daily totals of the adv_days source partitions
+    before the first day built, so that day's threshold does not look at itself.
+    """
+    hist = []
+    for p in earlier[-cfg.adv_days:] if cfg.adv_days > 0 else []:
+        hist.append(_daily_total(src.read_partition(p, symbol), cfg.kind))
+    return InfoBarState(history=tuple(hist))
+
+
+def update_info_bars(
+    bars_root: Path,
+    cfg: InfoBarConfig,
+    symbols: Optional[Iterable[str]] = None,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+) -> int:
+    """
+    Derives data/bars_{vol,dollar,tib} (symbol=XYZ/date=YYYY-MM-DD/bars.parquet, a bar
+    stored under the day it closes) from data/bars_1m, day by day per symbol.
+
+    Incremental: each partition's fingerprint covers its 1-minute source partition and the
+    state carried in from the previous day, and records the state it hands on. Appending a
+    new day only builds that day from the stored carry; a changed day rebuilds itself and,
+    if its carry changed, the days after it. Returns the number of partitions written.
+    """
+    from src.data.bars_store import BarsStore
+
+    src = BarsStore(root_dir=bars_root)
+    dst = store_dir_for(bars_root, cfg.kind)
+    code_sha = code_version("src.data.info_bars")
+    cfg_sha = config_sha1(cfg)
+    start_d = pd.Timestamp(start).date() if start is not None else None
+    end_d = pd.Timestamp(end).date() if end is not None else None
+
+    written = 0
+    for sym in (list(symbols) if symbols is not None else src.list_symbols()):
+        paths = src.partition_paths(sym)
+        days = [p.parent.name.split("date=", 1)[1] for p in paths]
+        todo = [
+            i for i, d in enumerate(days)
+            if (start_d is None or pd.Timestamp(d).date() >= start_d) and (end_d is None or pd.Timestamp(d).date() <= end_d)
+        ]
+        if not todo:
+            continue
+
+        state: Optional[InfoBarState] = None
+        if todo[0] > 0:
+            prev = read_fingerprint(dst / f"symbol={sym}" / f"date={days[todo[0] - 1]}", INFO_BARS_STAGE)
+            if prev and "carry" in prev:
+                state = InfoBarState.from_dict(prev["carry"])
+            else:
+                logger.warning("Info bars %s %s: no carried state before %s, starting fresh", cfg.kind, sym, days[todo[0]])
+        if state is None:
+            state = _seed_state(src, sym, paths[: todo[0]], cfg)
+
+        for i in todo:
+            path, day = paths[i], days[i]
+            part_dir = dst / f"symbol={sym}" / f"date={day}"
+            out_path = part_dir / "bars.parquet"
+            fp = PartitionFingerprint(
+                inputs={path.parent.name: bars_content_sha1(path), "carry": config_sha1(state)},
+                config=cfg_sha,
+                code=code_sha,
+            )
+            old = read_fingerprint(part_dir, INFO_BARS_STAGE)
+            reason = rebuild_reason(old, fp, output_exists=out_path.exists())
+            if reason is None and "carry" in old:
+                state = InfoBarState.from_dict(old["carry"])
+                continue
+
+            logger.info("Info bars %s: symbol=%s date=%s (%s)", cfg.kind, sym, day, reason or "no carry recorded")
+            out, state = build_info_bars(src.read_partition(path, sym), sym, cfg, state)
+            if not out.empty:
+                atomic_write_parquet(out, out_path)
+                written += 1
+            elif out_path.exists():
+                out_path.unlink()
+            write_fingerprint(part_dir, INFO_BARS_STAGE, fp, rows=len(out), carry=asdict(state))
+    return written
@@ -6,33 +6,61 @@ from typing import Iterable
 
 import pandas as pd
 
+from src.data.calendar import TradingCalendar, default_calendar
+from src.data.dtypes import as_symbol_categorical, read_parquet_projected
+
 
 @dataclass(frozen=True)
 class LabelsStore:
     root_dir: Path = Path("data/labels_1m")
+    calendar: TradingCalendar | None = None
 
     def _part_path(self, symbol: str, day: str) -> Path:
         return self.root_dir / f"symbol={symbol}" / f"date={day}" / "labels.parquet"
 
-    def load(self, symbol: str, start: str, end: str) -> pd.DataFrame:
-        days = pd.date_range(start=start, end=end, freq="D")
-        parts = []
-        for d in days:
-            p = self._part_path(symbol, d.date().isoformat())
-            if p.exists():
-                parts.append(pd.read_parquet(p))
+    def partition_paths(self, symbol: str, start: str, end: str) -> list[Path]:
+        """
+        Existing partitions over [start, end], probing only dates that overlap a trading
+        session (calendar, default: US equities).
+        """
+        days = (self.calendar or default_calendar()).partition_days(start, end)
+        paths = [self._part_path(symbol, d) for d in days]
+        return [p for p in paths if p.exists()]
+
+    def load(
+        self,
+        symbol: str,
+        start: str,
+        end: str,
+        label_cols: str | Iterable[str] | None = None,
+    ) -> pd.DataFrame:
+        """
+        One symbol's partitions over [start, end]. label_cols (names or fnmatch patterns such as
+        "fwd_ret_*") limits the read to those columns plus timestamp_utc/symbol; the selection is
+        pushed down to the parquet reader, so other columns are never decoded.
+        """
+        parts = [read_parquet_projected(p, label_cols) for p in self.partition_paths(symbol, start, end)]
         if not parts:
             return pd.DataFrame()
         df = pd.concat(parts, ignore_index=True)
         df["timestamp_utc"] = pd.to_datetime(df["timestamp_utc"], utc=True)
         return df.sort_values(["symbol", "timestamp_utc"])
 
-    def load_panel(self, symbols: Iterable[str], start: str, end: str) -> pd.DataFrame:
+    def load_panel(
+        self,
+        symbols: Iterable[str],
+        start: str,
+        end: str,
+        label_cols: str | Iterable[str] | None = None,
+    ) -> pd.DataFrame:
+        symbols = list(symbols)
+        categories = sorted(set(symbols))
         parts = []
         for s in symbols:
-            d = self.load(s, start, end)
+            d = self.load(s, start, end, label_cols=label_cols)
             if not d.empty:
-                parts.append(d)
+                # keep a dictionary-encoded symbol categorical across symbols
+                parts.append(as_symbol_categorical(d, categories))
         if not parts:
             return pd.DataFrame()
         return pd.concat(parts, ignore_index=True).sort_values(["symbol", "timestamp_utc"])
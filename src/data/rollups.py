@@ -0,0 +1,221 @@
+from __future__ import annotations
+
+import logging
+from pathlib import Path
+from typing import Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+from src.data.calendar import default_calendar
+from src.utils.io import atomic_write_parquet
+from src.utils.fingerprint import (
+    PartitionFingerprint,
+    bars_content_sha1,
+    code_version,
+    config_sha1,
+    read_fingerprint,
+    rebuild_reason,
+    write_fingerprint,
+)
+
+logger = logging.getLogger(__name__)
+
+ROLLUP_STAGE = "rollup"
+
+# bar_freq -> store directory suffix (data/bars_{suffix})
+ROLLUP_FREQS: dict[str, str] = {
+    "5min": "5m",
+    "15min": "15m",
+    "1h": "1h",
+    "1D": "1d",
+}
+
+# Daily buckets follow the session date (same tz the collector partitions by)
+DAILY_TZ = "America/New_York"
+
+
+def store_dir_for(bars_root: Path, freq: str) -> Path:
+    """
+    data/bars_1m -> data/bars_5m etc. (siblings of the 1-minute store).
+    """
+    return bars_root.parent / f"bars_{ROLLUP_FREQS[freq]}"
+
+
+def freq_delta(freq: str) -> pd.Timedelta:
+    return pd.Timedelta(freq)
+
+
+def _bucket_starts(ts: pd.Series, freq: str, daily_tz: str) -> pd.Series:
+    if freq_delta(freq) >= pd.Timedelta(days=1):
+        local = ts.dt.tz_convert(daily_tz).dt.normalize()
+        return local.dt.tz_convert("UTC")
+    return ts.dt.floor(freq)
+
+
+def _bucket_ends(starts: pd.Series, freq: str, daily_tz: str) -> pd.Series:
+    if freq_delta(freq) >= pd.Timedelta(days=1):
+        # next local midnight (+36h then normalize: days are 23-25h around DST)
+        local = starts.dt.tz_convert(daily_tz).dt.normalize()
+        return (local + pd.Timedelta(hours=36)).dt.normalize().dt.tz_convert("UTC")
+    return starts + freq_delta(freq)
+
+
+def rollup_bars(df: pd.DataFrame, freq: str, daily_tz: str = DAILY_TZ) -> pd.DataFrame:
+    """
+    Aggregates a single-symbol bars frame (timestamp_utc, symbol, OHLCV[, vwap, n_bars])
+    into `freq` buckets labelled by bucket start:
+
+      open=first, high=max, low=min, close=last, volume=sum,
+      vwap   = volume-weighted price (input vwap, else typical price (h+l+c)/3),
+      n_bars = number of source bars (trade-count proxy; summed when rolling up rollups)
+
+    Buckets are contiguous runs of equal bucket key on time-sorted input, reduced with
+    np.*.reduceat (no groupby).
+    """
+    cols = ["timestamp_utc", "symbol", "open", "high", "low", "close", "volume", "vwap", "n_bars"]
+    if df.empty:
+        return pd.DataFrame(columns=cols)
+
+    df = df.sort_values("timestamp_utc")
+    ts = pd.to_datetime(df["timestamp_utc"], utc=True)
+    buckets = _bucket_starts(ts, freq, daily_tz)
+    key = pd.DatetimeIndex(buckets).as_unit("ns").asi8
+    starts = np.flatnonzero(np.r_[True, key[1:] != key[:-1]])
+    ends = np.r_[starts[1:], len(key)] - 1
+
+    o = df["open"].to_numpy(dtype=float)
+    h = df["high"].to_numpy(dtype=float)
+    lo = df["low"].to_numpy(dtype=float)
+    c = df["close"].to_numpy(dtype=float)
+    v = np.nan_to_num(df["volume"].to_numpy(dtype=float))
+    px = df["vwap"].to_numpy(dtype=float) if "vwap" in df.columns else (h + lo + c) / 3.0
+    nb = df["n_bars"].to_numpy(dtype=float) if "n_bars" in df.columns else np.ones(len(df))
+
+    vol = np.add.reduceat(v, starts)
+    pv = np.add.reduceat(np.nan_to_num(px * v), starts)
+    close = c[ends]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        vwap = np.where(vol > 0, pv / vol, close)
+
+    sym = df["symbol"].iloc[0] if "symbol" in df.columns else None
+    return pd.DataFrame(
+        {
+            "timestamp_utc": buckets.iloc[starts].to_numpy(),
+            "symbol": sym,
+            "open": o[starts],
+            "high": np.maximum.reduceat(h, starts),
+            "low": np.minimum.reduceat(lo, starts),
+            "close": close,
+            "volume": vol,
+            "vwap": vwap,
+            "n_bars": np.add.reduceat(nb, starts).astype(np.int64),
+        }
+    )
+
+
+def merge_buckets(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Combines rows of a single-symbol rollup frame that share a bucket start, i.e. pieces of
+    one bucket rolled up from different date partitions (a daily bucket of a UTC-dated
+    store spans two dates). Pieces must be in partition order: open of the first, close of
+    the last, high=max, low=min, volume and n_bars summed, vwap volume-weighted.
+    """
+    if df.empty:
+        return df
+    df = df.sort_values("timestamp_utc", kind="stable").reset_index(drop=True)
+    key = pd.DatetimeIndex(df["timestamp_utc"]).as_unit("ns").asi8
+    starts = np.flatnonzero(np.r_[True, key[1:] != key[:-1]])
+    if len(starts) == len(df):
+        return df
+    ends = np.r_[starts[1:], len(key)] - 1
+
+    v = np.nan_to_num(df["volume"].to_numpy(dtype=float))
+    out = df.iloc[starts].reset_index(drop=True)
+    out["high"] = np.maximum.reduceat(df["high"].to_numpy(dtype=float), starts)
+    out["low"] = np.minimum.reduceat(df["low"].to_numpy(dtype=float), starts)
+    out["close"] = df["close"].to_numpy(dtype=float)[ends]
+    out["volume"] = np.add.reduceat(v, starts)
+    if "vwap" in df.columns:
+        pv = np.add.reduceat(np.nan_to_num(df["vwap"].to_numpy(dtype=float) * v), starts)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            out["vwap"] = np.where(out["volume"] > 0, pv / out["volume"], out["close"])
+    if "n_bars" in df.columns:
+        out["n_bars"] = np.add.reduceat(df["n_bars"].to_numpy(dtype=np.int64), starts)
+    return out
+
+
+def _check_within_partition(out: pd.DataFrame, day: str, freq: str, daily_tz: str, partition_tz: str) -> None:
+    """
+    Raises when a bucket of `out` (rolled up from the partition date=`day`) reaches outside
+    that partition's [00:00, 24:00) in partition_tz: the bucket's other piece lives in the
+    neighbouring partition, and a per-partition rollup would store it split.
+    """
+    if out.empty:
+        return
+    lo = pd.Timestamp(day, tz=partition_tz)
+    hi = (lo + pd.Timedelta(hours=36)).normalize()
+    starts = pd.to_datetime(out["timestamp_utc"], utc=True)
+    bad = (starts < lo) | (_bucket_ends(starts, freq, daily_tz) > hi)
+    if bad.any():
+        raise ValueError(
+            f"{freq} bucket starting {starts[bad].iloc[0]} straddles partition date={day} "
+            f"(partition_tz={partition_tz}, daily_tz={daily_tz}); materialized rollups need "
+            f"buckets that fit in one partition, e.g. session-date partitions for 1D"
+        )
+
+
+def update_rollups(
+    bars_root: Path,
+    symbols: Optional[Iterable[str]] = None,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    freqs: Iterable[str] = tuple(ROLLUP_FREQS),
+    daily_tz: str = DAILY_TZ,
+    partition_tz: Optional[str] = None,
+) -> int:
+    """
+    Derives data/bars_{5m,15m,1h,1d} from data/bars_1m, partition for partition
+    (symbol=XYZ/date=YYYY-MM-DD/bars.parquet in every store).
+
+    Incremental: each rollup partition records the content hash of its source 1m partition,
+    so only partitions whose 1m data changed (i.e. only their buckets) are recomputed.
+    Every bucket must fit in its source partition (true for session-date partitions and
+    whole-hour UTC offsets); a bucket straddling two partitions (partition_tz, default the
+    calendar's, e.g. 1D over a UTC-dated store) raises ValueError. Returns the number of
+    rollup partitions written.
+    """
+    from src.data.bars_store import BarsStore
+
+    partition_tz = partition_tz or default_calendar().partition_tz
+    src = BarsStore(root_dir=bars_root)
+    freqs = list(freqs)
+    code_sha = code_version("src.data.rollups")
+
+    written = 0
+    for sym in (list(symbols) if symbols is not None else src.list_symbols()):
+        for path in src.partition_paths(sym, start, end):
+            day = path.parent.name.split("date=", 1)[1]
+            inputs = {path.parent.name: bars_content_sha1(path)}
+            todo = []
+            for freq in freqs:
+                part_dir = store_dir_for(bars_root, freq) / f"symbol={sym}" / f"date={day}"
+                fp = PartitionFingerprint(inputs=inputs, config=config_sha1({"freq": freq, "daily_tz": daily_tz}), code=code_sha)
+                reason = rebuild_reason(
+                    read_fingerprint(part_dir, ROLLUP_STAGE), fp, output_exists=(part_dir / "bars.parquet").exists()
+                )
+                if reason is not None:
+                    todo.append((freq, part_dir, fp, reason))
+            if not todo:
+                continue
+
+            bars = src.read_partition(path, sym)
+            for freq, part_dir, fp, reason in todo:
+                logger.info("Rollup %s: symbol=%s date=%s (%s)", freq, sym, day, reason)
+                out = rollup_bars(bars, freq, daily_tz=daily_tz)
+                _check_within_partition(out, day, freq, daily_tz, partition_tz)
+                if not out.empty:
+                    atomic_write_parquet(out, part_dir / "bars.parquet")
+                    written += 1
+                write_fingerprint(part_dir, ROLLUP_STAGE, fp, rows=len(out))
+    return written
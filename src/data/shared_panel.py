@@ -0,0 +1,227 @@
+from __future__ import annotations
+
+import logging
+import os
+import sys
+import weakref
+from dataclasses import dataclass
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+_ALIGN = 64
+
+
+@dataclass(frozen=True)
+class PanelDescriptor:
+    """
+    Small picklable handle of a shared panel; pass it to workers and attach_panel() it.
+
+      shm_name    multiprocessing.shared_memory block holding every column
+      n_rows      rows, sorted by (symbol, timestamp_utc)
+      columns     (name, numpy dtype, byte offset) per column; timestamp_utc is int64 UTC
+                  ns and symbol int32 codes into `symbols`
+      symbols     symbol of each code
+      offsets_at  byte offset of the (len(symbols) + 1,) int64 row offsets per symbol
+      owner_pid   process that created (and will unlink) the block
+    """
+    shm_name: str
+    n_rows: int
+    columns: tuple[tuple[str, str, int], ...]
+    symbols: tuple[str, ...]
+    offsets_at: int
+    owner_pid: int
+
+
+def _open(name: str) -> shared_memory.SharedMemory:
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    # Before 3.13 attaching registers the block with the resource tracker as well. Workers
+    # started by multiprocessing share the owner's tracker, where that is a no-op.
+    return shared_memory.SharedMemory(name=name)
+
+
+class PanelView:
+    """
+    Zero-copy, read-only numpy views of a shared panel's columns.
+    """
+
+    def __init__(self, desc: PanelDescriptor, shm: shared_memory.SharedMemory):
+        self.descriptor = desc
+        self.symbols = desc.symbols
+        self._shm = shm
+        n = desc.n_rows
+        self._arrays: dict[str, np.ndarray] = {}
+        for name, dtype, offset in desc.columns:
+            a = np.ndarray((n,), dtype=np.dtype(dtype), buffer=shm.buf, offset=offset)
+            a.flags.writeable = False
+            self._arrays[name] = a
+        self.offsets = np.ndarray((len(desc.symbols) + 1,), dtype=np.int64, buffer=shm.buf, offset=desc.offsets_at)
+        self.offsets.flags.writeable = False
+        self._codes = {s: i for i, s in enumerate(desc.symbols)}
+
+    def __len__(self) -> int:
+        return self.descriptor.n_rows
+
+    def arrays(self, symbol: str | None = None) -> dict[str, np.ndarray]:
+        """
+        Column views for all rows, or the contiguous slice of one symbol.
+        """
+        if symbol is None:
+            return dict(self._arrays)
+        k = self._codes[symbol]
+        a, b = self.offsets[k], self.offsets[k + 1]
+        return {name: v[a:b] for name, v in self._arrays.items()}
+
+    def frame(self, symbol: str | None = None) -> pd.DataFrame:
+        """
+        DataFrame over arrays(symbol): numeric columns stay views of the shared block;
+        timestamp_utc becomes tz-aware UTC and symbol a categorical.
+        """
+        arrs = self.arrays(symbol)
+        cols: dict[str, object] = {}
+        for name, v in arrs.items():
+            if name == "timestamp_utc":
+                cols[name] = pd.DatetimeIndex(v.view("M8[ns]")).tz_localize("UTC")
+            elif name == "symbol":
+                cols[name] = pd.Categorical.from_codes(v, categories=list(self.symbols))
+            else:
+                cols[name] = v
+        return pd.DataFrame(cols, copy=False)
+
+    def close(self) -> None:
+        """
+        Drops the views and this process' mapping (never unlinks the block).
+        """
+        self._arrays.clear()
+        self.offsets = None
+        try:
+            self._shm.close()
+        except BufferError:
+            logger.warning("Shared panel %s still has live views; mapping stays open", self.descriptor.shm_name)
+
+    def __enter__(self) -> PanelView:
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def attach_panel(desc: PanelDescriptor) -> PanelView:
+    """
+    Worker side: maps the block named by `desc` and returns read-only views of it. A worker
+    only ever closes its mapping, so a crashing worker cannot free or corrupt the panel.
+    """
+    return PanelView(desc, _open(desc.shm_name))
+
+
+def _release(shm: shared_memory.SharedMemory, owner_pid: int) -> None:
+    # only the creating process unlinks (forked children inherit the finalizer)
+    if os.getpid() != owner_pid:
+        return
+    try:
+        shm.close()
+    except BufferError:
+        pass
+    try:
+        shm.unlink()
+    except FileNotFoundError:
+        pass
+
+
+class SharedPanel:
+    """
+    Owner side of a bars panel in shared memory (see share_panel).
+
+    The block is unlinked by close(), on leaving a `with` block, when the object is garbage
+    collected or at interpreter exit. If the owner dies without any of these, the
+    multiprocessing resource tracker it registered the block with unlinks it once the
+    process tree exits.
+    """
+
+    def __init__(self, shm: shared_memory.SharedMemory, desc: PanelDescriptor):
+        self.descriptor = desc
+        self._shm = shm
+        self._view: PanelView | None = None
+        self._finalizer = weakref.finalize(self, _release, shm, desc.owner_pid)
+
+    @property
+    def name(self) -> str:
+        return self.descriptor.shm_name
+
+    @property
+    def nbytes(self) -> int:
+        return self._shm.size
+
+    def view(self) -> PanelView:
+        """
+        Read-only views for the owner itself.
+        """
+        if self._view is None:
+            self._view = PanelView(self.descriptor, self._shm)
+        return self._view
+
+    def close(self) -> None:
+        if self._view is not None:
+            self._view._arrays.clear()
+            self._view.offsets = None
+            self._view = None
+        self._finalizer()
+
+    def __enter__(self) -> SharedPanel:
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def share_panel(df: pd.DataFrame, on: str = "timestamp_utc", symbol_col: str = "symbol") -> SharedPanel:
+    """
+    Copies a long panel into one shared-memory block, once: rows sorted by (symbol, time),
+    timestamps as int64 UTC ns, symbols as int32 codes plus per-symbol row offsets, and the
+    numeric columns as they are (64-byte aligned). Non-numeric columns are skipped (logged).
+    """
+    codes, symbols = pd.factorize(df[symbol_col], sort=True)
+    ts = pd.to_datetime(df[on], utc=True).dt.as_unit("ns").array.asi8
+    order = np.lexsort((ts, codes))
+
+    numeric = [c for c in df.columns if c not in (on, symbol_col) and df[c].dtype.kind in "fiub"]
+    skipped = [c for c in df.columns if c not in (on, symbol_col, *numeric)]
+    if skipped:
+        logger.info("share_panel: skipping non-numeric columns %s", skipped)
+
+    sources: list[tuple[str, np.ndarray]] = [
+        (on, ts),
+        (symbol_col, codes.astype(np.int32)),
+        *[(c, df[c].to_numpy()) for c in numeric],
+    ]
+    layout: list[tuple[str, str, int]] = []
+    offset = 0
+    for name, arr in sources:
+        layout.append((name, arr.dtype.str, offset))
+        offset += -(-arr.dtype.itemsize * len(df) // _ALIGN) * _ALIGN
+    offsets_at = offset
+    offset += (len(symbols) + 1) * 8
+
+    shm = shared_memory.SharedMemory(create=True, size=max(offset, 1))
+    desc = PanelDescriptor(
+        shm_name=shm.name,
+        n_rows=len(df),
+        columns=tuple(layout),
+        symbols=tuple(str(s) for s in symbols),
+        offsets_at=offsets_at,
+        owner_pid=os.getpid(),
+    )
+    panel = SharedPanel(shm, desc)
+    for (name, arr), (_, dtype, off) in zip(sources, layout):
+        dst = np.ndarray((len(df),), dtype=np.dtype(dtype), buffer=shm.buf, offset=off)
+        np.take(arr, order, out=dst)
+        del dst
+    bounds = np.ndarray((len(symbols) + 1,), dtype=np.int64, buffer=shm.buf, offset=offsets_at)
+    bounds[:] = np.searchsorted(codes[order], np.arange(len(symbols) + 1))
+    del bounds
+    logger.info("Shared panel %s: %d rows, %d symbols, %.1f MiB", shm.name, len(df), len(symbols), offset / 2**20)
+    return panel
@@ -0,0 +1,194 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from src.features.kernels import rolling_sum
+from src.data.dtypes import DtypePolicy, FEATURES_DTYPE_POLICY
+
+
+@dataclass(frozen=True)
+class CrossSectionalConfig:
+    rank_cols: tuple[str, ...] = ("ret_lag_1", "ret_lag_5", "ret_lag_15", "ret_lag_60", "vol_logret_60", "dollar_volume")
+    zscore_cols: tuple[str, ...] = ("ret_lag_1", "ret_lag_5", "ret_lag_15", "ret_lag_60", "vol_logret_60")
+    demean_cols: tuple[str, ...] = ("ret_lag_1", "ret_lag_5", "ret_lag_15", "ret_lag_60")
+    beta_col: str = "logret_1"
+    beta_windows: tuple[int, ...] = (390,)
+    beta_min_periods: int | None = None  # common observations a beta window needs (default: half of it)
+    index: str = "equal"  # "equal" = equal-weight universe mean, otherwise a symbol in the universe
+    dtype_policy: DtypePolicy = FEATURES_DTYPE_POLICY
+
+    @property
+    def input_cols(self) -> list[str]:
+        cols = [*self.rank_cols, *self.zscore_cols, *self.demean_cols, self.beta_col]
+        return list(dict.fromkeys(cols))
+
+
+CS_PREFIXES = ("cs_rank_", "cs_z_", "cs_dm_", "beta_")
+
+
+def timestamps_ns(s: pd.Series) -> np.ndarray:
+    return pd.DatetimeIndex(pd.to_datetime(s, utc=True)).as_unit("ns").asi8
+
+
+def long_to_matrix(
+    df_long: pd.DataFrame,
+    value_cols: list[str],
+    symbols: list[str],
+    on: str = "timestamp_utc",
+    symbol_col: str = "symbol",
+) -> tuple[np.ndarray, np.ndarray, np.ndarray, dict[str, np.ndarray]]:
+    """
+    Scatters a long panel into dense (time x symbol) float64 matrices in one pass.
+
+    Returns (ts_grid_ns, row_pos, col_pos, {col: matrix}); row_pos/col_pos map each
+    input row to its cell so results can be gathered back with m[row_pos, col_pos].
+    Missing cells are NaN; duplicate keys keep the last row.
+    """
+    ts = timestamps_ns(df_long[on])
+    grid, row = np.unique(ts, return_inverse=True)
+    col = pd.Categorical(df_long[symbol_col].astype(str), categories=symbols).codes.astype(np.int64)
+    if (col < 0).any():
+        raise ValueError("long_to_matrix: panel contains symbols outside `symbols`")
+
+    mats: dict[str, np.ndarray] = {}
+    for c in value_cols:
+        m = np.full((len(grid), len(symbols)), np.nan, dtype=np.float64)
+        if c in df_long.columns:
+            m[row, col] = pd.to_numeric(df_long[c], errors="coerce").to_numpy(dtype=np.float64)
+        mats[c] = m
+    return grid, row, col, mats
+
+
+def cs_rank(m: np.ndarray) -> np.ndarray:
+    """
+    Per-row percentile rank in (0, 1], ties averaged, NaN ignored
+    (same values as pandas `rank(pct=True)` per timestamp).
+    """
+    t, n = m.shape
+    order = np.argsort(m, axis=1, kind="stable")  # NaN sorts last
+    s = np.take_along_axis(m, order, axis=1)
+    valid = ~np.isnan(s)
+    cnt = valid.sum(axis=1, keepdims=True)
+
+    idx = np.broadcast_to(np.arange(n), (t, n))
+    starts = np.ones((t, n), dtype=bool)
+    starts[:, 1:] = s[:, 1:] != s[:, :-1]
+    ends = np.ones((t, n), dtype=bool)
+    ends[:, :-1] = starts[:, 1:]
+
+    first = np.maximum.accumulate(np.where(starts, idx, 0), axis=1)
+    last = np.minimum.accumulate(np.where(ends, idx, n - 1)[:, ::-1], axis=1)[:, ::-1]
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        pct = np.where(valid, ((first + last) / 2.0 + 1.0) / cnt, np.nan)
+
+    out = np.empty_like(pct)
+    np.put_along_axis(out, order, pct, axis=1)
+    return out
+
+
+def _row_moments(m: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    valid = np.isfinite(m)
+    cnt = valid.sum(axis=1, keepdims=True)
+    x = np.where(valid, m, 0.0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = x.sum(axis=1, keepdims=True) / cnt
+        dev = np.where(valid, m - mean, 0.0)
+        var = (dev * dev).sum(axis=1, keepdims=True) / (cnt - 1)
+    return mean, var, cnt
+
+
+def cs_demean(m: np.ndarray) -> np.ndarray:
+    mean, _, _ = _row_moments(m)
+    return m - mean
+
+
+def cs_zscore(m: np.ndarray) -> np.ndarray:
+    """
+    Per-row z-score (ddof=1); NaN where fewer than 2 symbols or zero dispersion.
+    """
+    mean, var, cnt = _row_moments(m)
+    std = np.sqrt(var)
+    std[(cnt < 2) | ~(std > 0)] = np.nan
+    return (m - mean) / std
+
+
+def index_returns(r: np.ndarray, symbols: list[str], index: str = "equal") -> np.ndarray:
+    if index == "equal":
+        mean, _, _ = _row_moments(r)
+        return mean[:, 0]
+    if index not in symbols:
+        raise ValueError(f"Index symbol '{index}' not in universe {symbols}")
+    return r[:, symbols.index(index)]
+
+
+def rolling_beta(
+    r: np.ndarray,
+    mkt: np.ndarray,
+    windows: list[int],
+    min_periods: int | None = None,
+) -> dict[int, np.ndarray]:
+    """
+    Rolling OLS beta of each column of r (time x symbol) on mkt (time,).
+
+    Missing cells are skipped rather than propagated: the moment sums run over the rows where
+    both r and mkt are finite, with that count as the sample size, and a beta needs at least
+    min_periods such rows in its window (default half the window; pandas rolling(w,
+    min_periods) semantics, incl. the first rows). The count and all four moment sums for all
+    windows come from one rolling_sum sweep.
+    """
+    t, n = r.shape
+    m = np.broadcast_to(mkt[:, None], (t, n))
+    both = np.isfinite(r) & np.isfinite(m)
+    x = np.where(both, r, 0.0)
+    y = np.where(both, m, 0.0)
+
+    # zero rows in front, so windows shorter than w at the start are summed too
+    pad = max(windows) - 1
+    stacked = np.concatenate([both.astype(np.float64), x, y, x * y, y * y], axis=1)
+    stacked = np.concatenate([np.zeros((pad, stacked.shape[1])), stacked])
+    sums = rolling_sum(stacked, windows)
+
+    out: dict[int, np.ndarray] = {}
+    for w in windows:
+        s = sums[w][pad:]
+        cnt, sx, sy = s[:, :n], s[:, n:2 * n], s[:, 2 * n:3 * n]
+        sxy, syy = s[:, 3 * n:4 * n], s[:, 4 * n:]
+        mp = min_periods if min_periods is not None else max(w // 2, 2)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            cov = sxy - sx * sy / cnt
+            var = syy - sy * sy / cnt
+            out[w] = np.where((cnt >= mp) & (var > 0), cov / var, np.nan)
+    return out
+
+
+def cross_sectional_features(
+    df_long: pd.DataFrame,
+    symbols: list[str],
+    cfg: CrossSectionalConfig,
+) -> pd.DataFrame:
+    """
+    Adds cs_rank_{c}, cs_z_{c}, cs_dm_{c} and beta_{w} to a long multi-symbol panel
+    (rows aligned with the input). Everything is computed on time x symbol matrices.
+    """
+    grid, row, col, mats = long_to_matrix(df_long, cfg.input_cols, symbols)
+
+    new: dict[str, np.ndarray] = {}
+    for c in cfg.rank_cols:
+        new[f"cs_rank_{c}"] = cs_rank(mats[c])[row, col]
+    for c in cfg.zscore_cols:
+        new[f"cs_z_{c}"] = cs_zscore(mats[c])[row, col]
+    for c in cfg.demean_cols:
+        new[f"cs_dm_{c}"] = cs_demean(mats[c])[row, col]
+
+    if cfg.beta_windows:
+        r = mats[cfg.beta_col]
+        betas = rolling_beta(r, index_returns(r, symbols, cfg.index), list(cfg.beta_windows), cfg.beta_min_periods)
+        for w, b in betas.items():
+            new[f"beta_{w}"] = b[row, col]
+
+    keep = [c for c in df_long.columns if not c.startswith(CS_PREFIXES)]
+    return pd.concat([df_long[keep], pd.DataFrame(new, index=df_long.index)], axis=1)
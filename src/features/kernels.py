@@ -0,0 +1,227 @@
+from __future__ import annotations
+
+from typing import Sequence
+
+import numpy as np
+
+
+def _as_2d(x) -> tuple[np.ndarray, bool]:
+    """
+    Returns (float64 array shaped [time, n_cols], was_1d).
+    """
+    a = np.asarray(x, dtype=np.float64)
+    if a.ndim == 1:
+        return a[:, None], True
+    if a.ndim != 2:
+        raise ValueError(f"Expected 1-D or 2-D array (time x symbol), got ndim={a.ndim}")
+    return a, False
+
+
+def _check_windows(windows: Sequence[int]) -> list[int]:
+    ws = [int(w) for w in windows]
+    if any(w < 1 for w in ws):
+        raise ValueError(f"Rolling windows must be >= 1, got {ws}")
+    return ws
+
+
+def _prefix_sums(a: np.ndarray, with_squares: bool):
+    """
+    One sweep over the data producing prefix sums (row 0 is the zero row).
+
+    Numerical safeguards:
+      - each column is shifted by its first finite value before summing, so long
+        price-level series do not lose precision to cancellation
+      - non-finite values count as missing (they would otherwise poison every
+        later prefix difference)
+    """
+    n, k = a.shape
+    valid = np.isfinite(a)
+
+    shift = np.zeros(k, dtype=np.float64)
+    has_any = valid.any(axis=0)
+    first = valid.argmax(axis=0)
+    shift[has_any] = a[first[has_any], np.flatnonzero(has_any)]
+
+    z = np.where(valid, a - shift, 0.0)
+
+    s1 = np.zeros((n + 1, k), dtype=np.float64)
+    np.cumsum(z, axis=0, out=s1[1:])
+
+    # Missing-value counts are only needed when something is actually missing
+    cnt = None
+    if not valid.all():
+        cnt = np.zeros((n + 1, k), dtype=np.int32)
+        np.cumsum(valid, axis=0, out=cnt[1:])
+
+    s2 = None
+    if with_squares:
+        np.multiply(z, z, out=z)
+        s2 = np.zeros((n + 1, k), dtype=np.float64)
+        np.cumsum(z, axis=0, out=s2[1:])
+
+    return s1, s2, cnt, shift
+
+
+def _alloc(shape: tuple[int, int], w: int) -> np.ndarray:
+    r = np.empty(shape, dtype=np.float64)
+    r[: w - 1] = np.nan
+    return r
+
+
+def _mask_incomplete(seg: np.ndarray, cnt: np.ndarray | None, w: int) -> None:
+    if cnt is not None:
+        seg[(cnt[w:] - cnt[:-w]) < w] = np.nan
+
+
+def _finish(out: np.ndarray, squeeze: bool) -> np.ndarray:
+    return out[:, 0] if squeeze else out
+
+
+def rolling_sum(x, windows: Sequence[int]) -> dict[int, np.ndarray]:
+    """
+    Trailing rolling sums for several windows from one prefix-sum sweep.
+
+    Semantics match pandas `.rolling(w, min_periods=w).sum()`: a row is NaN
+    until w observations exist or when any value in its window is missing.
+    Accepts 1-D arrays or 2-D (time x symbol) arrays; returns {w: array}.
+    """
+    a, squeeze = _as_2d(x)
+    ws = _check_windows(windows)
+    s1, _, cnt, shift = _prefix_sums(a, with_squares=False)
+
+    out: dict[int, np.ndarray] = {}
+    for w in ws:
+        if w > a.shape[0]:
+            out[w] = _finish(np.full(a.shape, np.nan), squeeze)
+            continue
+        r = _alloc(a.shape, w)
+        seg = r[w - 1:]
+        np.subtract(s1[w:], s1[:-w], out=seg)
+        seg += w * shift
+        _mask_incomplete(seg, cnt, w)
+        out[w] = _finish(r, squeeze)
+    return out
+
+
+def rolling_mean(x, windows: Sequence[int]) -> dict[int, np.ndarray]:
+    """
+    Trailing rolling means, pandas `.rolling(w, min_periods=w).mean()` semantics.
+    """
+    a, squeeze = _as_2d(x)
+    ws = _check_windows(windows)
+    s1, _, cnt, shift = _prefix_sums(a, with_squares=False)
+
+    out: dict[int, np.ndarray] = {}
+    for w in ws:
+        if w > a.shape[0]:
+            out[w] = _finish(np.full(a.shape, np.nan), squeeze)
+            continue
+        r = _alloc(a.shape, w)
+        seg = r[w - 1:]
+        np.subtract(s1[w:], s1[:-w], out=seg)
+        seg /= w
+        seg += shift
+        _mask_incomplete(seg, cnt, w)
+        out[w] = _finish(r, squeeze)
+    return out
+
+
+def rolling_std(x, windows: Sequence[int], ddof: int = 1) -> dict[int, np.ndarray]:
+    """
+    Trailing rolling standard deviations, pandas `.rolling(w, min_periods=w).std()`
+    semantics (ddof=1 by default).
+
+    Sums and sums of squares are taken on shifted data and the variance is clamped
+    at zero, so constant windows give 0.0 rather than tiny negative noise.
+    """
+    a, squeeze = _as_2d(x)
+    ws = _check_windows(windows)
+    s1, s2, cnt, _ = _prefix_sums(a, with_squares=True)
+
+    out: dict[int, np.ndarray] = {}
+    for w in ws:
+        if w - ddof <= 0 or w > a.shape[0]:
+            out[w] = _finish(np.full(a.shape, np.nan), squeeze)
+            continue
+        r = _alloc(a.shape, w)
+        seg = r[w - 1:]
+        sx = s1[w:] - s1[:-w]
+        np.subtract(s2[w:], s2[:-w], out=seg)
+        sx *= sx
+        sx /= w
+        seg -= sx
+        seg /= (w - ddof)
+        np.maximum(seg, 0.0, out=seg)
+        np.sqrt(seg, out=seg)
+        _mask_incomplete(seg, cnt, w)
+        out[w] = _finish(r, squeeze)
+    return out
+
+
+def _rolling_extreme(x, windows: Sequence[int], op) -> dict[int, np.ndarray]:
+    """
+    Sparse-table (doubling) rolling min/max.
+
+    Level k holds the extreme of the trailing 2**k rows; any window w is the
+    combination of two overlapping level-floor(log2 w) blocks. All windows are
+    served from a single sweep of log2(max window) levels. NaN propagates, which
+    matches pandas with min_periods=w.
+    """
+    a, squeeze = _as_2d(x)
+    ws = _check_windows(windows)
+    n = a.shape[0]
+
+    need = {w: int(np.floor(np.log2(w))) for w in ws}
+    top = max(need.values()) if need else 0
+
+    out: dict[int, np.ndarray] = {}
+    level = a.copy()
+    span = 1
+    for k in range(top + 1):
+        if k > 0:
+            prev = span
+            span *= 2
+            # level[i] = op(level[i], level[i - prev]) for the trailing 2**k block
+            op(level[prev:], level[:-prev], out=level[prev:])
+        for w, kw in need.items():
+            if kw != k:
+                continue
+            r = np.full(a.shape, np.nan, dtype=np.float64)
+            if w <= n:
+                off = w - span
+                op(level[w - 1:], level[w - 1 - off:n - off], out=r[w - 1:])
+            out[w] = _finish(r, squeeze)
+    return out
+
+
+def rolling_min(x, windows: Sequence[int]) -> dict[int, np.ndarray]:
+    """
+    Trailing rolling minima, pandas `.rolling(w, min_periods=w).min()` semantics.
+    """
+    return _rolling_extreme(x, windows, np.minimum)
+
+
+def rolling_max(x, windows: Sequence[int]) -> dict[int, np.ndarray]:
+    """
+    Trailing rolling maxima, pandas `.rolling(w, min_periods=w).max()` semantics.
+    """
+    return _rolling_extreme(x, windows, np.maximum)
+
+
+def true_range(high, low, close) -> np.ndarray:
+    """
+    max(|high-low|, |high-prev_close|, |low-prev_close|) without building a frame.
+    Missing terms are skipped (same as a row-wise DataFrame max).
+    """
+    h = np.asarray(high, dtype=np.float64)
+    lo = np.asarray(low, dtype=np.float64)
+    c = np.asarray(close, dtype=np.float64)
+
+    prev = np.empty_like(c)
+    prev[:1] = np.nan
+    prev[1:] = c[:-1]
+
+    tr = np.abs(h - lo)
+    np.fmax(tr, np.abs(h - prev), out=tr)
+    np.fmax(tr, np.abs(lo - prev), out=tr)
+    return tr
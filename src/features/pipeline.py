@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import logging
+import uuid
 from dataclasses import dataclass
 from datetime import timedelta
 from pathlib import Path
@@ -8,35 +9,162 @@ from pathlib import Path
 import pandas as pd
 
 from src.utils.io import atomic_write_parquet
+from src.utils.fingerprint import (
+    PartitionFingerprint,
+    PartitionTask,
+    code_version,
+    config_sha1,
+    partition_inputs,
+    read_fingerprint,
+    rebuild_reason,
+    write_fingerprint,
+)
 from src.features.technical import add_technical_features
 from src.features.microstructure import add_microstructure_features
 from src.features.return_matrix import add_lagged_returns
+from src.features.cross_sectional import CrossSectionalConfig, cross_sectional_features
+from src.data.calendar import TradingCalendar, default_calendar
+from src.data.features_store import FeaturesStore
+from src.data.dtypes import DtypePolicy, FEATURES_DTYPE_POLICY
 
 logger = logging.getLogger(__name__)
 
+FEATURES_STAGE = "features"
+CROSS_SECTIONAL_STAGE = "cross_sectional"
+_FEATURES_CODE = (
+    "src.features.pipeline",
+    "src.features.technical",
+    "src.features.microstructure",
+    "src.features.return_matrix",
+    "src.features.kernels",
+)
+_CROSS_SECTIONAL_CODE = (
+    "src.features.pipeline",
+    "src.features.cross_sectional",
+    "src.features.kernels",
+)
+
 
 @dataclass(frozen=True)
 class FeatureConfig:
-    vol_windows: tuple[int, ...] = (30, 60, 390)
+    vol_windows: tuple[int, ...] = (30, 60)
+    range_vol_windows: tuple[int, ...] = (15, 30, 60)  # vol_{pk,gk,rs,yz}_{w}
     atr_window: int = 14
     return_lags: tuple[int, ...] = (1, 5, 15, 30, 60)
+    dtype_policy: DtypePolicy = FEATURES_DTYPE_POLICY
 
     @property
     def lookback_bars(self) -> int:
-        return max([self.atr_window, *self.vol_windows, *self.return_lags])
+        # yz also needs the close before its first bar (overnight/gap term)
+        range_bars = [w + 1 for w in self.range_vol_windows]
+        return max([self.atr_window, *self.vol_windows, *range_bars, *self.return_lags])
 
 
-def _compute_features_one_symbol(panel_sym: pd.DataFrame, cfg: FeatureConfig) -> pd.DataFrame:
+def compute_features_one_symbol(panel_sym: pd.DataFrame, cfg: FeatureConfig) -> pd.DataFrame:
     g = panel_sym.sort_values("timestamp_utc").copy()
 
     # Technical + microstructure
-    g = add_technical_features(g, vol_windows=list(cfg.vol_windows), atr_window=cfg.atr_window)
+    g = add_technical_features(
+        g,
+        vol_windows=list(cfg.vol_windows),
+        atr_window=cfg.atr_window,
+        range_vol_windows=list(cfg.range_vol_windows),
+    )
     g = add_microstructure_features(g)
     g = add_lagged_returns(g, lags=list(cfg.return_lags))
 
     return g
 
 
+def feature_load_window(day: str, cfg: FeatureConfig, calendar: TradingCalendar | None = None):
+    """
+    (day_start, day_end, load_start, load_end) of one feature partition. The lookback is
+    cfg.lookback_bars bars of the RTH grid (calendar), so it reaches back over the night,
+    weekends and holidays; an ETH store holds at least as many bars in that span.
+    """
+    cal = calendar or default_calendar()
+    day_start = pd.Timestamp(day, tz="UTC")
+    day_end = day_start + pd.Timedelta(days=1)
+    load_start = cal.shift_bars(day_start, -cfg.lookback_bars).isoformat()
+    # load_bars/partition_paths treat end as inclusive: stop just short of the next day, so
+    # the next date partition is neither read nor part of the fingerprint inputs
+    load_end = (day_end - pd.Timedelta(1, "ns")).isoformat()
+    return day_start, day_end, load_start, load_end
+
+
+def write_feature_partition(
+    part_dir: Path,
+    feats: pd.DataFrame,
+    day_start: pd.Timestamp,
+    day_end: pd.Timestamp,
+    cfg: FeatureConfig,
+    fingerprint: PartitionFingerprint,
+) -> int:
+    """
+    Writes the rows of `feats` inside [day_start, day_end) as one feature partition plus its
+    fingerprint sidecar (a stale parquet is removed when the day is empty). Returns rows written.
+
+    Each write gets a fresh build id: the rewrite drops the cs_*/beta_* columns even when the
+    digest is unchanged (forced rebuild), and the cross-sectional stage keys on the build id.
+    """
+    mask = (feats["timestamp_utc"] >= day_start) & (feats["timestamp_utc"] < day_end)
+    out = feats.loc[mask].copy()
+    out_path = part_dir / "features.parquet"
+    if not out.empty:
+        atomic_write_parquet(cfg.dtype_policy.apply(out), out_path)
+    elif out_path.exists():
+        out_path.unlink()
+    write_fingerprint(part_dir, FEATURES_STAGE, fingerprint, rows=len(out), build=uuid.uuid4().hex)
+    return len(out)
+
+
+def _all_days(start: str, end: str, calendar: TradingCalendar | None = None) -> set[str]:
+    return set((calendar or default_calendar()).partition_days(start, end))
+
+
+def plan_feature_partitions(
+    store,
+    symbols: list[str],
+    start: str,
+    end: str,
+    cfg: FeatureConfig,
+    out_root: Path = Path("data/features_1m"),
+    force_days: set[str] | None = None,
+    calendar: TradingCalendar | None = None,
+) -> list[PartitionTask]:
+    """
+    Lists the feature partitions whose input fingerprint (bars partitions incl. lookback,
+    config, code) differs from the one recorded at their last build, with the reason.
+    Only partition dates that overlap a trading session (calendar) are considered.
+    """
+    days = (calendar or default_calendar()).partition_days(start, end)
+    force_days = force_days or set()
+    cfg_sha = config_sha1(cfg)
+    code_sha = code_version(*_FEATURES_CODE)
+
+    tasks: list[PartitionTask] = []
+    for sym in symbols:
+        for day in days:
+            _, _, load_start, load_end = feature_load_window(day, cfg, calendar)
+
+            inputs = partition_inputs(store.partition_paths(sym, load_start, load_end))
+            if not inputs:
+                continue
+            fp = PartitionFingerprint(inputs=inputs, config=cfg_sha, code=code_sha)
+
+            part_dir = out_root / f"symbol={sym}" / f"date={day}"
+            reason = rebuild_reason(
+                read_fingerprint(part_dir, FEATURES_STAGE),
+                fp,
+                output_exists=(part_dir / "features.parquet").exists(),
+            )
+            if day in force_days:
+                reason = "forced"
+            if reason is not None:
+                tasks.append(PartitionTask(symbol=sym, day=day, reason=reason, fingerprint=fp))
+    return tasks
+
+
 def build_feature_partitions(
     store,
     symbols: list[str],
@@ -46,44 +174,141 @@ def build_feature_partitions(
     out_root: Path = Path("data/features_1m"),
     skip_existing: bool = True,
     force_days: set[str] | None = None,
+    calendar: TradingCalendar | None = None,
 ) -> None:
     """
     Writes:
       data/features_1m/symbol=XYZ/date=YYYY-MM-DD/features.parquet
+      data/features_1m/symbol=XYZ/date=YYYY-MM-DD/_fingerprint.json
 
     Uses lookback to compute rolling features correctly at day boundaries.
+    With skip_existing, only partitions whose input fingerprint changed are rebuilt.
     """
-    days = pd.date_range(start=start, end=end, freq="D")
-    lookback = cfg.lookback_bars
-    force_days = force_days or set()
+    if not skip_existing:
+        force_days = _all_days(start, end, calendar)
+    tasks = plan_feature_partitions(store, symbols, start, end, cfg, out_root, force_days, calendar)
 
-    for sym in symbols:
-        logger.info("Features: symbol=%s", sym)
+    for t in tasks:
+        logger.info("Features: symbol=%s date=%s (%s)", t.symbol, t.day, t.reason)
 
-        for d in days:
-            day = d.date().isoformat()
+        day_start, day_end, load_start, load_end = feature_load_window(t.day, cfg, calendar)
+        part_dir = out_root / f"symbol={t.symbol}" / f"date={t.day}"
 
-            out_path = out_root / f"symbol={sym}" / f"date={day}" / "features.parquet"
-            if skip_existing and out_path.exists() and day not in force_days:
-                continue
+        bars = store.load_bars(t.symbol, start=load_start, end=load_end)
+        # no bars in the window: an empty partition is recorded (rows=0), so it is not re-planned
+        feats = bars if bars.empty else compute_features_one_symbol(bars, cfg)
+        write_feature_partition(part_dir, feats, day_start, day_end, cfg, t.fingerprint)
+
+    logger.info("Features partitions complete: %s", out_root)
+
+
+def _cs_window_days(day: str, cfg: CrossSectionalConfig, calendar: TradingCalendar | None = None) -> list[str]:
+    """
+    Partition dates loaded for the cross-sectional columns of `day`: the day itself plus the
+    partitions of just enough earlier sessions to fill the longest beta window (counted in
+    RTH minutes, so half days and ETH stores are covered too), oldest first.
+    """
+    cal = calendar or default_calendar()
+    need = max(cfg.beta_windows, default=1) - 1
+    if need <= 0:
+        return [day]
+    prev = (pd.Timestamp(day) - pd.Timedelta(days=1)).date().isoformat()
+    sessions = cal.previous_sessions(prev, need // 180 + 1)  # 180: shorter than any half day
+    first, n = sessions[-1], 0
+    for d in reversed(sessions):
+        lo, hi = cal.session_bounds(d, "rth")
+        first, n = d, n + int((hi - lo) / pd.Timedelta(minutes=1))
+        if n >= need:
+            break
+    return sorted({*cal.partition_days(first, prev), day})
 
-            day_start = pd.Timestamp(day, tz="UTC")
-            day_end = day_start + pd.Timedelta(days=1)
 
-            load_start = (day_start - pd.Timedelta(minutes=lookback)).isoformat()
-            load_end = (day_end).isoformat()
+def plan_cross_sectional_partitions(
+    symbols: list[str],
+    start: str,
+    end: str,
+    cfg: CrossSectionalConfig,
+    features_root: Path = Path("data/features_1m"),
+    force_days: set[str] | None = None,
+    calendar: TradingCalendar | None = None,
+) -> list[PartitionTask]:
+    """
+    Cross-sectional columns of (symbol, day) depend on the per-symbol feature partitions of
+    *every* symbol over the beta lookback, so the fingerprint inputs are the recorded
+    feature-stage build ids of all of them (digests for sidecars written before build ids).
+    """
+    days = (calendar or default_calendar()).partition_days(start, end)
+    force_days = force_days or set()
+    cfg_sha = config_sha1(cfg, symbols=sorted(symbols))
+    code_sha = code_version(*_CROSS_SECTIONAL_CODE)
+
+    tasks: list[PartitionTask] = []
+    for day in days:
+        inputs: dict[str, str] = {}
+        for sym in symbols:
+            for wd in _cs_window_days(day, cfg, calendar):
+                part_dir = features_root / f"symbol={sym}" / f"date={wd}"
+                if not (part_dir / "features.parquet").exists():
+                    continue
+                rec = read_fingerprint(part_dir, FEATURES_STAGE) or {}
+                inputs[f"symbol={sym}/date={wd}"] = rec.get("build", rec.get("digest", "unknown"))
+        fp = PartitionFingerprint(inputs=inputs, config=cfg_sha, code=code_sha)
 
-            bars = store.load_bars(sym, start=load_start, end=load_end)
-            if bars.empty:
+        for sym in symbols:
+            part_dir = features_root / f"symbol={sym}" / f"date={day}"
+            if not (part_dir / "features.parquet").exists():
                 continue
+            reason = rebuild_reason(read_fingerprint(part_dir, CROSS_SECTIONAL_STAGE), fp, output_exists=True)
+            if day in force_days:
+                reason = "forced"
+            if reason is not None:
+                tasks.append(PartitionTask(symbol=sym, day=day, reason=reason, fingerprint=fp))
+    return tasks
 
-            feats = _compute_features_one_symbol(bars, cfg)
 
-            mask = (feats["timestamp_utc"] >= day_start) & (feats["timestamp_utc"] < day_end)
-            out = feats.loc[mask].copy()
+def build_cross_sectional_partitions(
+    symbols: list[str],
+    start: str,
+    end: str,
+    cfg: CrossSectionalConfig,
+    features_root: Path = Path("data/features_1m"),
+    force_days: set[str] | None = None,
+    calendar: TradingCalendar | None = None,
+) -> None:
+    """
+    Cross-sectional stage (runs after build_feature_partitions).
+
+    For each day with stale partitions, loads the per-symbol features of the whole universe
+    (plus the sessions the beta window reaches back to) once, computes per-timestamp ranks, z-scores,
+    demeaned values and rolling betas on time x symbol matrices, and rewrites the affected
+    data/features_1m/symbol=XYZ/date=YYYY-MM-DD/features.parquet with the cs_*/beta_* columns.
+    """
+    tasks = plan_cross_sectional_partitions(symbols, start, end, cfg, features_root, force_days, calendar)
+    fs = FeaturesStore(root_dir=features_root, calendar=calendar)
+
+    by_day: dict[str, list[PartitionTask]] = {}
+    for t in tasks:
+        by_day.setdefault(t.day, []).append(t)
+
+    for day, day_tasks in sorted(by_day.items()):
+        logger.info("Cross-sectional: date=%s partitions=%d (%s)", day, len(day_tasks), day_tasks[0].reason)
+
+        window = _cs_window_days(day, cfg, calendar)
+        panel = fs.load_panel(symbols, window[0], window[-1])
+        if panel.empty:
+            continue
+        panel = cross_sectional_features(panel.reset_index(drop=True), symbols, cfg)
+
+        day_start = pd.Timestamp(day, tz="UTC")
+        day_end = day_start + pd.Timedelta(days=1)
+        in_day = (panel["timestamp_utc"] >= day_start) & (panel["timestamp_utc"] < day_end)
+
+        for t in day_tasks:
+            part_dir = features_root / f"symbol={t.symbol}" / f"date={day}"
+            out = panel.loc[in_day & (panel["symbol"] == t.symbol)]
             if out.empty:
                 continue
+            atomic_write_parquet(cfg.dtype_policy.apply(out.sort_values("timestamp_utc")), part_dir / "features.parquet")
+            write_fingerprint(part_dir, CROSS_SECTIONAL_STAGE, t.fingerprint, rows=len(out))
 
-            atomic_write_parquet(out, out_path)
-
-    logger.info("Features partitions complete: %s", out_root)
+    logger.info("Cross-sectional partitions complete: %s", features_root)
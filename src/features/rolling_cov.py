@@ -0,0 +1,290 @@
+from __future__ import annotations
+
+import json
+import logging
+from pathlib import Path
+from typing import Iterator
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class RollingCovariance:
+    """
+    Incrementally maintained rolling (or exponentially weighted) covariance and correlation
+    matrices of a fixed universe's returns, advanced bar by bar.
+
+    Modes:
+      - window=w     trailing w bars; each step adds the new row and removes the one leaving
+                     the window as rank-one updates of the moment sums, O(N^2) per bar
+                     instead of O(N^2 * w) for a recompute
+      - halflife=h   exponential weights (pandas ewm(halflife=h, adjust=True), ignore_na=False):
+                     the sums decay by (1 - alpha) per bar and the new row is added
+
+    Missing values (NaN) are handled pairwise: for every (i, j) the sums only cover bars where
+    both symbols are observed, with per-pair observation counts, so cov()/corr() match pandas'
+    pairwise-complete rolling/ewm cov and corr. Pairs with fewer than min_periods common
+    observations are NaN.
+
+    Moment sums kept per pair (N x N each):
+      sxy  sum x_i x_j       sx   sum x_i [j observed]     sq  sum x_i^2 [j observed]
+      w    sum of weights    w2   sum of squared weights (ewm only)    n  common observations
+
+    Blocks of bars (extend) fold into the sums with one matrix product, so updating at a coarser
+    output cadence is cheaper still. Rolling mode recomputes the sums from its ring buffer every
+    refresh_every bars to bound the rounding drift of repeated add/remove.
+
+    State round-trips through save()/load() so a live process can resume where it stopped.
+    """
+
+    def __init__(
+        self,
+        symbols: list[str],
+        window: int | None = None,
+        halflife: float | None = None,
+        min_periods: int | None = None,
+        ddof: int = 1,
+        refresh_every: int | None = None,
+    ):
+        if (window is None) == (halflife is None):
+            raise ValueError("RollingCovariance: pass exactly one of window or halflife")
+        if window is not None and window < 2:
+            raise ValueError(f"window must be >= 2, got {window}")
+        if halflife is not None and not halflife > 0:
+            raise ValueError(f"halflife must be > 0, got {halflife}")
+        self.symbols = [str(s) for s in symbols]
+        self.window = None if window is None else int(window)
+        self.halflife = None if halflife is None else float(halflife)
+        self.decay = 1.0 if halflife is None else float(np.exp(np.log(0.5) / halflife))
+        self.min_periods = int(min_periods) if min_periods is not None else (self.window or 1)
+        self.ddof = int(ddof)
+        self.refresh_every = int(refresh_every) if refresh_every else 16 * (self.window or 0)
+
+        n = len(self.symbols)
+        self.sxy = np.zeros((n, n))
+        self.sx = np.zeros((n, n))
+        self.sq = np.zeros((n, n))
+        self.w = np.zeros((n, n))
+        self.w2 = np.zeros((n, n)) if self.window is None else None
+        self.n = np.zeros((n, n)) if self.window is None else None
+        self.ring = np.full((self.window, n), np.nan) if self.window is not None else None
+        self.pos = 0  # next ring slot
+        self.seen = 0  # bars consumed since the start
+        self.since_refresh = 0
+        self.last_ts: int | None = None
+
+    # ---- updates ----
+
+    def _fold(self, x: np.ndarray, weights: np.ndarray, weights2: np.ndarray | None = None) -> None:
+        """
+        Adds sum_t weights[t] * (moment outer products of row t) to the sums; negative weights
+        remove rows. One GEMM per sum for the whole block.
+        """
+        m = np.isfinite(x)
+        z = np.where(m, x, 0.0)
+        mf = m.astype(np.float64)
+        zw = z * weights[:, None]
+        mw = mf * weights[:, None]
+        self.sxy += zw.T @ z
+        self.sx += zw.T @ mf
+        self.sq += (zw * z).T @ mf
+        self.w += mw.T @ mf
+        if self.w2 is not None:
+            self.w2 += (mf * weights2[:, None]).T @ mf
+            self.n += mf.T @ mf
+
+    def _ring_rows(self, first: int, k: int) -> np.ndarray:
+        """
+        k ring rows in arrival order starting at slot `first`.
+        """
+        idx = (first + np.arange(k)) % self.window
+        return self.ring[idx]
+
+    def _recompute(self) -> None:
+        k = min(self.seen, self.window)
+        for a in (self.sxy, self.sx, self.sq, self.w):
+            a.fill(0.0)
+        if k:
+            rows = self._ring_rows((self.pos - k) % self.window, k)
+            self._fold(rows, np.ones(k))
+        self.since_refresh = 0
+
+    def extend(self, x, ts: int | None = None) -> None:
+        """
+        Advances by a block of bars x (k x N, NaN = missing); `ts` records the last bar's
+        timestamp (ns) for checkpoints.
+        """
+        x = np.asarray(x, dtype=np.float64)
+        if x.ndim == 1:
+            x = x[None, :]
+        if x.ndim != 2 or x.shape[1] != len(self.symbols):
+            raise ValueError(f"Expected rows of {len(self.symbols)} symbols, got shape {x.shape}")
+        k = len(x)
+        if k == 0:
+            return
+
+        if self.window is None:
+            # decay the old state by lambda^k, weight row t by lambda^(k-1-t)
+            lam = self.decay
+            for a in (self.sxy, self.sx, self.sq, self.w):
+                a *= lam ** k
+            self.w2 *= lam ** (2 * k)
+            wts = lam ** np.arange(k - 1, -1, -1, dtype=np.float64)
+            self._fold(x, wts, wts * wts)
+        elif k >= self.window:
+            self.ring[:] = x[-self.window:]
+            self.pos = 0
+            self.seen += k
+            self._recompute()
+        else:
+            n_in = min(self.seen, self.window)
+            n_out = max(0, n_in + k - self.window)
+            if n_out:
+                old = self._ring_rows((self.pos - n_in) % self.window, n_out)
+                self._fold(np.concatenate([x, old]), np.r_[np.ones(k), -np.ones(n_out)])
+            else:
+                self._fold(x, np.ones(k))
+            idx = (self.pos + np.arange(k)) % self.window
+            self.ring[idx] = x
+            self.pos = int((self.pos + k) % self.window)
+            self.seen += k
+            self.since_refresh += k
+            if self.since_refresh >= self.refresh_every:
+                self._recompute()
+
+        if self.window is None:
+            self.seen += k
+        if ts is not None:
+            self.last_ts = int(ts)
+
+    def update(self, x, ts: int | None = None) -> None:
+        """
+        Advances by one bar (N,) of returns.
+        """
+        self.extend(np.asarray(x, dtype=np.float64)[None, :], ts=ts)
+
+    # ---- outputs ----
+
+    def counts(self) -> np.ndarray:
+        """
+        Common observations per pair in the current window (all observations for ewm).
+        """
+        return (self.w if self.window is not None else self.n).round().astype(np.int64)
+
+    def _short(self) -> np.ndarray:
+        # counts are whole numbers held as floats; compare without materialising counts()
+        return (self.w if self.window is not None else self.n) < self.min_periods - 0.5
+
+    def _centered(self) -> np.ndarray:
+        """
+        Biased (weight-normalised) covariance per pair, built in place; NaN where no weight.
+        """
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mx = np.divide(self.sx, self.w)
+            out = np.divide(self.sxy, self.w)
+            mx *= mx.T
+            out -= mx
+        return out
+
+    def cov(self) -> np.ndarray:
+        """
+        N x N covariance: ddof-corrected for rolling windows, pandas' bias=False correction
+        W^2 / (W^2 - sum w^2) for ewm.
+        """
+        out = self._centered()
+        w = self.w
+        with np.errstate(invalid="ignore", divide="ignore"):
+            if self.window is not None:
+                den = w - self.ddof
+                out *= w
+            else:
+                w2 = w * w
+                den = w2 - self.w2
+                out *= w2
+            out /= den
+        out[~(den > 0) | self._short()] = np.nan
+        return out
+
+    def corr(self) -> np.ndarray:
+        """
+        N x N correlation, each pair's variances taken over that pair's common observations.
+        """
+        out = self._centered()
+        with np.errstate(invalid="ignore", divide="ignore"):
+            var = np.divide(self.sx, self.w)
+            var *= var
+            np.subtract(np.divide(self.sq, self.w), var, out=var)  # var of i over bars where j is observed
+            var *= var.T
+            np.sqrt(var, out=var)
+            out /= var
+        out[~(var > 0) | self._short()] = np.nan
+        np.clip(out, -1.0, 1.0, out=out)
+        return out
+
+    def run(self, r, ts=None, every: int = 1, what: str = "cov") -> Iterator[tuple[int | None, np.ndarray]]:
+        """
+        Feeds a (T x N) return matrix in blocks of `every` bars and yields (ts_ns, matrix)
+        after each block; `what` is "cov" or "corr".
+        """
+        if what not in ("cov", "corr"):
+            raise ValueError(f"what must be 'cov' or 'corr', got {what!r}")
+        r = np.asarray(r, dtype=np.float64)
+        out = self.cov if what == "cov" else self.corr
+        for a in range(0, len(r), every):
+            b = min(a + every, len(r))
+            t = None if ts is None else int(ts[b - 1])
+            self.extend(r[a:b], ts=t)
+            yield t, out()
+
+    # ---- checkpoints ----
+
+    def save(self, path: Path) -> Path:
+        """
+        Writes the full state to one .npz (atomically via a temp file).
+        """
+        path = Path(path)
+        meta = {
+            "symbols": self.symbols,
+            "window": self.window,
+            "halflife": self.halflife,
+            "min_periods": self.min_periods,
+            "ddof": self.ddof,
+            "refresh_every": self.refresh_every,
+            "pos": self.pos,
+            "seen": self.seen,
+            "since_refresh": self.since_refresh,
+            "last_ts": self.last_ts,
+        }
+        arrays = {"sxy": self.sxy, "sx": self.sx, "sq": self.sq, "w": self.w}
+        if self.window is None:
+            arrays.update(w2=self.w2, n=self.n)
+        else:
+            arrays["ring"] = self.ring
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(path.name + ".tmp.npz")
+        np.savez(tmp, meta=np.array(json.dumps(meta)), **arrays)
+        tmp.replace(path)
+        logger.info("Saved rolling covariance state (%d symbols, %d bars) to %s", len(self.symbols), self.seen, path)
+        return path
+
+    @classmethod
+    def load(cls, path: Path) -> RollingCovariance:
+        with np.load(path) as z:
+            meta = json.loads(str(z["meta"]))
+            eng = cls(
+                meta["symbols"],
+                window=meta["window"],
+                halflife=meta["halflife"],
+                min_periods=meta["min_periods"],
+                ddof=meta["ddof"],
+                refresh_every=meta["refresh_every"],
+            )
+            for name in ("sxy", "sx", "sq", "w", "w2", "n", "ring"):
+                if name in z.files:
+                    setattr(eng, name, z[name].copy())
+        eng.pos = meta["pos"]
+        eng.seen = meta["seen"]
+        eng.since_refresh = meta["since_refresh"]
+        eng.last_ts = meta["last_ts"]
+        return eng
@@ -3,6 +3,10 @@ from __future__ import annotations
 import numpy as np
 import pandas as pd
 
+from src.features.kernels import rolling_mean, rolling_std, rolling_sum, true_range
+
+RANGE_VOL_ESTIMATORS = ("pk", "gk", "rs", "yz")
+
 
 def add_basic_returns(g: pd.DataFrame) -> pd.DataFrame:
     g = g.sort_values("timestamp_utc").copy()
@@ -13,22 +17,77 @@ def add_basic_returns(g: pd.DataFrame) -> pd.DataFrame:
 
 def add_rolling_vol(g: pd.DataFrame, windows: list[int]) -> pd.DataFrame:
     g = g.sort_values("timestamp_utc").copy()
+    vols = rolling_std(g["logret_1"].to_numpy(dtype=float), windows)
     for w in windows:
-        g[f"vol_logret_{w}"] = g["logret_1"].rolling(w, min_periods=w).std()
+        g[f"vol_logret_{w}"] = vols[w]
     return g
 
 
+def range_vol(open_, high, low, close, windows: list[int]) -> dict[str, dict[int, np.ndarray]]:
+    """
+    OHLC range-based volatility (per-bar log scale, like vol_logret_{w}) for all windows.
+
+    Estimators (RANGE_VOL_ESTIMATORS), with u = ln(H/O), d = ln(L/O), c = ln(C/O) and
+    o = ln(O / previous C):
+      pk  Parkinson        mean of ln(H/L)^2 / (4 ln 2)
+      gk  Garman-Klass     mean of 0.5 ln(H/L)^2 - (2 ln 2 - 1) c^2
+      rs  Rogers-Satchell  mean of u (u - c) + d (d - c)   (drift independent)
+      yz  Yang-Zhang       var(o) + k var(c) + (1 - k) rs^2, k = 0.34 / (1.34 + (w + 1) / (w - 1))
+
+    The per-bar terms are stacked into one matrix and every window comes out of a single
+    rolling_sum sweep. A window with any missing bar is NaN (pandas min_periods=w); variances
+    are clamped at zero before the square root. yz needs w >= 2.
+    """
+    o_ = np.asarray(open_, dtype=np.float64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        hl = np.log(np.asarray(high, dtype=np.float64) / np.asarray(low, dtype=np.float64))
+        u = np.log(np.asarray(high, dtype=np.float64) / o_)
+        d = np.log(np.asarray(low, dtype=np.float64) / o_)
+        c_all = np.asarray(close, dtype=np.float64)
+        c = np.log(c_all / o_)
+        gap = np.full_like(c, np.nan)
+        gap[1:] = np.log(o_[1:] / c_all[:-1])
+
+    hl2 = hl * hl
+    rs = u * (u - c) + d * (d - c)
+    terms = np.column_stack([
+        hl2 / (4.0 * np.log(2.0)),
+        0.5 * hl2 - (2.0 * np.log(2.0) - 1.0) * c * c,
+        rs,
+        gap, gap * gap,
+        c, c * c,
+    ])
+    sums = rolling_sum(terms, windows)
+
+    out: dict[str, dict[int, np.ndarray]] = {e: {} for e in RANGE_VOL_ESTIMATORS}
+    for w in windows:
+        s = sums[w] / w
+        with np.errstate(invalid="ignore"):
+            out["pk"][w] = np.sqrt(np.maximum(s[:, 0], 0.0))
+            out["gk"][w] = np.sqrt(np.maximum(s[:, 1], 0.0))
+            out["rs"][w] = np.sqrt(np.maximum(s[:, 2], 0.0))
+            if w < 2:
+                out["yz"][w] = np.full(len(s), np.nan)
+                continue
+            var_o = (s[:, 4] - s[:, 3] * s[:, 3]) * (w / (w - 1))
+            var_c = (s[:, 6] - s[:, 5] * s[:, 5]) * (w / (w - 1))
+            k = 0.34 / (1.34 + (w + 1) / (w - 1))
+            yz = np.maximum(var_o, 0.0) + k * np.maximum(var_c, 0.0) + (1.0 - k) * np.maximum(s[:, 2], 0.0)
+            out["yz"][w] = np.sqrt(yz)
+    return out
+
+
 def add_true_range_atr(g: pd.DataFrame, atr_window: int = 14) -> pd.DataFrame:
     g = g.sort_values("timestamp_utc").copy()
-    prev_close = g["close"].shift(1)
-    tr1 = g["high"] - g["low"]
-    tr2 = (g["high"] - prev_close).abs()
-    tr3 = (g["low"] - prev_close).abs()
-    g["true_range"] = pd.concat([tr1, tr2, tr3], axis=1).max(axis=1)
-    g[f"atr_{atr_window}"] = g["true_range"].rolling(atr_window, min_periods=atr_window).mean()
+    tr = true_range(g["high"].to_numpy(dtype=float), g["low"].to_numpy(dtype=float), g["close"].to_numpy(dtype=float))
+    g["true_range"] = tr
+    g[f"atr_{atr_window}"] = rolling_mean(tr, [atr_window])[atr_window]
     return g
 
-def _add_technical_one_symbol(g: pd.DataFrame, vol_windows: list[int], atr_window: int) -> pd.DataFrame:
+
+def _add_technical_one_symbol(
+    g: pd.DataFrame, vol_windows: list[int], atr_window: int, range_vol_windows: list[int]
+) -> pd.DataFrame:
     g = g.sort_values("timestamp_utc").copy()
 
     # Explicit no-fill to avoid pandas FutureWarning and accidental leakage-ish behavior
@@ -38,23 +97,34 @@ def _add_technical_one_symbol(g: pd.DataFrame, vol_windows: list[int], atr_windo
     close = g["close"].astype(float)
     g["logret_1"] = np.log(close).diff()
 
-    # rolling vol on log returns
+    # rolling vol on log returns (all windows from one prefix-sum sweep)
+    vols = rolling_std(g["logret_1"].to_numpy(dtype=float), vol_windows)
     for w in vol_windows:
-        g[f"vol_logret_{w}"] = g["logret_1"].rolling(w, min_periods=w).std()
+        g[f"vol_logret_{w}"] = vols[w]
 
     # True Range + ATR
-    prev_close = g["close"].shift(1)
-    tr1 = (g["high"] - g["low"]).abs()
-    tr2 = (g["high"] - prev_close).abs()
-    tr3 = (g["low"] - prev_close).abs()
-    g["true_range"] = pd.concat([tr1, tr2, tr3], axis=1).max(axis=1)
+    tr = true_range(g["high"].to_numpy(dtype=float), g["low"].to_numpy(dtype=float), close.to_numpy())
+    g["true_range"] = tr
+
+    g[f"atr_{atr_window}"] = rolling_mean(tr, [atr_window])[atr_window]
 
-    g[f"atr_{atr_window}"] = g["true_range"].rolling(atr_window, min_periods=atr_window).mean()
+    # OHLC range estimators (all estimators and windows from one sweep)
+    if range_vol_windows:
+        vols = range_vol(g["open"].to_numpy(dtype=float), g["high"].to_numpy(dtype=float),
+                         g["low"].to_numpy(dtype=float), close.to_numpy(), range_vol_windows)
+        for est in RANGE_VOL_ESTIMATORS:
+            for w in range_vol_windows:
+                g[f"vol_{est}_{w}"] = vols[est][w]
 
     return g
 
 
-def add_technical_features(df: pd.DataFrame, vol_windows: list[int] | None = None, atr_window: int = 14) -> pd.DataFrame:
+def add_technical_features(
+    df: pd.DataFrame,
+    vol_windows: list[int] | None = None,
+    atr_window: int = 14,
+    range_vol_windows: list[int] | None = None,
+) -> pd.DataFrame:
     """
     Public API expected by src/features/pipeline.py.
 
@@ -63,8 +133,10 @@ def add_technical_features(df: pd.DataFrame, vol_windows: list[int] | None = Non
 
     Output adds:
       ret_1, logret_1, vol_logret_{w}, true_range, atr_{atr_window}
+      vol_{pk,gk,rs,yz}_{w} for w in range_vol_windows (none by default)
     """
-    vol_windows = vol_windows or [30, 60, 390]
+    vol_windows = vol_windows or [30, 60]
+    range_vol_windows = list(range_vol_windows or [])
 
     out = df.copy()
     out["timestamp_utc"] = pd.to_datetime(out["timestamp_utc"], utc=True, errors="coerce")
@@ -73,7 +145,7 @@ def add_technical_features(df: pd.DataFrame, vol_windows: list[int] | None = Non
     if "symbol" in out.columns and out["symbol"].nunique() > 1:
         parts = []
         for sym, g in out.groupby("symbol", sort=True):
-            parts.append(_add_technical_one_symbol(g, vol_windows, atr_window))
+            parts.append(_add_technical_one_symbol(g, vol_windows, atr_window, range_vol_windows))
         return pd.concat(parts, ignore_index=True)
 
-    return _add_technical_one_symbol(out, vol_windows, atr_window)
+    return _add_technical_one_symbol(out, vol_windows, atr_window, range_vol_windows)
@@ -1,7 +1,12 @@
 from __future__ import annotations
 
+from typing import Mapping
+
+import numpy as np
 import pandas as pd
 
+EVENT_SAMPLERS = ("every_bar", "cusum", "volume", "dollar")
+
 
 def every_bar_events(bars_long: pd.DataFrame) -> pd.DataFrame:
     """
@@ -12,3 +17,187 @@ def every_bar_events(bars_long: pd.DataFrame) -> pd.DataFrame:
     df["timestamp_utc"] = pd.to_datetime(df["timestamp_utc"], utc=True)
     df["event"] = 1
     return df.set_index(["timestamp_utc", "symbol"]).sort_index()
+
+
+def _sorted_bars(bars_long: pd.DataFrame, cols: list[str]) -> pd.DataFrame:
+    df = bars_long[["timestamp_utc", "symbol", *cols]].copy()
+    df["timestamp_utc"] = pd.to_datetime(df["timestamp_utc"], utc=True)
+    df = df.sort_values(["symbol", "timestamp_utc"]).drop_duplicates(["symbol", "timestamp_utc"], keep="last")
+    return df.reset_index(drop=True)
+
+
+def _symbol_runs(sym: np.ndarray) -> list[tuple[int, int]]:
+    n = len(sym)
+    if n == 0:
+        return []
+    starts = np.r_[0, np.flatnonzero(sym[1:] != sym[:-1]) + 1]
+    ends = np.r_[starts[1:], n]
+    return list(zip(starts.tolist(), ends.tolist()))
+
+
+def _events_frame(df: pd.DataFrame, rows: np.ndarray) -> pd.DataFrame:
+    out = df.loc[rows, ["timestamp_utc", "symbol"]].copy()
+    out["event"] = 1
+    return out.set_index(["timestamp_utc", "symbol"]).sort_index()
+
+
+def cusum_rows(logret: np.ndarray, threshold: np.ndarray, chunk: int = 256) -> np.ndarray:
+    """
+    Symmetric CUSUM filter on one symbol's log returns, with a per-bar threshold.
+
+      s+_t = max(0, s+_{t-1} + r_t),  s-_t = min(0, s-_{t-1} + r_t)
+      event at t when s+_t >= h_t or s-_t <= -h_t; both sums reset to 0 after an event
+
+    Between resets s+_t = C_t - min(C_p..C_t) and s-_t = C_t - max(C_p..C_t), with C the
+    cumulative return and p the last reset, so each event is found with one
+    cumulative min/max over a forward chunk (doubled until it contains the next event).
+    The Python loop runs once per event, not once per bar. NaN returns count as 0;
+    bars with a NaN threshold cannot trigger.
+    """
+    n = len(logret)
+    r = np.nan_to_num(np.asarray(logret, dtype=float))
+    h = np.asarray(threshold, dtype=float)
+    c = np.r_[0.0, np.cumsum(r)]  # c[k + 1] = sum(r[:k + 1]); c[p] is the level at reset p
+
+    out: list[int] = []
+    p = 0  # bars p.. are after the last reset
+    size = chunk
+    while p < n:
+        q = min(n, p + size)
+        seg = c[p + 1 : q + 1]
+        base = c[p : q]  # levels from the reset onwards, for the running min/max
+        lo = np.minimum.accumulate(np.minimum(base, seg))
+        hi = np.maximum.accumulate(np.maximum(base, seg))
+        with np.errstate(invalid="ignore"):
+            hit = ((seg - lo) >= h[p:q]) | ((seg - hi) <= -h[p:q])
+        k = int(np.argmax(hit)) if hit.size else 0
+        if hit.size and hit[k]:
+            out.append(p + k)
+            p = p + k + 1
+            size = chunk
+        elif q == n:
+            break
+        else:
+            size *= 2
+    return np.asarray(out, dtype=np.int64)
+
+
+def cusum_events(
+    bars_long: pd.DataFrame,
+    vol_col: str = "vol_logret_60",
+    threshold_mult: float = 1.0,
+    min_threshold: float = 0.0,
+    price_col: str = "close",
+) -> pd.DataFrame:
+    """
+    Symmetric CUSUM sampler: an event whenever the cumulative log return since the last
+    event moves by threshold_mult * vol[t] (floored at min_threshold) in either direction.
+
+    The filter state starts at the first bar of each symbol in bars_long, so events depend
+    on the loaded window. Returns index [timestamp_utc, symbol] with column 'event'=1.
+    """
+    if vol_col not in bars_long.columns:
+        raise ValueError(f"vol_col '{vol_col}' not present in bars_long columns")
+    df = _sorted_bars(bars_long, [price_col, vol_col])
+
+    px = df[price_col].astype(float).to_numpy()
+    vol = df[vol_col].astype(float).to_numpy()
+    h = np.fmax(threshold_mult * vol, min_threshold)
+    h[~np.isfinite(vol)] = np.nan
+
+    rows = []
+    for a, b in _symbol_runs(df["symbol"].to_numpy()):
+        with np.errstate(invalid="ignore", divide="ignore"):
+            lp = np.log(px[a:b])
+        lr = np.r_[np.nan, np.diff(pd.Series(lp).ffill().to_numpy())]
+        rows.append(a + cusum_rows(lr, h[a:b]))
+    rows = np.concatenate(rows) if rows else np.zeros(0, dtype=np.int64)
+    return _events_frame(df, rows)
+
+
+def _threshold_rows(amount: np.ndarray, threshold: float) -> np.ndarray:
+    """
+    Rows where the running total of `amount` crosses another multiple of threshold.
+    Overshoot carries into the next bucket (no per-event loop needed).
+    """
+    if not threshold > 0:
+        raise ValueError(f"threshold must be > 0, got {threshold!r}")
+    bucket = np.floor(np.cumsum(np.nan_to_num(amount)) / threshold)
+    return np.flatnonzero(np.diff(np.r_[0.0, bucket]) > 0)
+
+
+def _activity_events(
+    bars_long: pd.DataFrame,
+    amount_cols: list[str],
+    threshold: float | Mapping[str, float],
+) -> pd.DataFrame:
+    df = _sorted_bars(bars_long, amount_cols)
+    amount = df[amount_cols[0]].astype(float).to_numpy()
+    for c in amount_cols[1:]:
+        amount = amount * df[c].astype(float).to_numpy()
+
+    sym = df["symbol"].to_numpy()
+    rows = []
+    for a, b in _symbol_runs(sym):
+        thr = threshold[sym[a]] if isinstance(threshold, Mapping) else threshold
+        rows.append(a + _threshold_rows(amount[a:b], float(thr)))
+    rows = np.concatenate(rows) if rows else np.zeros(0, dtype=np.int64)
+    return _events_frame(df, rows)
+
+
+def volume_events(bars_long: pd.DataFrame, threshold: float | Mapping[str, float]) -> pd.DataFrame:
+    """
+    Volume-clock sampler: an event each time another `threshold` shares have traded
+    (scalar, or per-symbol mapping). Same output shape as every_bar_events.
+    """
+    return _activity_events(bars_long, ["volume"], threshold)
+
+
+def dollar_events(bars_long: pd.DataFrame, threshold: float | Mapping[str, float]) -> pd.DataFrame:
+    """
+    Dollar-clock sampler: an event each time another `threshold` of close * volume
+    has traded (scalar, or per-symbol mapping). Same output shape as every_bar_events.
+    """
+    return _activity_events(bars_long, ["close", "volume"], threshold)
+
+
+def sample_events(
+    bars_long: pd.DataFrame,
+    sampler: str = "every_bar",
+    threshold: float | Mapping[str, float] = 1.0,
+    vol_col: str = "vol_logret_60",
+) -> pd.DataFrame:
+    """
+    Dispatches to one of EVENT_SAMPLERS. threshold is the vol multiplier for "cusum" and
+    the absolute share/dollar amount for "volume"/"dollar"; ignored for "every_bar".
+    """
+    if sampler == "every_bar":
+        return every_bar_events(bars_long)
+    if sampler == "cusum":
+        return cusum_events(bars_long, vol_col=vol_col, threshold_mult=float(threshold))
+    if sampler == "volume":
+        return volume_events(bars_long, threshold)
+    if sampler == "dollar":
+        return dollar_events(bars_long, threshold)
+    raise ValueError(f"sampler must be one of {EVENT_SAMPLERS}, got {sampler!r}")
+
+
+def event_mask(timestamps: pd.Series, symbols: pd.Series, events: pd.DataFrame | pd.Index | None) -> np.ndarray:
+    """
+    Boolean mask of rows whose (timestamp_utc, symbol) key is in `events`
+    (an event frame or its [timestamp_utc, symbol] index). None selects every row.
+    """
+    if events is None:
+        return np.ones(len(timestamps), dtype=bool)
+    idx = events.index if isinstance(events, pd.DataFrame) else events
+    t = pd.DatetimeIndex(pd.to_datetime(timestamps, utc=True)).as_unit("ns").asi8
+    sym = np.asarray(symbols, dtype=object)
+    ev_t = pd.DatetimeIndex(idx.get_level_values(0)).as_unit("ns").asi8
+    ev_sym = np.asarray(idx.get_level_values(1), dtype=object)
+
+    # one int64 isin per symbol (usually a single one) instead of a MultiIndex lookup
+    mask = np.zeros(len(t), dtype=bool)
+    for s_ in pd.unique(ev_sym):
+        rows = sym == s_
+        mask[rows] = np.isin(t[rows], ev_t[ev_sym == s_])
+    return mask
@@ -1,26 +1,91 @@
 from __future__ import annotations
 
+import numpy as np
 import pandas as pd
 
+from src.labeling.event_sampling import event_mask
+from src.labeling.triple_barrier import segment_ends
+
+
+def _sorted_keys(bars_long: pd.DataFrame) -> pd.DataFrame:
+    """
+    Narrow [timestamp_utc, symbol, close] frame sorted by (symbol, time) without duplicate keys.
+    Only sorts/dedupes when the input is not already in that order.
+    """
+    df = bars_long[["timestamp_utc", "symbol", "close"]]
+    df = df.assign(timestamp_utc=pd.to_datetime(df["timestamp_utc"], utc=True))
+
+    codes, _ = pd.factorize(df["symbol"], sort=True)
+    t = pd.DatetimeIndex(df["timestamp_utc"]).as_unit("ns").asi8
+    dc = np.diff(codes)
+    dt = np.diff(t)
+    if len(df) and np.all((dc > 0) | ((dc == 0) & (dt > 0))):
+        return df.reset_index(drop=True)
+
+    df = df.sort_values(["symbol", "timestamp_utc"])
+    df = df.drop_duplicates(["symbol", "timestamp_utc"], keep="last")
+    return df.reset_index(drop=True)
+
 
 def build_forward_returns(
     bars_long: pd.DataFrame,
     horizons: list[int],
+    tolerance: str | pd.Timedelta | None = "5min",
+    session_tz: str | None = None,
+    events: pd.DataFrame | pd.Index | None = None,
 ) -> pd.DataFrame:
     """
-    horizons in minutes (for 1m bars). Output indexed by [timestamp_utc, symbol].
-    Produces fwd_ret_{h}.
+    horizons in minutes (wall clock). Output indexed by [timestamp_utc, symbol].
+    Produces fwd_ret_{h}m = close[target] / close[t] - 1, where target is the first bar
+    of the same symbol at or after t + h minutes (as-of lookup by binary search).
+
+      tolerance:  target must lie within t + h + tolerance, else NaN (None = no limit)
+      session_tz: if set, target must be on the same local date as t in this tz
+                  (e.g. "America/New_York"), so labels never span an overnight gap
+
+    All horizons are resolved with one searchsorted per symbol run over sorted arrays.
+    events (see event_sampling): only these [timestamp_utc, symbol] keys are computed and returned.
     """
-    df = bars_long.copy()
-    df["timestamp_utc"] = pd.to_datetime(df["timestamp_utc"], utc=True)
-    df = df.sort_values(["symbol", "timestamp_utc"])
-    df = df.drop_duplicates(["symbol", "timestamp_utc"], keep="last")
+    df = _sorted_keys(bars_long)
+
+    ts = pd.DatetimeIndex(df["timestamp_utc"]).as_unit("ns")
+    t = ts.asi8
+    close = df["close"].astype(float).to_numpy()
+    seg_end = segment_ends(df["symbol"].to_numpy())
+    keep = event_mask(df["timestamp_utc"], df["symbol"], events)
+
+    tol = None if tolerance is None else pd.Timedelta(tolerance).value
+    session = None
+    if session_tz is not None:
+        local = ts.tz_convert(session_tz)
+        session = (local.normalize().tz_localize(None).asi8 // (86_400 * 10**9)).astype(np.int64)
 
-    out = df[["timestamp_utc", "symbol", "close"]].copy()
+    hs = np.asarray([pd.Timedelta(minutes=h).value for h in horizons], dtype=np.int64)
+    out_vals = np.full((len(horizons), len(df)), np.nan, dtype=float)
 
-    for h in horizons:
-        out[f"fwd_ret_{h}m"] = out.groupby("symbol")["close"].shift(-h) / out["close"] - 1.0
+    n = len(df)
+    starts = np.flatnonzero(np.r_[True, seg_end[1:] != seg_end[:-1]]) if n else np.zeros(0, dtype=np.int64)
+    for a in starts:
+        b = seg_end[a] + 1
+        src = np.flatnonzero(keep[a:b])
+        if not src.size:
+            continue
+        seg_t = t[a:b]
+        target = seg_t[src][None, :] + hs[:, None]  # (n_h, n_src)
+        pos = np.searchsorted(seg_t, target, side="left")
+        valid = pos < (b - a)
+        pos_c = np.minimum(pos, b - a - 1)
+        if tol is not None:
+            valid &= (seg_t[pos_c] - target) <= tol
+        if session is not None:
+            valid &= session[a:b][pos_c] == session[a:b][src][None, :]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            r = close[a:b][pos_c] / close[a:b][src][None, :] - 1.0
+        out_vals[:, a + src] = np.where(valid, r, np.nan)
 
-    out = out.set_index(["timestamp_utc", "symbol"]).sort_index()
-    out = out.drop(columns=["close"])
-    return out
+    out = pd.DataFrame({"timestamp_utc": df["timestamp_utc"].to_numpy(), "symbol": df["symbol"].to_numpy()})
+    for k, h in enumerate(horizons):
+        out[f"fwd_ret_{h}m"] = out_vals[k]
+    if events is not None:
+        out = out.loc[keep]
+    return out.set_index(["timestamp_utc", "symbol"]).sort_index()
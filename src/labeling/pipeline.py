@@ -1,36 +1,87 @@
 from __future__ import annotations
 
 import logging
+import time
 from dataclasses import dataclass
 from pathlib import Path
 
+import numpy as np
 import pandas as pd
 
 from src.utils.io import atomic_write_parquet
+from src.utils.fingerprint import (
+    PartitionFingerprint,
+    PartitionTask,
+    code_version,
+    config_sha1,
+    partition_inputs,
+    read_fingerprint,
+    rebuild_reason,
+    write_fingerprint,
+)
+from src.labeling.event_sampling import sample_events
 from src.labeling.forward_returns import build_forward_returns
-from src.labeling.triple_barrier import triple_barrier_labels
+from src.labeling.sample_weights import label_weights
+from src.labeling.triple_barrier import triple_barrier_intrabar, triple_barrier_labels
 from src.features.technical import add_technical_features  # reuse for vol feature
+from src.data.calendar import TradingCalendar, default_calendar
+from src.data.dtypes import DtypePolicy, LABELS_DTYPE_POLICY
 
 logger = logging.getLogger(__name__)
 
+LABELS_STAGE = "labels"
+_LABELS_CODE = (
+    "src.labeling.pipeline",
+    "src.labeling.forward_returns",
+    "src.labeling.event_sampling",
+    "src.labeling.sample_weights",
+    "src.labeling.triple_barrier",
+    "src.features.technical",
+    "src.features.kernels",
+)
+
 
 @dataclass(frozen=True)
 class LabelConfig:
-    fwd_horizons: tuple[int, ...] = (30, 60, 390)
+    fwd_horizons: tuple[int, ...] = (30, 60, 390)  # minutes, wall clock
+    fwd_tolerance_minutes: int = 5  # forward target may be at most this late after t + h
+    fwd_session_tz: str | None = None  # e.g. "America/New_York": no forward returns across sessions
     tb_horizon: int = 60
+    tb_mode: str = "close"  # "close": close-only, horizon in bars; "intrabar": high/low, horizon in minutes
+    tb_tie_break: str = "sl"  # intrabar only: "sl", "pt" or "open"
+    event_sampler: str = "every_bar"  # "every_bar", "cusum", "volume" or "dollar" (see event_sampling)
+    event_threshold: float = 1.0  # cusum: multiple of the TB vol column; volume/dollar: amount per event
     vol_windows: tuple[int, ...] = (60,)  # what TB uses
     atr_window: int = 14  # not required, but keeps tech calc consistent
+    dtype_policy: DtypePolicy = LABELS_DTYPE_POLICY
 
     @property
     def lookahead_bars(self) -> int:
-        return max([*self.fwd_horizons, self.tb_horizon])
+        return max([*(h + self.fwd_tolerance_minutes for h in self.fwd_horizons), self.tb_horizon])
 
     @property
     def lookback_bars(self) -> int:
-        return max([*self.vol_windows, self.atr_window, 390])  # safe default
+        # + tb_horizon: events up to one horizon before the day are labelled too (weights)
+        return max(*self.vol_windows, self.atr_window) + self.tb_horizon
 
 
-def build_label_partitions(
+def label_load_window(day: str, cfg: LabelConfig, calendar: TradingCalendar | None = None):
+    """
+    (day_start, day_end, load_start, load_end) of one label partition. The lookback is
+    cfg.lookback_bars bars of the RTH grid (calendar); the lookahead covers the wall-clock
+    forward horizons and, in close mode, tb_horizon grid bars into the next session.
+    """
+    cal = calendar or default_calendar()
+    day_start = pd.Timestamp(day, tz="UTC")
+    day_end = day_start + pd.Timedelta(days=1)
+    load_start = cal.shift_bars(day_start, -cfg.lookback_bars)
+    load_end = day_end + pd.Timedelta(minutes=cfg.lookahead_bars)
+    if cfg.tb_mode != "intrabar":
+        load_end = max(load_end, cal.shift_bars(day_end, cfg.tb_horizon))
+    return day_start, day_end, load_start.isoformat(), load_end.isoformat()
+
+
+def plan_label_partitions(
     store,
     symbols: list[str],
     start: str,
@@ -38,53 +89,192 @@ def build_label_partitions(
     cfg: LabelConfig,
     out_root: Path = Path("data/labels_1m"),
     tb_vol_col: str = "vol_logret_60",
-    skip_existing: bool = True,
     force_days: set[str] | None = None,
-) -> None:
-    days = pd.date_range(start=start, end=end, freq="D")
-    lb = cfg.lookback_bars
-    la = cfg.lookahead_bars
+    calendar: TradingCalendar | None = None,
+) -> list[PartitionTask]:
+    """
+    Lists the label partitions whose input fingerprint (bars partitions incl. lookback and
+    lookahead, config, code) differs from the one recorded at their last build, with the reason.
+    Only partition dates that overlap a trading session (calendar) are considered.
+    """
+    days = (calendar or default_calendar()).partition_days(start, end)
     force_days = force_days or set()
+    cfg_sha = config_sha1(cfg, tb_vol_col=tb_vol_col)
+    code_sha = code_version(*_LABELS_CODE)
 
+    tasks: list[PartitionTask] = []
     for sym in symbols:
-        logger.info("Labels: symbol=%s", sym)
-
-        for d in days:
-            day = d.date().isoformat()
+        for day in days:
+            _, _, load_start, load_end = label_load_window(day, cfg, calendar)
 
-            out_path = out_root / f"symbol={sym}" / f"date={day}" / "labels.parquet"
-            if skip_existing and out_path.exists() and day not in force_days:
+            inputs = partition_inputs(store.partition_paths(sym, load_start, load_end))
+            if not inputs:
                 continue
+            fp = PartitionFingerprint(inputs=inputs, config=cfg_sha, code=code_sha)
 
-            day_start = pd.Timestamp(day, tz="UTC")
-            day_end = day_start + pd.Timedelta(days=1)
+            part_dir = out_root / f"symbol={sym}" / f"date={day}"
+            reason = rebuild_reason(
+                read_fingerprint(part_dir, LABELS_STAGE),
+                fp,
+                output_exists=(part_dir / "labels.parquet").exists(),
+            )
+            if day in force_days:
+                reason = "forced"
+            if reason is not None:
+                tasks.append(PartitionTask(symbol=sym, day=day, reason=reason, fingerprint=fp))
+    return tasks
 
-            load_start = (day_start - pd.Timedelta(minutes=lb)).isoformat()
-            load_end = (day_end + pd.Timedelta(minutes=la)).isoformat()
 
-            bars = store.load_bars(sym, start=load_start, end=load_end)
-            if bars.empty:
-                continue
+def _tb_span_reach(
+    ts: pd.Series,
+    day_start: pd.Timestamp,
+    day_end: pd.Timestamp,
+    cfg: LabelConfig,
+) -> tuple[pd.Timestamp, pd.Timestamp]:
+    """
+    [lo, hi] of the event starts whose TB spans can overlap a span starting in the day.
+    Close mode counts the horizon in bars, so the bounds are tb_horizon bars either side of
+    the day's bars (reaching across session gaps); intrabar mode counts it in minutes.
+    """
+    if cfg.tb_mode == "intrabar":
+        h = pd.Timedelta(minutes=cfg.tb_horizon)
+        return day_start - h, day_end + h - pd.Timedelta(1, "ns")
+    t = np.sort(pd.DatetimeIndex(ts.unique()).as_unit("ns").asi8)
+    i0 = int(np.searchsorted(t, day_start.as_unit("ns").value, side="left"))
+    i1 = int(np.searchsorted(t, day_end.as_unit("ns").value, side="left")) - 1
+    if i1 < i0:
+        return day_start, day_start
+    lo = t[max(i0 - cfg.tb_horizon, 0)]
+    hi = t[min(i1 + cfg.tb_horizon, len(t) - 1)]
+    return pd.Timestamp(lo, tz="UTC"), pd.Timestamp(hi, tz="UTC")
 
-            bars = add_technical_features(bars, vol_windows=list(cfg.vol_windows), atr_window=cfg.atr_window)
 
-            y_fwd = build_forward_returns(bars, horizons=list(cfg.fwd_horizons)).reset_index()
-            y_tb = triple_barrier_labels(
-                bars_long=bars,
-                vol_col=tb_vol_col,
-                max_horizon=cfg.tb_horizon,
-                pt_mult=1.0,
-                sl_mult=1.0,
-            ).reset_index()
+def compute_day_labels(
+    bars: pd.DataFrame,
+    day_start: pd.Timestamp,
+    day_end: pd.Timestamp,
+    cfg: LabelConfig,
+    tb_vol_col: str = "vol_logret_60",
+) -> tuple[pd.DataFrame, int]:
+    """
+    Labels of one partition from its load window of bars (already carrying tb_vol_col).
+    Returns (labels inside [day_start, day_end), number of bars in the day).
+    """
+    # Label only sampled events inside the day; lookback/lookahead bars only feed the barriers.
+    # TB spans are also computed for events up to one horizon before and after the day, since
+    # they overlap the day's first/last labels and count towards their concurrency.
+    ts = pd.to_datetime(bars["timestamp_utc"], utc=True)
+    n_day = int(((ts >= day_start) & (ts < day_end)).sum())
+    all_events = sample_events(bars, cfg.event_sampler, cfg.event_threshold, vol_col=tb_vol_col)
+    ev_ts = all_events.index.get_level_values("timestamp_utc")
+    events = all_events.loc[(ev_ts >= day_start) & (ev_ts < day_end)]
+    tb_lo, tb_hi = _tb_span_reach(ts, day_start, day_end, cfg)
+    tb_events = all_events.loc[(ev_ts >= tb_lo) & (ev_ts <= tb_hi)]
 
-            y = y_fwd.merge(y_tb, on=["timestamp_utc", "symbol"], how="outer")
+    y_fwd = build_forward_returns(
+        bars,
+        horizons=list(cfg.fwd_horizons),
+        tolerance=pd.Timedelta(minutes=cfg.fwd_tolerance_minutes),
+        session_tz=cfg.fwd_session_tz,
+        events=events,
+    ).reset_index()
+    if cfg.tb_mode == "intrabar":
+        y_tb = triple_barrier_intrabar(
+            bars_long=bars,
+            vol_col=tb_vol_col,
+            horizon=pd.Timedelta(minutes=cfg.tb_horizon),
+            pt_mult=1.0,
+            sl_mult=1.0,
+            tie_break=cfg.tb_tie_break,
+            events=tb_events,
+        )
+    else:
+        y_tb = triple_barrier_labels(
+            bars_long=bars,
+            vol_col=tb_vol_col,
+            max_horizon=cfg.tb_horizon,
+            pt_mult=1.0,
+            sl_mult=1.0,
+            events=tb_events,
+        )
+    y_tb = y_tb.join(label_weights(bars, y_tb)).reset_index()
 
-            y["timestamp_utc"] = pd.to_datetime(y["timestamp_utc"], utc=True)
-            mask = (y["timestamp_utc"] >= day_start) & (y["timestamp_utc"] < day_end)
-            out = y.loc[mask].copy()
-            if out.empty:
-                continue
+    y = y_fwd.merge(y_tb, on=["timestamp_utc", "symbol"], how="outer")
+
+    y["timestamp_utc"] = pd.to_datetime(y["timestamp_utc"], utc=True)
+    mask = (y["timestamp_utc"] >= day_start) & (y["timestamp_utc"] < day_end)
+    return y.loc[mask].copy(), n_day
+
+
+def write_label_partition(
+    part_dir: Path,
+    out: pd.DataFrame,
+    cfg: LabelConfig,
+    fingerprint: PartitionFingerprint,
+    n_day: int,
+) -> None:
+    """
+    Writes one label partition plus its fingerprint sidecar (a stale parquet is removed
+    when there is nothing to label).
+    """
+    out_path = part_dir / "labels.parquet"
+    if not out.empty:
+        atomic_write_parquet(cfg.dtype_policy.apply(out), out_path)
+    elif out_path.exists():
+        out_path.unlink()
+    write_fingerprint(part_dir, LABELS_STAGE, fingerprint, rows=len(out), bars=n_day)
+
+
+def build_label_partitions(
+    store,
+    symbols: list[str],
+    start: str,
+    end: str,
+    cfg: LabelConfig,
+    out_root: Path = Path("data/labels_1m"),
+    tb_vol_col: str = "vol_logret_60",
+    skip_existing: bool = True,
+    force_days: set[str] | None = None,
+    calendar: TradingCalendar | None = None,
+) -> None:
+    """
+    Writes:
+      data/labels_1m/symbol=XYZ/date=YYYY-MM-DD/labels.parquet
+      data/labels_1m/symbol=XYZ/date=YYYY-MM-DD/_fingerprint.json
+
+    With skip_existing, only partitions whose input fingerprint changed are rebuilt.
+    """
+    if not skip_existing:
+        force_days = set((calendar or default_calendar()).partition_days(start, end))
+    tasks = plan_label_partitions(store, symbols, start, end, cfg, out_root, tb_vol_col, force_days, calendar)
+
+    # symbol -> [bars in built days, labelled events, seconds]
+    stats: dict[str, list[float]] = {}
+    for t in tasks:
+        logger.info("Labels: symbol=%s date=%s (%s)", t.symbol, t.day, t.reason)
+        t0 = time.perf_counter()
+
+        day_start, day_end, load_start, load_end = label_load_window(t.day, cfg, calendar)
+        part_dir = out_root / f"symbol={t.symbol}" / f"date={t.day}"
+
+        bars = store.load_bars(t.symbol, start=load_start, end=load_end)
+        if bars.empty:
+            # recorded as an empty partition (rows=0), so it is not re-planned
+            write_label_partition(part_dir, pd.DataFrame(), cfg, t.fingerprint, 0)
+            continue
+
+        bars = add_technical_features(bars, vol_windows=list(cfg.vol_windows), atr_window=cfg.atr_window)
+        out, n_day = compute_day_labels(bars, day_start, day_end, cfg, tb_vol_col)
+        write_label_partition(part_dir, out, cfg, t.fingerprint, n_day)
 
-            atomic_write_parquet(out, out_path)
+        st = stats.setdefault(t.symbol, [0, 0, 0.0])
+        st[0] += n_day
+        st[1] += len(out)
+        st[2] += time.perf_counter() - t0
 
+    for sym, (n_bars, n_events, secs) in stats.items():
+        logger.info(
+            "Labels %s (%s): %d/%d bars labelled (%.1f%% of rows kept) in %.2fs",
+            sym, cfg.event_sampler, n_events, n_bars, 100.0 * n_events / max(n_bars, 1), secs,
+        )
     logger.info("Labels partitions complete: %s", out_root)
@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+
+from src.labeling.triple_barrier import segment_ends
+
+WEIGHT_COLS = ["tb_concurrency", "tb_uniqueness", "tb_ret_weight"]
+
+
+def concurrency(i0: np.ndarray, i1: np.ndarray, n_bars: int) -> np.ndarray:
+    """
+    Number of label spans [i0[k], i1[k]] (bar indices, inclusive) covering each bar,
+    via a difference array and one cumsum: O(n_events + n_bars).
+    """
+    diff = np.bincount(i0, minlength=n_bars + 1) - np.bincount(i1 + 1, minlength=n_bars + 1)
+    return np.cumsum(diff[:n_bars])
+
+
+def span_weights(
+    i0: np.ndarray,
+    i1: np.ndarray,
+    logret: np.ndarray,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    For one symbol's bars and label spans [i0, i1] (bar indices, inclusive):
+
+      c_t          concurrency (labels covering bar t)
+      concurrency  mean c_t over each span
+      uniqueness   mean 1/c_t over each span (average uniqueness)
+      ret_weight   |sum over (i0, i1] of logret_t / c_t| (return attribution)
+
+    Span means are differences of prefix sums over the bars, so the cost is
+    O(n_events + n_bars) however long the spans are. NaN returns count as 0.
+    """
+    n = len(logret)
+    c = concurrency(i0, i1, n).astype(float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        inv = np.where(c > 0, 1.0 / c, 0.0)
+    r = np.nan_to_num(np.asarray(logret, dtype=float)) * inv
+
+    pc = np.r_[0.0, np.cumsum(c)]
+    pu = np.r_[0.0, np.cumsum(inv)]
+    pr = np.r_[0.0, np.cumsum(r)]
+
+    length = (i1 - i0 + 1).astype(float)
+    conc = (pc[i1 + 1] - pc[i0]) / length
+    uniq = (pu[i1 + 1] - pu[i0]) / length
+    ret_w = np.abs(pr[i1 + 1] - pr[i0 + 1])
+    return conc, uniq, ret_w
+
+
+def label_weights(bars_long: pd.DataFrame, spans: pd.DataFrame, t1_col: str = "tb_t1") -> pd.DataFrame:
+    """
+    Concurrency, average-uniqueness and return-attribution weights for labelled events.
+
+    bars_long: bars (timestamp_utc, symbol, close) the labels were computed on
+    spans:     index [timestamp_utc, symbol] (label start t0) with column t1_col (label end,
+               a bar timestamp; NaT rows are skipped)
+
+    Every row of `spans` counts towards concurrency, so pass the events whose spans reach
+    into the rows you keep (e.g. also those starting one horizon before a partition).
+    Output index: [timestamp_utc, symbol], columns: WEIGHT_COLS.
+    """
+    bars = bars_long[["timestamp_utc", "symbol", "close"]].copy()
+    bars["timestamp_utc"] = pd.to_datetime(bars["timestamp_utc"], utc=True)
+    bars["symbol"] = bars["symbol"].astype(str)
+    bars = bars.sort_values(["symbol", "timestamp_utc"]).drop_duplicates(["symbol", "timestamp_utc"], keep="last")
+    bars = bars.reset_index(drop=True)
+
+    sp = spans[[t1_col]].reset_index()
+    sp["timestamp_utc"] = pd.to_datetime(sp["timestamp_utc"], utc=True)
+    sp[t1_col] = pd.to_datetime(sp[t1_col], utc=True)
+    sp["symbol"] = sp["symbol"].astype(str)
+    sp = sp.loc[sp[t1_col].notna()].sort_values(["symbol", "timestamp_utc"]).reset_index(drop=True)
+
+    t = pd.DatetimeIndex(bars["timestamp_utc"]).as_unit("ns").asi8
+    t0 = pd.DatetimeIndex(sp["timestamp_utc"]).as_unit("ns").asi8
+    t1 = pd.DatetimeIndex(sp[t1_col]).as_unit("ns").asi8
+    close = bars["close"].astype(float).to_numpy()
+    bar_sym = bars["symbol"].to_numpy()
+    seg_end = segment_ends(bar_sym)
+    starts = np.flatnonzero(np.r_[True, seg_end[1:] != seg_end[:-1]]) if len(bars) else np.zeros(0, dtype=np.int64)
+
+    span_sym = sp["symbol"].to_numpy()
+    vals = np.full((len(WEIGHT_COLS), len(sp)), np.nan)
+    for a in starts:
+        b = seg_end[a] + 1
+        lo = np.searchsorted(span_sym, bar_sym[a], side="left")
+        hi = np.searchsorted(span_sym, bar_sym[a], side="right")
+        if lo == hi:
+            continue
+        seg_t = t[a:b]
+        i0 = np.searchsorted(seg_t, t0[lo:hi], side="left")
+        i1 = np.searchsorted(seg_t, t1[lo:hi], side="right") - 1
+        ok = (i0 < (b - a)) & (i1 >= i0)
+        if not ok.any():
+            continue
+        with np.errstate(invalid="ignore", divide="ignore"):
+            lr = np.r_[np.nan, np.diff(np.log(pd.Series(close[a:b]).ffill().to_numpy()))]
+        conc, uniq, ret_w = span_weights(i0[ok], i1[ok], lr)
+        idx = lo + np.flatnonzero(ok)
+        vals[0, idx] = conc
+        vals[1, idx] = uniq
+        vals[2, idx] = ret_w
+
+    out = pd.DataFrame({"timestamp_utc": sp["timestamp_utc"], "symbol": span_sym})
+    for k, col in enumerate(WEIGHT_COLS):
+        out[col] = vals[k]
+    return out.set_index(["timestamp_utc", "symbol"]).sort_index()
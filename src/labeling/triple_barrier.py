@@ -3,6 +3,96 @@ from __future__ import annotations
 import numpy as np
 import pandas as pd
 
+from src.labeling.event_sampling import event_mask
+
+
+def first_touch(
+    upper_px: np.ndarray,
+    lower_px: np.ndarray,
+    up: np.ndarray,
+    dn: np.ndarray,
+    rows: np.ndarray,
+    j_end: np.ndarray,
+    tie_break: str = "pt",
+    open_px: np.ndarray | None = None,
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Vectorized first-passage search.
+
+    For every start row i in `rows`, finds the first j in (i, j_end[i]] with
+    upper_px[j] >= up[i] (touch=+1) or lower_px[j] <= dn[i] (touch=-1); bars with a
+    non-finite price are skipped. Returns (touch, hit_j) aligned with `rows`;
+    touch=0 and hit_j=j_end[i] when nothing is hit (vertical barrier).
+
+    All unresolved rows advance one bar per step, so the Python-level loop runs at most
+    max(j_end - i) times and shrinks as barriers are hit, instead of once per (i, j) pair.
+
+    tie_break (both barriers inside one bar, only possible with intrabar high/low):
+      "pt"    upper barrier wins (also reproduces the close-only scan order)
+      "sl"    lower barrier wins (conservative)
+      "open"  the barrier nearer to the bar's open (open_px) is assumed hit first
+    """
+    if tie_break not in ("pt", "sl", "open"):
+        raise ValueError(f"tie_break must be 'pt', 'sl' or 'open', got {tie_break!r}")
+    if tie_break == "open" and open_px is None:
+        raise ValueError("tie_break='open' needs open_px")
+
+    fin_u = np.isfinite(upper_px)
+    fin_l = fin_u if lower_px is upper_px else np.isfinite(lower_px)
+
+    touch = np.zeros(len(rows), dtype=np.int8)
+    hit_j = np.asarray(j_end, dtype=np.int64)[rows].copy()
+
+    pos = np.arange(len(rows))
+    cur = np.asarray(rows, dtype=np.int64)
+    end = hit_j.copy()
+    u = up[rows]
+    d = dn[rows]
+
+    k = 1
+    while pos.size:
+        j = cur + k
+        alive = j <= end
+        if not alive.all():
+            pos, cur, end, u, d, j = pos[alive], cur[alive], end[alive], u[alive], d[alive], j[alive]
+            if not pos.size:
+                break
+
+        hu = fin_u[j] & (upper_px[j] >= u)
+        hl = fin_l[j] & (lower_px[j] <= d)
+        hit = hu | hl
+        if hit.any():
+            both = hu & hl
+            res = np.where(hu, 1, -1).astype(np.int8)
+            if both.any() and tie_break != "pt":
+                if tie_break == "sl":
+                    res[both] = -1
+                else:
+                    jb = j[both]
+                    res[both] = np.where(
+                        np.abs(u[both] - open_px[jb]) <= np.abs(open_px[jb] - d[both]), 1, -1
+                    ).astype(np.int8)
+            touch[pos[hit]] = res[hit]
+            hit_j[pos[hit]] = j[hit]
+            keep = ~hit
+            pos, cur, end, u, d = pos[keep], cur[keep], end[keep], u[keep], d[keep]
+        k += 1
+
+    return touch, hit_j
+
+
+def segment_ends(symbols: np.ndarray) -> np.ndarray:
+    """
+    For rows sorted by symbol: index of the last row of each row's symbol run.
+    """
+    n = len(symbols)
+    if n == 0:
+        return np.zeros(0, dtype=np.int64)
+    change = np.flatnonzero(symbols[1:] != symbols[:-1])
+    last = np.r_[change, n - 1]
+    run = np.repeat(np.arange(len(last)), np.diff(np.r_[-1, last]))
+    return last[run]
+
 
 def triple_barrier_labels(
     bars_long: pd.DataFrame,
@@ -11,6 +101,8 @@ def triple_barrier_labels(
     sl_mult: float = 1.0,
     max_horizon: int = 60,  # minutes (for 1m bars)
     min_vol: float = 1e-8,
+    engine: str = "vectorized",
+    events: pd.DataFrame | pd.Index | None = None,
 ) -> pd.DataFrame:
     """
     Minimal triple barrier labeler.
@@ -24,7 +116,14 @@ def triple_barrier_labels(
           hit lower first => label=-1
           else timeout => label=0
     Output index: [timestamp_utc, symbol]
-      columns: tb_label, tb_touched, tb_ret
+      columns: tb_label, tb_touched, tb_ret, tb_t1 (timestamp of the touch / vertical barrier)
+
+    engine="vectorized" (default) labels all symbols in one call with first_touch();
+    engine="python" is the original per-bar loop, kept as the reference implementation.
+    Both produce bit-identical output.
+
+    events (see event_sampling): only these [timestamp_utc, symbol] keys are labelled and
+    returned; barriers are still scanned over every bar.
     """
     df = bars_long.copy()
     df["timestamp_utc"] = pd.to_datetime(df["timestamp_utc"], utc=True)
@@ -33,6 +132,11 @@ def triple_barrier_labels(
     if vol_col not in df.columns:
         raise ValueError(f"vol_col '{vol_col}' not present in bars_long columns")
 
+    if engine == "vectorized":
+        return _triple_barrier_vectorized(df, vol_col, pt_mult, sl_mult, max_horizon, min_vol, events)
+    if engine != "python":
+        raise ValueError(f"engine must be 'vectorized' or 'python', got {engine!r}")
+
     res = []
     for sym, g in df.groupby("symbol", sort=True):
         g = g.sort_values("timestamp_utc").reset_index(drop=True)
@@ -45,6 +149,8 @@ def triple_barrier_labels(
         label = np.full(n, np.nan, dtype=float)
         touched = np.full(n, np.nan, dtype=float)  # +1 upper, -1 lower, 0 timeout
         tb_ret = np.full(n, np.nan, dtype=float)
+        t1 = np.full(n, np.iinfo(np.int64).min, dtype=np.int64)  # NaT
+        ts_ns = pd.DatetimeIndex(g["timestamp_utc"]).as_unit("ns").asi8
 
         for i in range(n):
             v = vol[i]
@@ -77,6 +183,7 @@ def triple_barrier_labels(
             touched[i] = float(hit)
             label[i] = 1.0 if hit == +1 else (-1.0 if hit == -1 else 0.0)
             tb_ret[i] = close[hit_j] / p0 - 1.0
+            t1[i] = ts_ns[hit_j]
 
         out = pd.DataFrame(
             {
@@ -85,9 +192,179 @@ def triple_barrier_labels(
                 "tb_label": label,
                 "tb_touched": touched,
                 "tb_ret": tb_ret,
+                "tb_t1": pd.to_datetime(t1, utc=True),
             }
         )
         res.append(out)
 
     out = pd.concat(res, ignore_index=True)
+    if events is not None:
+        out = out.loc[event_mask(out["timestamp_utc"], out["symbol"], events)]
+    return out.set_index(["timestamp_utc", "symbol"]).sort_index()
+
+
+def _triple_barrier_vectorized(
+    df: pd.DataFrame,
+    vol_col: str,
+    pt_mult: float,
+    sl_mult: float,
+    max_horizon: int,
+    min_vol: float,
+    events: pd.DataFrame | pd.Index | None = None,
+) -> pd.DataFrame:
+    """
+    Same arithmetic as the loop (up/dn/tb_ret expressions are identical), on sorted
+    multi-symbol arrays with per-symbol horizon caps. Only event rows enter first_touch().
+    """
+    df = df.reset_index(drop=True)
+    close = df["close"].astype(float).to_numpy()
+    vol = df[vol_col].astype(float).to_numpy()
+    sym = df["symbol"].to_numpy()
+
+    n = len(df)
+    label = np.full(n, np.nan, dtype=float)
+    touched = np.full(n, np.nan, dtype=float)
+    tb_ret = np.full(n, np.nan, dtype=float)
+    t1 = np.full(n, np.iinfo(np.int64).min, dtype=np.int64)  # NaT
+    ts_ns = pd.DatetimeIndex(df["timestamp_utc"]).as_unit("ns").asi8
+
+    keep = event_mask(df["timestamp_utc"], df["symbol"], events)
+    with np.errstate(invalid="ignore"):
+        ok = keep & np.isfinite(vol) & ~(vol < min_vol) & np.isfinite(close) & ~(close <= 0)
+    rows = np.flatnonzero(ok)
+
+    if rows.size:
+        j_end = np.minimum(segment_ends(sym), np.arange(n) + max_horizon)
+        p0 = close[rows]
+        up = np.full(n, np.nan)
+        dn = np.full(n, np.nan)
+        up[rows] = p0 * (1.0 + pt_mult * vol[rows])
+        dn[rows] = p0 * (1.0 - sl_mult * vol[rows])
+
+        touch, hit_j = first_touch(close, close, up, dn, rows, j_end, tie_break="pt")
+
+        touched[rows] = touch.astype(float)
+        label[rows] = touch.astype(float)
+        tb_ret[rows] = close[hit_j] / p0 - 1.0
+        t1[rows] = ts_ns[hit_j]
+
+    out = pd.DataFrame(
+        {
+            "timestamp_utc": pd.to_datetime(df["timestamp_utc"], utc=True),
+            "symbol": sym,
+            "tb_label": label,
+            "tb_touched": touched,
+            "tb_ret": tb_ret,
+            "tb_t1": pd.to_datetime(t1, utc=True),
+        }
+    )
+    if events is not None:
+        out = out.loc[keep]
+    return out.set_index(["timestamp_utc", "symbol"]).sort_index()
+
+
+def horizon_end(ts_ns: np.ndarray, seg_end: np.ndarray, horizon_ns: int) -> np.ndarray:
+    """
+    For rows sorted by (symbol, time): index of the last bar of the same symbol with
+    timestamp <= ts + horizon (a wall-clock vertical barrier). One searchsorted per symbol
+    run over all of its rows.
+    """
+    n = len(ts_ns)
+    out = np.empty(n, dtype=np.int64)
+    starts = np.flatnonzero(np.r_[True, seg_end[1:] != seg_end[:-1]]) if n else np.zeros(0, dtype=np.int64)
+    for a in starts:
+        b = seg_end[a] + 1
+        seg = ts_ns[a:b]
+        out[a:b] = a + np.searchsorted(seg, seg + horizon_ns, side="right") - 1
+    return out
+
+
+def triple_barrier_intrabar(
+    bars_long: pd.DataFrame,
+    vol_col: str,
+    pt_mult: float = 1.0,
+    sl_mult: float = 1.0,
+    horizon: str | pd.Timedelta = "60min",
+    min_vol: float = 1e-8,
+    tie_break: str = "sl",
+    events: pd.DataFrame | pd.Index | None = None,
+) -> pd.DataFrame:
+    """
+    Intrabar, time-aware triple barrier.
+
+    Differences from triple_barrier_labels:
+      - touches are tested against high (upper) and low (lower) of each later bar
+      - the vertical barrier is wall-clock: the last bar with timestamp <= t + horizon
+        (searchsorted on timestamp_utc), so session gaps and missing bars never stretch it
+      - when both barriers lie inside one bar, tie_break decides ("sl", "pt" or "open":
+        the barrier nearer to that bar's open is taken as hit first)
+      - tb_ret is the exit at the barrier (or at the open if the bar gapped through it);
+        on timeout it is close at the vertical barrier
+      - tb_t1 is the touch (or vertical-barrier) timestamp, for overlap/uniqueness work
+
+    events: as in triple_barrier_labels, restricts labelled/returned rows to these keys.
+
+    Output index: [timestamp_utc, symbol]
+      columns: tb_label, tb_touched, tb_ret, tb_t1
+    """
+    df = bars_long.copy()
+    df["timestamp_utc"] = pd.to_datetime(df["timestamp_utc"], utc=True)
+    df = df.sort_values(["symbol", "timestamp_utc"]).drop_duplicates(["symbol", "timestamp_utc"], keep="last")
+    df = df.reset_index(drop=True)
+
+    if vol_col not in df.columns:
+        raise ValueError(f"vol_col '{vol_col}' not present in bars_long columns")
+
+    ts = pd.DatetimeIndex(df["timestamp_utc"]).as_unit("ns")
+    ts_ns = ts.asi8
+    o = df["open"].astype(float).to_numpy()
+    h = df["high"].astype(float).to_numpy()
+    lo = df["low"].astype(float).to_numpy()
+    close = df["close"].astype(float).to_numpy()
+    vol = df[vol_col].astype(float).to_numpy()
+    sym = df["symbol"].to_numpy()
+
+    n = len(df)
+    label = np.full(n, np.nan, dtype=float)
+    tb_ret = np.full(n, np.nan, dtype=float)
+    t1 = np.full(n, np.iinfo(np.int64).min, dtype=np.int64)  # NaT
+
+    keep = event_mask(df["timestamp_utc"], df["symbol"], events)
+    with np.errstate(invalid="ignore"):
+        ok = keep & np.isfinite(vol) & ~(vol < min_vol) & np.isfinite(close) & ~(close <= 0)
+    rows = np.flatnonzero(ok)
+
+    if rows.size:
+        j_end = horizon_end(ts_ns, segment_ends(sym), pd.Timedelta(horizon).value)
+        p0 = close[rows]
+        up = np.full(n, np.nan)
+        dn = np.full(n, np.nan)
+        up[rows] = p0 * (1.0 + pt_mult * vol[rows])
+        dn[rows] = p0 * (1.0 - sl_mult * vol[rows])
+
+        touch, hit_j = first_touch(h, lo, up, dn, rows, j_end, tie_break=tie_break, open_px=o)
+
+        exit_px = close[hit_j].copy()
+        is_up = touch == 1
+        is_dn = touch == -1
+        oj = o[hit_j]
+        exit_px[is_up] = np.where(np.isfinite(oj[is_up]), np.fmax(up[rows][is_up], oj[is_up]), up[rows][is_up])
+        exit_px[is_dn] = np.where(np.isfinite(oj[is_dn]), np.fmin(dn[rows][is_dn], oj[is_dn]), dn[rows][is_dn])
+
+        label[rows] = touch.astype(float)
+        tb_ret[rows] = exit_px / p0 - 1.0
+        t1[rows] = ts_ns[hit_j]
+
+    out = pd.DataFrame(
+        {
+            "timestamp_utc": ts,
+            "symbol": sym,
+            "tb_label": label,
+            "tb_touched": label.copy(),
+            "tb_ret": tb_ret,
+            "tb_t1": pd.to_datetime(t1, utc=True),
+        }
+    )
+    if events is not None:
+        out = out.loc[keep]
     return out.set_index(["timestamp_utc", "symbol"]).sort_index()
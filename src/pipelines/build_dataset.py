@@ -1,6 +1,5 @@
 from __future__ import annotations
 
-import hashlib
 import json
 import logging
 from dataclasses import dataclass, asdict
@@ -10,11 +9,11 @@ from typing import Optional
 
 import pandas as pd
 
-logger = logging.getLogger(__name__)
-
+from src.pipelines.merge_join import merge_join_frames
+from src.utils.fingerprint import code_version, config_sha1, file_sha1, find_metadata_by_digest
+from src.utils.io import link_or_copy
 
-def _sha1_text(s: str) -> str:
-    return hashlib.sha1(s.encode("utf-8")).hexdigest()
+logger = logging.getLogger(__name__)
 
 
 @dataclass(frozen=True)
@@ -29,6 +28,8 @@ class DatasetSpec:
     feature_cols: list[str]
     hashes: dict[str, str]
     coverage: dict[str, float]
+    content_sha1: str = ""
+    reused_from: Optional[str] = None
 
 
 def build_dataset(
@@ -37,9 +38,54 @@ def build_dataset(
     out_dir: Path = Path("data/datasets"),
     dataset_name: Optional[str] = None,
     dropna: bool = True,
+    reuse: bool = True,
 ) -> tuple[Path, Path]:
+    """
+    Joins a feature matrix and a labels file (both indexed by [timestamp_utc, symbol]).
+
+    hashes holds the file_sha1 of both inputs and content_sha1 combines them with dropna
+    and this module's source. With reuse, a dataset in out_dir
+    with the same content_sha1 is returned as is (same name) or hard-linked to the new name.
+    """
     out_dir.mkdir(parents=True, exist_ok=True)
 
+    built_at = datetime.now(timezone.utc).isoformat()
+    if dataset_name is None:
+        dataset_name = f"ds_{feature_matrix_path.stem}__{labels_path.stem}__{built_at[:10]}"
+    out_parquet = out_dir / f"{dataset_name}.parquet"
+    out_meta = out_dir / f"{dataset_name}.metadata.json"
+
+    hashes = {
+        "feature_content_sha1": file_sha1(feature_matrix_path),
+        "labels_content_sha1": file_sha1(labels_path),
+    }
+    digest = config_sha1({"dropna": dropna}, inputs=hashes, code=code_version(__name__))
+
+    if reuse:
+        for src_name, src_spec in find_metadata_by_digest(out_dir, digest):
+            src_parquet = out_dir / f"{src_name}.parquet"
+            if not src_parquet.exists():
+                continue
+            if src_name == dataset_name:
+                logger.info("Dataset %s is up to date (content %s); not rebuilt", dataset_name, digest[:12])
+                return out_parquet, out_meta
+            tmp = out_parquet.with_suffix(out_parquet.suffix + ".tmp")
+            link_or_copy(src_parquet, tmp)
+            tmp.replace(out_parquet)
+            spec = DatasetSpec(
+                **{
+                    **src_spec,
+                    "name": dataset_name,
+                    "feature_path": str(feature_matrix_path),
+                    "labels_path": str(labels_path),
+                    "built_at_utc": built_at,
+                    "reused_from": src_name,
+                }
+            )
+            out_meta.write_text(json.dumps(asdict(spec), indent=2))
+            logger.info("Dataset %s is identical to %s; linked instead of rebuilt", dataset_name, src_name)
+            return out_parquet, out_meta
+
     X = pd.read_parquet(feature_matrix_path)
     y = pd.read_parquet(labels_path)
 
@@ -49,7 +95,8 @@ def build_dataset(
     if not isinstance(y.index, pd.MultiIndex) or y.index.names != ["timestamp_utc", "symbol"]:
         raise ValueError("Labels must be indexed by [timestamp_utc, symbol].")
 
-    ds = X.join(y, how="inner")
+    # Sort-merge per symbol; both sides are written time-sorted per symbol/date partition
+    ds = merge_join_frames(X, y)
 
     # Optional: remove rows without labels / key features
     if dropna:
@@ -61,12 +108,6 @@ def build_dataset(
         ds = ds.dropna(subset=core_cols)
 
     ds = ds.sort_index()
-
-    built_at = datetime.now(timezone.utc).isoformat()
-    if dataset_name is None:
-        dataset_name = f"ds_{feature_matrix_path.stem}__{labels_path.stem}__{built_at[:10]}"
-
-    out_parquet = out_dir / f"{dataset_name}.parquet"
     ds.to_parquet(out_parquet)
 
     feature_cols = [c for c in ds.columns if c not in y.columns]
@@ -87,14 +128,10 @@ def build_dataset(
         cols=list(ds.columns),
         label_cols=label_cols,
         feature_cols=feature_cols,
-        hashes={
-            "feature_path_sha1": _sha1_text(str(feature_matrix_path)),
-            "labels_path_sha1": _sha1_text(str(labels_path)),
-        },
+        hashes=hashes,
         coverage=coverage,
+        content_sha1=digest,
     )
-
-    out_meta = out_dir / f"{dataset_name}.metadata.json"
     out_meta.write_text(json.dumps(asdict(spec), indent=2))
 
     logger.info("Wrote dataset: %s (rows=%d cols=%d)", out_parquet, ds.shape[0], ds.shape[1])
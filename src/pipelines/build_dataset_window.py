@@ -1,14 +1,37 @@
 from __future__ import annotations
 
 import json
-from dataclasses import dataclass, asdict
+import logging
+import shutil
+from dataclasses import dataclass, asdict, field
 from datetime import datetime, timezone
+from itertools import groupby
 from pathlib import Path
 
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
 
+from src.data.dtypes import column_chunk_bytes, estimate_load_bytes, project_columns
 from src.data.features_store import FeaturesStore
 from src.data.labels_store import LabelsStore
+from src.features.pipeline import CROSS_SECTIONAL_STAGE, FEATURES_STAGE
+from src.labeling.pipeline import LABELS_STAGE
+from src.pipelines.merge_join import merge_join_indices
+from src.utils.fingerprint import code_version, config_sha1, find_metadata_by_digest, partition_content_key
+from src.utils.io import link_or_copy
+
+logger = logging.getLogger(__name__)
+
+KEY_COLS = ["timestamp_utc", "symbol"]
+MANIFEST_FILE = "_manifest.json"
+PARTITIONS_SUFFIX = ".partitions.json"
+SHARD_MODES = ("none", "day", "rows")
+# a row is kept when these labels are present; other labels (e.g. forward returns whose
+# horizon runs past the session close) may be NaN
+REQUIRED_LABELS = ("tb_label",)
 
 
 @dataclass(frozen=True)
@@ -22,6 +45,286 @@ class DatasetMetadata:
     n_labels: int
     feature_cols: list[str]
     label_cols: list[str]
+    required_labels: list[str] = field(default_factory=list)
+    n_partitions: int = 0
+    n_row_groups: int = 0
+    shard_by: str = "none"
+    n_shards: int = 0
+    content_sha1: str = ""
+    reused_from: str | None = None
+    extended_from: str | None = None
+    coverage: dict[str, float] = field(default_factory=dict)
+
+
+def _partition_pairs(
+    fs: FeaturesStore,
+    ls: LabelsStore,
+    symbols: list[str],
+    start: str,
+    end: str,
+) -> tuple[list[tuple[str, Path, Path]], int, int]:
+    """
+    (symbol, features path, labels path) for every partition present in both stores, in
+    (symbol, date) order, plus the number of feature and label partitions found.
+    The partition day is path.parent.name ("date=YYYY-MM-DD").
+    """
+    pairs = []
+    n_x = n_y = 0
+    for sym in symbols:
+        y_paths = {p.parent.name: p for p in ls.partition_paths(sym, start, end)}
+        x_paths = fs.partition_paths(sym, start, end)
+        n_x += len(x_paths)
+        n_y += len(y_paths)
+        for xp in x_paths:
+            yp = y_paths.get(xp.parent.name)
+            if yp is not None:
+                pairs.append((sym, xp, yp))
+    return pairs, n_x, n_y
+
+
+def _pair_key(sym: str, xp: Path) -> str:
+    return f"{sym}/{xp.parent.name}"
+
+
+def pair_inputs(pairs: list[tuple[str, Path, Path]]) -> dict[str, str]:
+    """
+    {"SYM/date=YYYY-MM-DD" -> "features key:labels key"} with partition_content_key keys:
+    the features (digest and build id) and cross_sectional records of the features sidecar,
+    the labels record of the labels sidecar, or file_sha1 of a partition without one.
+    """
+    return {
+        _pair_key(sym, xp): (
+            f"{partition_content_key(xp, (FEATURES_STAGE, CROSS_SECTIONAL_STAGE))}:"
+            f"{partition_content_key(yp, (LABELS_STAGE,))}"
+        )
+        for sym, xp, yp in pairs
+    }
+
+
+def dataset_fingerprint(
+    inputs: dict[str, str],
+    symbols: list[str],
+    start: str,
+    end: str,
+    shard_by: str,
+    shard_rows: int,
+    columns: list[str] | None = None,
+    required_labels: list[str] | None = None,
+) -> str:
+    """
+    Content digest of a window dataset before it is built: the pair_inputs keys of every
+    joined features/labels partition, the request (window, symbols, sharding, required labels,
+    and the projected `columns` if any) and this module's source. Equal digests mean
+    identical output.
+    """
+    params = {
+        "start": start,
+        "end": end,
+        "symbols": sorted(set(symbols)),
+        "shard_by": shard_by,
+        "shard_rows": shard_rows if shard_by == "rows" else None,
+        "required_labels": required_labels,
+    }
+    if columns is not None:
+        params["columns"] = columns
+    return config_sha1(params, inputs=inputs, code=code_version(__name__))
+
+
+def _dataset_path(out_dir: Path, tag: str, shard_by: str) -> Path:
+    return out_dir / tag if shard_by != "none" else out_dir / f"{tag}.parquet"
+
+
+def _link_dataset(src: Path, dst: Path, tag: str) -> None:
+    """
+    Re-publishes an existing dataset (file or shard directory) under another name with
+    hard links; a sharded copy gets its own manifest (name) and no memmap export.
+    """
+    if src.is_dir():
+        tmp = dst.with_name(dst.name + ".tmp")
+        shutil.rmtree(tmp, ignore_errors=True)
+        manifest = json.loads((src / MANIFEST_FILE).read_text())
+        for shard in manifest["shards"]:
+            link_or_copy(src / shard["path"], tmp / shard["path"])
+        manifest["name"] = tag
+        (tmp / MANIFEST_FILE).write_text(json.dumps(manifest, indent=2))
+        shutil.rmtree(dst, ignore_errors=True)
+        tmp.replace(dst)
+    else:
+        tmp = dst.with_suffix(dst.suffix + ".tmp")
+        link_or_copy(src, tmp)
+        tmp.replace(dst)
+
+
+def _column_template(paths: list[Path], skip: list[str]) -> dict[str, object]:
+    """
+    Column -> pandas dtype, first seen across `paths`, from parquet footers only.
+    """
+    out: dict[str, object] = {}
+    seen: set[pa.Schema] = set()
+    for p in paths:
+        schema = pq.read_schema(p)
+        if schema in seen:
+            continue
+        seen.add(schema)
+        for c, dt in schema.empty_table().to_pandas().dtypes.items():
+            if c not in out and c not in skip:
+                out[c] = dt
+    return out
+
+
+def _ts_ns(table: pa.Table) -> np.ndarray:
+    col = table.column("timestamp_utc").combine_chunks()
+    return col.cast(pa.timestamp("ns", tz=col.type.tz)).cast(pa.int64()).to_numpy()
+
+
+def _join_partition(
+    xt: pa.Table,
+    yt: pa.Table,
+    symbol: pa.Array,
+    target: pa.Schema,
+    label_cols: list[str],
+    required_labels: list[str],
+    what: str = "",
+) -> pa.Table:
+    """
+    Inner join of one symbol's features and labels partitions on timestamp, without rows
+    that miss one of `required_labels`, cast to `target`. Partitions are time-sorted with unique keys, so
+    this is a sort-merge (merge_join_indices; hash join if a partition breaks that).
+    `symbol` is the one-element symbol array in the target type.
+    """
+    ix, iy = merge_join_indices(_ts_ns(xt), _ts_ns(yt), what=what)
+
+    keep = np.ones(len(iy), dtype=bool)
+    for c in required_labels:
+        if c in yt.column_names:
+            v = yt.column(c).combine_chunks().take(pa.array(iy))
+            missing = pc.is_null(v, nan_is_null=pa.types.is_floating(v.type))
+            keep &= ~missing.to_numpy(zero_copy_only=False)
+    ix = pa.array(ix[keep])
+    iy = pa.array(iy[keep])
+    n = len(ix)
+
+    cols = []
+    for f in target:
+        if f.name == "symbol":
+            cols.append(symbol.take(pa.array(np.zeros(n, dtype=np.int64))))
+            continue
+        src, idx = (yt, iy) if f.name in label_cols else (xt, ix)
+        if f.name in src.column_names:
+            cols.append(src.column(f.name).combine_chunks().take(idx).cast(f.type))
+        else:
+            cols.append(pa.nulls(n, f.type))
+    return pa.Table.from_arrays(cols, schema=target)
+
+
+class _ShardWriter:
+    """
+    Writes joined chunks (one row group each) into part-NNNNN.parquet files under a
+    directory, rolling over per day or every `shard_rows` rows, and collects the manifest
+    entries (rows, global row offset, row groups, time range, days) for each shard.
+    """
+
+    def __init__(self, out_dir: Path, schema: pa.Schema, shard_by: str, shard_rows: int):
+        self.out_dir = out_dir
+        self.schema = schema
+        self.shard_by = shard_by
+        self.shard_rows = shard_rows
+        self.shards: list[dict] = []
+        self._writer: pq.ParquetWriter | None = None
+        self._day: str | None = None
+        self._offset = 0
+
+    def _roll(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+        path = f"part-{len(self.shards):05d}.parquet"
+        self._writer = pq.ParquetWriter(self.out_dir / path, self.schema)
+        self.shards.append(
+            {"path": path, "rows": 0, "row_offset": self._offset, "row_groups": 0,
+             "start_utc": None, "end_utc": None, "days": []}
+        )
+
+    def adopt(self, src: Path, entry: dict) -> int:
+        """
+        Takes over a finished shard file of another dataset as the next shard (hard link,
+        no rewrite). Returns its shard index.
+        """
+        self.close()
+        path = f"part-{len(self.shards):05d}.parquet"
+        link_or_copy(src, self.out_dir / path)
+        self.shards.append({**entry, "path": path, "row_offset": self._offset})
+        self._offset += entry["rows"]
+        return len(self.shards) - 1
+
+    def write(self, chunk: pa.Table, day: str) -> tuple[int, int]:
+        """
+        Appends `chunk` as one row group; returns its (shard index, row group index).
+        """
+        cur = self.shards[-1] if self.shards else None
+        if (
+            cur is None
+            or self._writer is None
+            or (self.shard_by == "day" and day != self._day)
+            or (self.shard_by == "rows" and cur["rows"] >= self.shard_rows)
+        ):
+            self._roll()
+            cur = self.shards[-1]
+        self._day = day
+        self._writer.write_table(chunk, row_group_size=chunk.num_rows)
+
+        mm = pc.min_max(chunk.column("timestamp_utc"))
+        lo, hi = mm["min"].as_py().isoformat(), mm["max"].as_py().isoformat()
+        cur["start_utc"] = lo if cur["start_utc"] is None else min(cur["start_utc"], lo)
+        cur["end_utc"] = hi if cur["end_utc"] is None else max(cur["end_utc"], hi)
+        cur["rows"] += chunk.num_rows
+        cur["row_groups"] += 1
+        if day not in cur["days"]:
+            cur["days"].append(day)
+        self._offset += chunk.num_rows
+        return len(self.shards) - 1, cur["row_groups"] - 1
+
+    def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+
+def _stored_schema(target: pa.Schema) -> pa.Schema:
+    """
+    `target` as parquet gives it back (e.g. large_string dictionaries read as string).
+    """
+    buf = pa.BufferOutputStream()
+    pq.write_table(target.empty_table(), buf)
+    return pq.read_schema(pa.BufferReader(buf.getvalue()))
+
+
+def _load_base(
+    out_dir: Path, base: str, shard_by: str, target: pa.Schema, required_labels: list[str]
+) -> tuple[dict[str, dict], list[Path], list[dict]] | None:
+    """
+    Partition index (by pair key), data files and manifest shard entries of an existing
+    dataset to extend, or None when it cannot be extended (missing, built without a
+    partitions index, other sharding or required labels, or another output schema, e.g. a
+    new symbol set).
+    """
+    meta_path = out_dir / f"{base}.metadata.json"
+    parts_path = out_dir / f"{base}{PARTITIONS_SUFFIX}"
+    data = _dataset_path(out_dir, base, shard_by)
+    if not (meta_path.exists() and parts_path.exists() and data.exists()):
+        reason = "missing or built without a partitions index"
+    elif json.loads(meta_path.read_text()).get("shard_by", "none") != shard_by:
+        reason = "different shard_by"
+    elif json.loads(meta_path.read_text()).get("required_labels") != required_labels:
+        reason = "different required labels"
+    else:
+        shards = json.loads((data / MANIFEST_FILE).read_text())["shards"] if shard_by != "none" else []
+        files = [data / sh["path"] for sh in shards] if shard_by != "none" else [data]
+        if files and not pq.read_schema(files[0]).equals(_stored_schema(target), check_metadata=True):
+            reason = "different output schema"
+        else:
+            return {e["key"]: e for e in json.loads(parts_path.read_text())}, files, shards
+    logger.info("Base dataset %s cannot be extended (%s); building from scratch", base, reason)
+    return None
 
 
 def build_dataset_window(
@@ -32,48 +335,307 @@ def build_dataset_window(
     features_root: Path = Path("data/features_1m"),
     labels_root: Path = Path("data/labels_1m"),
     name: str | None = None,
+    shard_by: str = "none",
+    shard_rows: int = 1_000_000,
+    reuse: bool = True,
+    base: str | None = None,
+    feature_cols: str | list[str] | None = None,
+    label_cols: str | list[str] | None = None,
+    required_labels: str | list[str] | None = REQUIRED_LABELS,
 ) -> tuple[Path, Path]:
+    """
+    Streams the inner join of features and labels over [start, end] into one parquet file.
+
+    Walks (symbol, date) partitions, joins each features partition with the labels
+    partition of the same day (sort-merge on timestamp, in Arrow), drops rows where a
+    required label (required_labels, default tb_label) is null and appends the chunk to a
+    pyarrow ParquetWriter as one row group. Other targets (fwd_ret_*) are kept as they are,
+    NaN included. Peak memory is one
+    partition pair, not the window. The column set and dtypes are fixed up front from the
+    partition footers (union of columns, first-seen dtype); metadata is accumulated per chunk.
+
+    Rows come out in (symbol, timestamp_utc) order, as from load_panel + merge before.
+
+    shard_by:
+      "none"  one file, data/datasets/{tag}.parquet (returned)
+      "day"   data/datasets/{tag}/part-NNNNN.parquet, one shard per day (all symbols, in
+              (symbol, timestamp_utc) order within the day)
+      "rows"  same layout, a new shard once a shard holds >= shard_rows rows
+    Sharded datasets get a {tag}/_manifest.json index (see dataset_loader) and the
+    directory is returned instead of the file.
+
+    The metadata records content_sha1 (dataset_fingerprint). With reuse, a dataset in
+    out_dir with the same digest is not rebuilt: under the same name it is returned as is,
+    under another name it is hard-linked to the new name (metadata reused_from = its tag).
+
+    {tag}.partitions.json maps every joined partition to its input key (pair_inputs), feature
+    rows, dataset rows and (shard, row group). Given `base` (the tag of an earlier build, which
+    may be `name` itself), partitions whose input key is unchanged are taken from the base
+    instead of being joined again: their row group is copied, and with shard_by="day" an
+    unchanged day shard is hard-linked as a whole. Days outside the new window are dropped
+    and new or changed partitions are joined. The output equals a build from scratch.
+
+    feature_cols / label_cols (names or fnmatch patterns, e.g. ["vol_*", "ret_1"]) project
+    the dataset onto those columns: the selection is resolved against the partition footers
+    and pushed down to the parquet reads, so other columns are never decoded.
+
+    required_labels (names or patterns; None = every label) are the selected labels a row
+    must have to be kept. The default keeps rows with a triple-barrier label even when a
+    forward return is NaN (its horizon runs past the session close, e.g. fwd_ret_390m in the
+    afternoon); consumers of such labels mask the NaNs. When none of the selected labels
+    match, every selected label is required.
+    """
+    if shard_by not in SHARD_MODES:
+        raise ValueError(f"shard_by must be one of {SHARD_MODES}, got {shard_by!r}")
     out_dir.mkdir(parents=True, exist_ok=True)
 
     fs = FeaturesStore(root_dir=features_root)
     ls = LabelsStore(root_dir=labels_root)
+    symbols = list(symbols)
+    ordered = sorted(set(symbols))
 
-    X = fs.load_panel(symbols, start, end)
-    y = ls.load_panel(symbols, start, end)
-
-    if X.empty:
+    pairs, n_x, n_y = _partition_pairs(fs, ls, ordered, start, end)
+    if n_x == 0:
         raise RuntimeError("No features found for requested range.")
-    if y.empty:
+    if n_y == 0:
         raise RuntimeError("No labels found for requested range.")
 
-    # Merge on keys
-    df = X.merge(y, on=["timestamp_utc", "symbol"], how="inner")
+    tag = name or f"ds_{start}_to_{end}"
+    out_meta = out_dir / f"{tag}.metadata.json"
+    out_parts = out_dir / f"{tag}{PARTITIONS_SUFFIX}"
+    out_path = _dataset_path(out_dir, tag, shard_by)
+    x_tpl = _column_template([xp for _, xp, _ in pairs], skip=[])
+    y_tpl = _column_template([yp for _, _, yp in pairs], skip=KEY_COLS)
+    x_read = project_columns(x_tpl, feature_cols)
+    y_sel = project_columns(y_tpl, label_cols, keep=())
+    if x_read is not None:
+        if len(x_read) == len([c for c in KEY_COLS if c in x_tpl]):
+            raise ValueError(f"feature_cols {feature_cols!r} match no feature column")
+        x_tpl = {c: x_tpl[c] for c in x_read}
+    if y_sel is not None:
+        if not y_sel:
+            raise ValueError(f"label_cols {label_cols!r} match no label column")
+        y_tpl = {c: y_tpl[c] for c in y_sel}
+    y_read = None if y_sel is None else [*KEY_COLS, *y_sel]
+    projected = x_read is not None or y_read is not None
+    required = project_columns(y_tpl, required_labels, keep=()) or list(y_tpl)
+
+    inputs = pair_inputs(pairs)
+    digest = dataset_fingerprint(
+        inputs, symbols, start, end, shard_by, shard_rows,
+        columns=[*x_tpl, *y_tpl] if projected else None, required_labels=required,
+    )
 
-    # Identify columns
-    key_cols = ["timestamp_utc", "symbol"]
-    label_cols = [c for c in y.columns if c not in key_cols]
-    feature_cols = [c for c in X.columns if c not in key_cols]
+    if reuse:
+        for src_tag, src_meta in find_metadata_by_digest(out_dir, digest):
+            src_path = _dataset_path(out_dir, src_tag, shard_by)
+            if not src_path.exists():
+                continue
+            if src_tag == tag:
+                logger.info("Dataset %s is up to date (content %s); not rebuilt", tag, digest[:12])
+                return out_path, out_meta
+            _link_dataset(src_path, out_path, tag)
+            src_parts = out_dir / f"{src_tag}{PARTITIONS_SUFFIX}"
+            if src_parts.exists():
+                link_or_copy(src_parts, out_parts)
+            meta = DatasetMetadata(
+                **{
+                    **src_meta,
+                    "built_at_utc": datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S"),
+                    "symbols": symbols,
+                    "reused_from": src_tag,
+                }
+            )
+            out_meta.write_text(json.dumps(asdict(meta), indent=2))
+            logger.info("Dataset %s is identical to %s (content %s); linked instead of rebuilt", tag, src_tag, digest[:12])
+            return out_path, out_meta
 
-    # Drop rows where any label is missing
-    df = df.dropna(subset=label_cols)
+    feature_cols = [c for c in x_tpl if c not in KEY_COLS]
+    label_cols = list(y_tpl)
+    columns = [*KEY_COLS, *feature_cols, *label_cols]
+    dtypes = {**x_tpl, **y_tpl}
+    if isinstance(dtypes.get("symbol"), pd.CategoricalDtype):
+        dtypes["symbol"] = pd.CategoricalDtype(ordered)
 
-    tag = name or f"ds_{start}_to_{end}"
-    out_parquet = out_dir / f"{tag}.parquet"
-    out_meta = out_dir / f"{tag}.metadata.json"
+    # Output schema (incl. pandas metadata) from an empty frame with the template dtypes
+    template = pd.DataFrame({c: pd.Series(dtype=dtypes[c]) for c in columns})
+    target = pa.Schema.from_pandas(template, preserve_index=False)
+    sym_type = target.field("symbol").type
+    if pa.types.is_dictionary(sym_type):
+        sym_arrays = {
+            s: pa.DictionaryArray.from_arrays(pa.array([i], type=sym_type.index_type), pa.array(ordered))
+            for i, s in enumerate(ordered)
+        }
+    else:
+        sym_arrays = {s: pa.array([s], type=sym_type) for s in ordered}
+
+    # Footer-only memory bound: the largest partition pair (plus the join)
+    read_cols = set(columns) if projected else None
+    peak = max((estimate_load_bytes([xp, yp], read_cols) for _, xp, yp in pairs), default=0)
+    logger.info(
+        "Dataset window %s..%s: streaming %d partition pairs, ~%.1f MiB per partition (peak ~%.1f MiB incl. join)",
+        start, end, len(pairs), peak / 2**20, 2 * peak / 2**20,
+    )
+    if projected:
+        paths = [p for _, xp, yp in pairs for p in (xp, yp)]
+        logger.info(
+            "Column projection: %d features, %d labels; reading %.1f MiB of %.1f MiB of column chunks",
+            len(feature_cols), len(label_cols),
+            column_chunk_bytes(paths, read_cols) / 2**20, column_chunk_bytes(paths) / 2**20,
+        )
+
+    def read(path: Path, cols: list[str] | None) -> pa.Table:
+        if cols is None:
+            return pq.read_table(path)
+        names = set(pq.read_schema(path).names)
+        return pq.read_table(path, columns=[c for c in cols if c in names])
+
+    base_parts: dict[str, dict] = {}
+    base_files: list[Path] = []
+    base_shards: list[dict] = []
+    if base is not None:
+        loaded = _load_base(out_dir, base, shard_by, target, required)
+        if loaded is not None:
+            base_parts, base_files, base_shards = loaded
+    readers: dict[int, pq.ParquetFile] = {}
+    counts = {"joined": 0, "copied": 0, "linked": 0}
+
+    def unchanged(key: str) -> dict | None:
+        old = base_parts.get(key)
+        return old if old is not None and old["input"] == inputs[key] else None
+
+    def partition(sym: str, xp: Path, yp: Path) -> tuple[dict, pa.Table | None]:
+        """
+        Index entry and joined rows (None if empty) of one pair, from the base when unchanged.
+        """
+        key = _pair_key(sym, xp)
+        entry = {"key": key, "input": inputs[key], "shard": None, "row_group": None}
+        old = unchanged(key)
+        if old is not None:
+            counts["copied"] += 1
+            entry.update(x_rows=old["x_rows"], rows=old["rows"])
+            if not old["rows"]:
+                return entry, None
+            if old["shard"] not in readers:
+                readers[old["shard"]] = pq.ParquetFile(base_files[old["shard"]])
+            return entry, readers[old["shard"]].read_row_group(old["row_group"]).cast(target)
+        counts["joined"] += 1
+        xt = read(xp, x_read)
+        chunk = _join_partition(xt, read(yp, y_read), sym_arrays[sym], target, label_cols, required, what=key)
+        entry.update(x_rows=xt.num_rows, rows=chunk.num_rows)
+        return entry, chunk if chunk.num_rows else None
+
+    def adoptable(day: str, group: list[tuple[str, Path, Path]]) -> int | None:
+        """
+        Base shard holding exactly this day's (unchanged) partitions, if any.
+        """
+        olds = [unchanged(_pair_key(sym, xp)) for sym, xp, _ in group]
+        if any(o is None for o in olds):
+            return None
+        shard_ids = {o["shard"] for o in olds if o["rows"]}
+        if len(shard_ids) != 1:
+            return None
+        (si,) = shard_ids
+        sh = base_shards[si]
+        return si if sh["days"] == [day] and sh["rows"] == sum(o["rows"] for o in olds) else None
+
+    parts: list[dict] = []
+    n_rows = n_groups = 0
+    shards: list[dict] = []
+    if shard_by == "none":
+        tmp = out_path.with_suffix(out_path.suffix + ".tmp")
+        with pq.ParquetWriter(tmp, target) as writer:
+            for sym, xp, yp in pairs:
+                entry, chunk = partition(sym, xp, yp)
+                if chunk is not None:
+                    writer.write_table(chunk, row_group_size=chunk.num_rows)
+                    entry.update(shard=0, row_group=n_groups)
+                    n_rows += chunk.num_rows
+                    n_groups += 1
+                parts.append(entry)
+        tmp.replace(out_path)
+    else:
+        if shard_by == "day":
+            # (date, symbol) walk, so each day's shard is written in one go
+            pairs.sort(key=lambda p: (p[1].parent.name, p[0]))
+        tmp = out_dir / f"{tag}.tmp"
+        shutil.rmtree(tmp, ignore_errors=True)
+        tmp.mkdir(parents=True)
+        sw = _ShardWriter(tmp, target, shard_by, shard_rows)
+        try:
+            for day, group in groupby(pairs, key=lambda p: p[1].parent.name.split("=", 1)[1]):
+                group = list(group)
+                si = adoptable(day, group) if shard_by == "day" and base_shards else None
+                if si is not None:
+                    new_si = sw.adopt(base_files[si], base_shards[si])
+                    for sym, xp, _ in group:
+                        old = base_parts[_pair_key(sym, xp)]
+                        parts.append({**old, "shard": new_si if old["rows"] else None})
+                    counts["linked"] += len(group)
+                    n_rows += base_shards[si]["rows"]
+                    n_groups += base_shards[si]["row_groups"]
+                    continue
+                for sym, xp, yp in group:
+                    entry, chunk = partition(sym, xp, yp)
+                    if chunk is not None:
+                        entry["shard"], entry["row_group"] = sw.write(chunk, day)
+                        n_rows += chunk.num_rows
+                        n_groups += 1
+                    parts.append(entry)
+        finally:
+            sw.close()
+        shards = sw.shards
+        manifest = {
+            "name": tag,
+            "content_sha1": digest,
+            "shard_by": shard_by,
+            "n_rows": n_rows,
+            "columns": columns,
+            "feature_cols": feature_cols,
+            "label_cols": label_cols,
+            "shards": shards,
+        }
+        (tmp / MANIFEST_FILE).write_text(json.dumps(manifest, indent=2))
+        shutil.rmtree(out_path, ignore_errors=True)
+        tmp.replace(out_path)
 
-    df.to_parquet(out_parquet, index=False)
+    if base_parts:
+        logger.info(
+            "Extended %s -> %s: %d partitions re-joined, %d copied, %d in linked day shards, %d dropped",
+            base, tag, counts["joined"], counts["copied"], counts["linked"], len(base_parts.keys() - inputs.keys()),
+        )
 
+    rows_total = sum(e["x_rows"] for e in parts)
+    coverage = {
+        "feature_partitions": float(n_x),
+        "label_partitions": float(n_y),
+        "joined_partitions": float(len(pairs)),
+        "rows_total": float(rows_total),
+        "rows_with_labels": float(n_rows),
+        "label_coverage": float(n_rows / max(1, rows_total)),
+    }
     meta = DatasetMetadata(
         built_at_utc=datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S"),
         start=start,
         end=end,
         symbols=symbols,
-        n_rows=len(df),
+        n_rows=n_rows,
         n_features=len(feature_cols),
         n_labels=len(label_cols),
         feature_cols=feature_cols,
         label_cols=label_cols,
+        required_labels=required,
+        n_partitions=len(pairs),
+        n_row_groups=n_groups,
+        shard_by=shard_by,
+        n_shards=len(shards),
+        content_sha1=digest,
+        extended_from=base if base_parts else None,
+        coverage=coverage,
     )
 
+    tmp_parts = out_parts.with_suffix(out_parts.suffix + ".tmp")
+    tmp_parts.write_text(json.dumps(parts))
+    tmp_parts.replace(out_parts)
     out_meta.write_text(json.dumps(asdict(meta), indent=2))
-    return out_parquet, out_meta
+    return out_path, out_meta
@@ -0,0 +1,140 @@
+from __future__ import annotations
+
+import logging
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from src.features.technical import add_technical_features
+from src.features.pipeline import (
+    FeatureConfig,
+    compute_features_one_symbol,
+    feature_load_window,
+    write_feature_partition,
+)
+from src.labeling.pipeline import LabelConfig, compute_day_labels, label_load_window, write_label_partition
+from src.data.calendar import TradingCalendar
+from src.utils.fingerprint import PartitionTask
+
+logger = logging.getLogger(__name__)
+
+
+def _symbol_runs(windows: list[tuple[pd.Timestamp, pd.Timestamp]]) -> list[tuple[pd.Timestamp, pd.Timestamp]]:
+    """
+    Merges overlapping [load_start, load_end] windows into contiguous load ranges.
+    """
+    runs: list[tuple[pd.Timestamp, pd.Timestamp]] = []
+    for a, b in sorted(windows):
+        if runs and a <= runs[-1][1]:
+            runs[-1] = (runs[-1][0], max(runs[-1][1], b))
+        else:
+            runs.append((a, b))
+    return runs
+
+
+def build_feature_label_partitions(
+    store,
+    feature_tasks: list[PartitionTask],
+    label_tasks: list[PartitionTask],
+    fcfg: FeatureConfig,
+    lcfg: LabelConfig,
+    features_root: Path = Path("data/features_1m"),
+    labels_root: Path = Path("data/labels_1m"),
+    tb_vol_col: str = "vol_logret_60",
+    calendar: TradingCalendar | None = None,
+) -> None:
+    """
+    Fused features + labels build from one bars load per symbol.
+
+    Takes the plans of plan_feature_partitions / plan_label_partitions and, per symbol,
+    merges the load windows of all its pending partitions (lookback + days + lookahead)
+    into contiguous runs, each read once with BarsStore.load_bars. Every partition is then
+    computed on its own load window sliced out of that frame, so outputs (and their
+    fingerprints) are those of the separate builders. When a day has both kinds of partition,
+    its features are computed over the union of the two load windows, so the labels can take
+    tb_vol_col from them instead of running add_technical_features again (the in-day feature
+    rows only depend on the trailing lookback, up to rounding in the rolling sums).
+    """
+    reuse_vol = tb_vol_col in {f"vol_logret_{w}" for w in fcfg.vol_windows}
+
+    by_symbol: dict[str, tuple[dict[str, PartitionTask], dict[str, PartitionTask]]] = {}
+    for t in feature_tasks:
+        by_symbol.setdefault(t.symbol, ({}, {}))[0][t.day] = t
+    for t in label_tasks:
+        by_symbol.setdefault(t.symbol, ({}, {}))[1][t.day] = t
+
+    for sym, (ftasks, ltasks) in by_symbol.items():
+        t0 = time.perf_counter()
+        fwin = {day: feature_load_window(day, fcfg, calendar) for day in ftasks}
+        lwin = {day: label_load_window(day, lcfg, calendar) for day in ltasks}
+        windows = [(pd.Timestamp(w[2]), pd.Timestamp(w[3])) for w in (*fwin.values(), *lwin.values())]
+
+        n_loaded = n_reused = 0
+        n_bars = n_events = 0
+        label_secs = 0.0
+        for run_start, run_end in _symbol_runs(windows):
+            bars = store.load_bars(sym, start=run_start.isoformat(), end=run_end.isoformat())
+            n_loaded += len(bars)
+            ts = pd.to_datetime(bars["timestamp_utc"], utc=True)
+
+            def window(load_start: str, load_end: str) -> pd.DataFrame:
+                return bars.loc[(ts >= pd.Timestamp(load_start)) & (ts <= pd.Timestamp(load_end))]
+
+            for day in sorted({*fwin, *lwin}):
+                w = fwin.get(day, lwin.get(day))
+                if not (run_start <= pd.Timestamp(w[2]) <= run_end):
+                    continue
+
+                feats = feats_start = None
+                if day in ftasks:
+                    t = ftasks[day]
+                    day_start, day_end, load_start, load_end = fwin[day]
+                    logger.info("Features: symbol=%s date=%s (%s)", sym, day, t.reason)
+                    if reuse_vol and day in ltasks:
+                        load_start = min(load_start, lwin[day][2], key=pd.Timestamp)
+                        load_end = max(load_end, lwin[day][3], key=pd.Timestamp)
+                    fbars = window(load_start, load_end)
+                    part_dir = features_root / f"symbol={sym}" / f"date={day}"
+                    if fbars.empty:
+                        # recorded as an empty partition (rows=0), so it is not re-planned
+                        write_feature_partition(part_dir, fbars, day_start, day_end, fcfg, t.fingerprint)
+                    else:
+                        feats, feats_start = compute_features_one_symbol(fbars, fcfg), load_start
+                        write_feature_partition(part_dir, feats, day_start, day_end, fcfg, t.fingerprint)
+
+                if day in ltasks:
+                    t = ltasks[day]
+                    day_start, day_end, load_start, load_end = lwin[day]
+                    logger.info("Labels: symbol=%s date=%s (%s)", sym, day, t.reason)
+                    t_lab = time.perf_counter()
+                    lbars = window(load_start, load_end)
+                    part_dir = labels_root / f"symbol={sym}" / f"date={day}"
+                    if lbars.empty:
+                        write_label_partition(part_dir, pd.DataFrame(), lcfg, t.fingerprint, 0)
+                        continue
+                    if feats is not None and reuse_vol and feats_start == load_start:
+                        vol = feats.set_index("timestamp_utc")[tb_vol_col]
+                        lbars = lbars.assign(**{tb_vol_col: lbars["timestamp_utc"].map(vol).to_numpy()})
+                        n_reused += 1
+                    else:
+                        lbars = add_technical_features(
+                            lbars, vol_windows=list(lcfg.vol_windows), atr_window=lcfg.atr_window
+                        )
+                    out, n_day = compute_day_labels(lbars, day_start, day_end, lcfg, tb_vol_col)
+                    write_label_partition(part_dir, out, lcfg, t.fingerprint, n_day)
+                    n_bars += n_day
+                    n_events += len(out)
+                    label_secs += time.perf_counter() - t_lab
+
+        if ltasks:
+            logger.info(
+                "Labels %s (%s): %d/%d bars labelled (%.1f%% of rows kept) in %.2fs",
+                sym, lcfg.event_sampler, n_events, n_bars, 100.0 * n_events / max(n_bars, 1), label_secs,
+            )
+        logger.info(
+            "Fused build %s: %d feature + %d label partitions (%d reusing feature vol) from %d bars loaded in %.2fs",
+            sym, len(ftasks), len(ltasks), n_reused, n_loaded, time.perf_counter() - t0,
+        )
+
+    logger.info("Feature/label partitions complete: %s, %s", features_root, labels_root)
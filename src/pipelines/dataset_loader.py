@@ -0,0 +1,293 @@
+from __future__ import annotations
+
+import json
+import logging
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Iterator
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from src.pipelines.build_dataset_window import MANIFEST_FILE
+
+logger = logging.getLogger(__name__)
+
+MEMMAP_FILE = "_memmap.json"
+
+
+def load_manifest(dataset_dir: Path) -> dict:
+    """
+    Reads {tag}/_manifest.json of a sharded dataset (see build_dataset_window(shard_by=...)).
+    """
+    return json.loads((Path(dataset_dir) / MANIFEST_FILE).read_text())
+
+
+def shard_paths(dataset: Path) -> list[Path]:
+    """
+    Shard files of a dataset: the manifest's shards for a sharded dataset directory,
+    or [dataset] for a single parquet file.
+    """
+    dataset = Path(dataset)
+    if dataset.is_dir():
+        return [dataset / s["path"] for s in load_manifest(dataset)["shards"]]
+    return [dataset]
+
+
+def _metadata_path(dataset: Path) -> Path:
+    if dataset.is_dir():
+        return dataset.parent / f"{dataset.name}.metadata.json"
+    return dataset.with_name(dataset.name.replace(".parquet", ".metadata.json"))
+
+
+def dataset_symbols(dataset: Path) -> list[str]:
+    """
+    Sorted symbol vocabulary of a dataset: from its metadata, or the shards' symbol column
+    when the metadata is missing.
+    """
+    dataset = Path(dataset)
+    meta = _metadata_path(dataset)
+    if meta.exists():
+        return sorted(set(json.loads(meta.read_text())["symbols"]))
+    out: set[str] = set()
+    for p in shard_paths(dataset):
+        out.update(pq.read_table(p, columns=["symbol"]).column("symbol").cast(pa.string()).unique().to_pylist())
+    return sorted(out)
+
+
+def _nullable_int_cols(schema: pa.Schema) -> set[str]:
+    """
+    Integer/boolean columns stored from pandas nullable dtypes (Int8, boolean, ...).
+    """
+    meta = schema.pandas_metadata or {}
+    return {
+        c["name"]
+        for c in meta.get("columns", [])
+        if str(c.get("numpy_type", "")).startswith(("Int", "UInt", "boolean"))
+    }
+
+
+def _numeric_cols(schema: pa.Schema, cols: list[str]) -> list[str]:
+    out = []
+    for c in cols:
+        t = schema.field(c).type
+        if pa.types.is_integer(t) or pa.types.is_floating(t) or pa.types.is_boolean(t):
+            out.append(c)
+    return out
+
+
+def export_memmap(
+    dataset: Path,
+    out_dir: Path | None = None,
+    feature_cols: list[str] | None = None,
+    label_cols: list[str] | None = None,
+    dtype: str = "float32",
+) -> Path:
+    """
+    Dense NumPy export of a dataset (single file or sharded directory), one row group at a time:
+
+      X.npy        (n_rows, n_features) dtype, feature matrix
+      y.npy        (n_rows, n_labels)   dtype, label matrix (nulls -> NaN)
+      ts.npy       (n_rows,) int64 ns   timestamp_utc
+      symbol.npy   (n_rows,) int16      index into the "symbols" list of _memmap.json
+      _memmap.json shapes, column names, symbols
+
+    Only numeric columns are exported (e.g. tb_t1 is not). Default columns are the dataset
+    metadata's feature/label columns. Load with np.load(path, mmap_mode="r").
+    """
+    dataset = Path(dataset)
+    paths = shard_paths(dataset)
+    if dataset.is_dir():
+        man = load_manifest(dataset)
+        out_dir = out_dir or dataset / "memmap"
+        feature_cols = feature_cols or man["feature_cols"]
+        label_cols = label_cols or man["label_cols"]
+    else:
+        meta = json.loads(dataset.with_name(dataset.name.replace(".parquet", ".metadata.json")).read_text())
+        out_dir = out_dir or dataset.with_suffix(".memmap")
+        feature_cols = feature_cols or meta["feature_cols"]
+        label_cols = label_cols or meta["label_cols"]
+
+    schema = pq.read_schema(paths[0])
+    feature_cols = _numeric_cols(schema, [c for c in feature_cols if c not in ("timestamp_utc", "symbol")])
+    label_cols = _numeric_cols(schema, label_cols)
+    n_rows = sum(pq.ParquetFile(p).metadata.num_rows for p in paths)
+
+    out_dir.mkdir(parents=True, exist_ok=True)
+    X = np.lib.format.open_memmap(out_dir / "X.npy", mode="w+", dtype=dtype, shape=(n_rows, len(feature_cols)))
+    y = np.lib.format.open_memmap(out_dir / "y.npy", mode="w+", dtype=dtype, shape=(n_rows, len(label_cols)))
+    ts = np.lib.format.open_memmap(out_dir / "ts.npy", mode="w+", dtype=np.int64, shape=(n_rows,))
+    sym = np.lib.format.open_memmap(out_dir / "symbol.npy", mode="w+", dtype=np.int16, shape=(n_rows,))
+
+    symbols: dict[str, int] = {}
+    cols = ["timestamp_utc", "symbol", *feature_cols, *label_cols]
+    row = 0
+    for p in paths:
+        pf = pq.ParquetFile(p)
+        for rg in range(pf.num_row_groups):
+            df = pf.read_row_group(rg, columns=cols).to_pandas()
+            n = len(df)
+            X[row : row + n] = df[feature_cols].to_numpy(dtype=dtype, na_value=np.nan)
+            y[row : row + n] = df[label_cols].to_numpy(dtype=dtype, na_value=np.nan)
+            ts[row : row + n] = pd.DatetimeIndex(df["timestamp_utc"]).as_unit("ns").asi8
+            codes, uniq = pd.factorize(df["symbol"].astype(str))
+            remap = np.array([symbols.setdefault(s, len(symbols)) for s in uniq], dtype=np.int16)
+            sym[row : row + n] = remap[codes]
+            row += n
+    for a in (X, y, ts, sym):
+        a.flush()
+
+    (out_dir / MEMMAP_FILE).write_text(
+        json.dumps(
+            {
+                "n_rows": n_rows,
+                "dtype": dtype,
+                "feature_cols": feature_cols,
+                "label_cols": label_cols,
+                "symbols": list(symbols),
+            },
+            indent=2,
+        )
+    )
+    logger.info("Memmap export: %d rows x (%d features, %d labels) -> %s", n_rows, len(feature_cols), len(label_cols), out_dir)
+    return out_dir
+
+
+class ShardBatchIterator:
+    """
+    Training-time batch iterator over a sharded dataset directory (or a single file).
+
+    - shards are split across workers round-robin (worker_id::num_workers), so parallel
+      training processes read disjoint files; with fewer shards than workers (e.g. the
+      single file of a shard_by="none" dataset) row groups are split that way instead
+    - up to `prefetch` shards are read ahead on `threads` background threads (pyarrow
+      decoding releases the GIL)
+    - with shuffle, the worker's shard order is permuted per epoch and rows pass through a
+      shuffle buffer of `shuffle_buffer` rows, mixing rows across neighbouring shards
+    - batches are dicts column -> np.ndarray (the last batch may be short; drop_last drops it)
+
+    Columns are converted in Arrow, so batches hold plain numeric arrays, never per-row
+    Python objects: timestamps (timestamp_utc, tb_t1) as int64 ns (nulls -> int64 min),
+    `symbol` as int16 codes into `self.symbols` (default: dataset_symbols), and nullable
+    integer/boolean columns (Int8 labels, ...) as float64 with NaN for nulls.
+    """
+
+    def __init__(
+        self,
+        dataset: Path,
+        batch_size: int = 4096,
+        columns: list[str] | None = None,
+        shuffle: bool = False,
+        shuffle_buffer: int = 0,
+        seed: int = 0,
+        worker_id: int = 0,
+        num_workers: int = 1,
+        prefetch: int = 2,
+        threads: int = 2,
+        drop_last: bool = False,
+        symbols: list[str] | None = None,
+    ):
+        if not 0 <= worker_id < num_workers:
+            raise ValueError(f"worker_id must be in [0, {num_workers}), got {worker_id}")
+        paths = shard_paths(Path(dataset))
+        self._metadata: dict[Path, pq.FileMetaData] = {}
+        if len(paths) >= num_workers:
+            # (path, None): a whole shard
+            self.units: list[tuple[Path, int | None]] = [(p, None) for p in paths[worker_id::num_workers]]
+        else:
+            self._metadata = {p: pq.read_metadata(p) for p in paths}
+            units = [(p, rg) for p in paths for rg in range(self._metadata[p].num_row_groups)]
+            if len(units) < num_workers:
+                raise ValueError(
+                    f"num_workers={num_workers} exceeds the {len(paths)} shards / {len(units)} row groups of {dataset}"
+                )
+            self.units = units[worker_id::num_workers]
+        self.batch_size = batch_size
+        self.columns = columns
+        self.shuffle = shuffle
+        self.shuffle_buffer = shuffle_buffer if shuffle else 0
+        self.prefetch = max(0, prefetch)
+        self.threads = max(1, threads)
+        self.drop_last = drop_last
+        self._rng = np.random.default_rng(seed + worker_id)
+        self.symbols = symbols if symbols is not None else dataset_symbols(Path(dataset))
+        self._symbol_set = pa.array(self.symbols, type=pa.string())
+
+    def _column(self, name: str, col: pa.Array, nullable_ints: set[str]) -> np.ndarray:
+        t = col.type
+        if pa.types.is_timestamp(t):
+            ns = col.cast(pa.timestamp("ns", tz=t.tz)).cast(pa.int64())
+            return ns.fill_null(np.iinfo(np.int64).min).to_numpy()
+        if name == "symbol":
+            if pa.types.is_dictionary(t):
+                col = col.cast(t.value_type)
+            codes = pc.index_in(col.cast(pa.string()), value_set=self._symbol_set)
+            if codes.null_count:
+                raise ValueError(f"symbol column holds values outside the {len(self.symbols)}-symbol vocabulary")
+            return codes.to_numpy().astype(np.int16)
+        if name in nullable_ints or (col.null_count and (pa.types.is_integer(t) or pa.types.is_boolean(t))):
+            return col.cast(pa.float64()).to_numpy(zero_copy_only=False)
+        return col.to_numpy(zero_copy_only=False)
+
+    def _read(self, unit: tuple[Path, int | None]) -> dict[str, np.ndarray]:
+        path, rg = unit
+        if rg is None:
+            table = pq.read_table(path, columns=self.columns)
+        else:
+            table = pq.ParquetFile(path, metadata=self._metadata[path]).read_row_group(rg, columns=self.columns)
+        nullable_ints = _nullable_int_cols(table.schema)
+        return {
+            name: self._column(name, col.combine_chunks(), nullable_ints)
+            for name, col in zip(table.column_names, table.columns)
+        }
+
+    def _shards(self) -> Iterator[dict[str, np.ndarray]]:
+        order = list(self.units)
+        if self.shuffle:
+            order = [order[i] for i in self._rng.permutation(len(order))]
+        if self.prefetch == 0:
+            for unit in order:
+                yield self._read(unit)
+            return
+        with ThreadPoolExecutor(max_workers=self.threads) as pool:
+            pending: deque = deque()
+            it = iter(order)
+            for unit in it:
+                pending.append(pool.submit(self._read, unit))
+                if len(pending) >= self.prefetch:
+                    break
+            while pending:
+                yield pending.popleft().result()
+                nxt = next(it, None)
+                if nxt is not None:
+                    pending.append(pool.submit(self._read, nxt))
+
+    def __iter__(self) -> Iterator[dict[str, np.ndarray]]:
+        buf: dict[str, np.ndarray] | None = None
+        for chunk in self._shards():
+            buf = chunk if buf is None else {c: np.concatenate([buf[c], chunk[c]]) for c in chunk}
+            n = len(next(iter(buf.values()))) if buf else 0
+            if n < max(self.batch_size, self.shuffle_buffer):
+                continue
+            if self.shuffle:
+                perm = self._rng.permutation(n)
+                buf = {c: v[perm] for c, v in buf.items()}
+            # emit whole batches; the remainder (plus half the shuffle buffer) mixes with the next shard
+            n_out = (n - (self.shuffle_buffer // 2 if self.shuffle else 0)) // self.batch_size * self.batch_size
+            for i in range(0, n_out, self.batch_size):
+                yield {c: v[i : i + self.batch_size] for c, v in buf.items()}
+            buf = {c: v[n_out:] for c, v in buf.items()}
+
+        if buf:
+            n = len(next(iter(buf.values())))
+            if self.shuffle and n:
+                perm = self._rng.permutation(n)
+                buf = {c: v[perm] for c, v in buf.items()}
+            for i in range(0, n, self.batch_size):
+                if self.drop_last and i + self.batch_size > n:
+                    break
+                yield {c: v[i : i + self.batch_size] for c, v in buf.items()}
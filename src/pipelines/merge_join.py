@@ -0,0 +1,113 @@
+from __future__ import annotations
+
+import logging
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+
+def strictly_increasing(keys: np.ndarray) -> bool:
+    """
+    The partition invariant: keys sorted ascending without duplicates.
+    """
+    return bool(np.all(keys[1:] > keys[:-1]))
+
+
+def hash_join_indices(left: np.ndarray, right: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Inner-join positions (il, ir) of two key arrays of any order, duplicates included
+    (one pair per matching combination), sorted by (il, ir).
+    """
+    m = pd.DataFrame({"k": left, "il": np.arange(len(left))}).merge(
+        pd.DataFrame({"k": right, "ir": np.arange(len(right))}), on="k", how="inner", sort=False
+    )
+    il, ir = m["il"].to_numpy(), m["ir"].to_numpy()
+    order = np.lexsort((ir, il))
+    return il[order], ir[order]
+
+
+def _merge_sorted(left: np.ndarray, right: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Join of two strictly increasing key arrays. A stable argsort of left + right sees two
+    sorted runs, which timsort combines with a single linear merge; equal neighbours in the
+    merged order are the matches (left first, by stability).
+    """
+    keys = np.concatenate([left, right])
+    order = np.argsort(keys, kind="stable")
+    merged = keys[order]
+    eq = np.flatnonzero(merged[1:] == merged[:-1])
+    return order[eq], order[eq + 1] - len(left)
+
+
+def merge_join_indices(left: np.ndarray, right: np.ndarray, what: str = "") -> tuple[np.ndarray, np.ndarray]:
+    """
+    Inner-join positions (il, ir) of two int64 key arrays (e.g. ns timestamps), in left order.
+
+    When both sides are strictly increasing (how partitions are written), they are combined
+    with one linear merge (_merge_sorted), without hashing. Otherwise the invariant does not
+    hold for this input and it falls back to hash_join_indices (logged, with `what` naming
+    the input).
+    """
+    left = np.asarray(left)
+    right = np.asarray(right)
+    if not (strictly_increasing(left) and strictly_increasing(right)):
+        logger.warning("Join keys %snot sorted/unique; falling back to hash join", f"of {what} " if what else "")
+        return hash_join_indices(left, right)
+    return _merge_sorted(left, right)
+
+
+def _level_ranks(xl: pd.Index, yl: pd.Index) -> tuple[np.ndarray, np.ndarray, int]:
+    """
+    Positions of two index levels' values in their sorted union, and its size.
+    """
+    union = xl.union(yl)
+    return union.get_indexer(xl), union.get_indexer(yl), len(union)
+
+
+def merge_join_frames(X: pd.DataFrame, y: pd.DataFrame) -> pd.DataFrame:
+    """
+    X.join(y, how="inner") for frames indexed by [timestamp_utc, symbol], as a sort-merge.
+
+    The sort order of both sides is validated first:
+      (timestamp, symbol) order  the index is lexsorted and unique (pandas' cached checks),
+                                 and X.join already runs pandas' monotonic merge join on it
+      (symbol, timestamp) order  as loaded from symbol/date partitions; pandas would hash
+                                 join. Every row gets an int64 key from the ranks of its
+                                 symbol and timestamp in the union of both frames' index
+                                 levels (computed on the small levels), and if the keys are
+                                 strictly increasing on both sides they are merged here in one
+                                 linear pass (rows in X's order)
+    Otherwise (either side unsorted, missing keys or duplicates) it falls back to the hash
+    join X.join (logged).
+    """
+    overlap = X.columns.intersection(y.columns)
+    if len(overlap):
+        raise ValueError(f"columns overlap but no suffix specified: {overlap}")
+
+    if X.index.names == y.index.names == ["timestamp_utc", "symbol"] and all(
+        idx.is_monotonic_increasing and idx.is_unique for idx in (X.index, y.index)
+    ):
+        # (timestamp, symbol) order: pandas joins lexsorted unique indexes by a monotonic merge
+        return X.join(y, how="inner")
+
+    ti, si = X.index.names.index("timestamp_utc"), X.index.names.index("symbol")
+    tj, sj = y.index.names.index("timestamp_utc"), y.index.names.index("symbol")
+    xt_rank, yt_rank, n_t = _level_ranks(
+        pd.DatetimeIndex(X.index.levels[ti]).as_unit("ns"), pd.DatetimeIndex(y.index.levels[tj]).as_unit("ns")
+    )
+    xs_rank, ys_rank, n_s = _level_ranks(X.index.levels[si], y.index.levels[sj])
+
+    codes = [np.asarray(c) for c in (X.index.codes[ti], X.index.codes[si], y.index.codes[tj], y.index.codes[sj])]
+    if all((c >= 0).all() for c in codes):
+        xt, xs, yt, ys = (r.astype(np.int64, copy=False)[c] for r, c in zip((xt_rank, xs_rank, yt_rank, ys_rank), codes))
+        kx, ky = xs * n_t + xt, ys * n_t + yt
+        if strictly_increasing(kx) and strictly_increasing(ky):
+            ix, iy = _merge_sorted(kx, ky)
+            left = X.iloc[ix]
+            right = y.iloc[iy].set_axis(left.index, axis=0)
+            return pd.concat([left, right], axis=1)
+
+    logger.warning("Join inputs not sorted by (timestamp, symbol) or (symbol, timestamp) with unique keys; hash join")
+    return X.join(y, how="inner")
@@ -0,0 +1,254 @@
+from __future__ import annotations
+
+import json
+import logging
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from src.pipelines.dataset_loader import shard_paths
+
+logger = logging.getLogger(__name__)
+
+SPLIT_SCHEMES = ("purged_kfold", "walk_forward")
+DAY_NS = 86_400 * 10**9
+
+Folds = list[tuple[np.ndarray, np.ndarray]]
+
+
+def _ts_ns(col: pa.ChunkedArray) -> np.ndarray:
+    """
+    int64 ns values of a timestamp column; nulls become the int64 minimum.
+    """
+    col = col.combine_chunks()
+    out = col.cast(pa.timestamp("ns", tz=col.type.tz)).cast(pa.int64())
+    return out.fill_null(np.iinfo(np.int64).min).to_numpy()
+
+
+def load_split_times(
+    dataset: Path,
+    t1_col: str = "tb_t1",
+    horizon: str | pd.Timedelta | None = None,
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    (t0, t1) int64 ns per dataset row, in the dataset's row order (shards in manifest order):
+      t0  timestamp_utc
+      t1  label end time: the later of `t1_col` (e.g. tb_t1 from the triple barrier) and
+          t0 + horizon, from whichever of the two is available per row
+    Only these two columns are read.
+
+    Pass the longest target horizon (e.g. "390min" when fwd_ret_390m is trained on) so that
+    purging covers it too: tb_t1 alone ends at the barrier touch. A dataset without `t1_col`
+    (e.g. a fwd_ret_* projection) needs `horizon`, or nothing would be purged.
+    """
+    has_t1 = t1_col in pq.read_schema(shard_paths(dataset)[0]).names
+    if not has_t1 and horizon is None:
+        raise ValueError(f"dataset has no {t1_col} column; pass horizon (the label length) to purge on")
+    cols = ["timestamp_utc", t1_col] if has_t1 else ["timestamp_utc"]
+    t0s, t1s = [], []
+    for p in shard_paths(dataset):
+        tbl = pq.read_table(p, columns=cols)
+        t0 = _ts_ns(tbl.column("timestamp_utc"))
+        t0s.append(t0)
+        t1s.append(_ts_ns(tbl.column(t1_col)) if has_t1 else np.full_like(t0, np.iinfo(np.int64).min))
+    t0 = np.concatenate(t0s) if t0s else np.zeros(0, dtype=np.int64)
+    t1 = np.concatenate(t1s) if t1s else np.zeros(0, dtype=np.int64)
+
+    # rows without t1_col (or with it null) end at t0 + horizon; t0 itself when no horizon
+    h = pd.Timedelta(horizon or 0).value
+    t1 = np.maximum(t1, t0 + h)
+    if not has_t1:
+        logger.info("Split times: no %s column, label end = t0 + %s", t1_col, pd.Timedelta(h))
+    return t0, t1
+
+
+def _day_blocks(t0: np.ndarray, n_blocks: int) -> np.ndarray:
+    """
+    Block id (0..n_blocks-1) per row: the UTC days present are cut into n_blocks contiguous
+    runs of (almost) equal day count, so no day straddles two blocks.
+    """
+    day = t0 // DAY_NS
+    days = np.unique(day)
+    if len(days) < n_blocks:
+        raise ValueError(f"need at least {n_blocks} days for {n_blocks} blocks, dataset has {len(days)}")
+    bounds = [b[0] for b in np.array_split(days, n_blocks)]
+    return np.searchsorted(np.asarray(bounds), day, side="right") - 1
+
+
+def _index_dtype(n: int):
+    return np.uint32 if n < 2**32 else np.int64
+
+
+def purged_kfold(
+    t0: np.ndarray,
+    t1: np.ndarray,
+    n_splits: int = 5,
+    embargo: str | pd.Timedelta = "0min",
+) -> Folds:
+    """
+    Purged k-fold over contiguous day blocks (test folds in time order).
+
+    For test block [a, b] (a = first test t0, b = last test t1) a training row is
+      purged    when its label interval overlaps the test span: t0 <= b and t1 >= a
+      embargoed when it starts within `embargo` after the test span: b < t0 <= b + embargo
+    Returns [(train_rows, test_rows)] of sorted row indices, usable as sklearn `cv=`.
+    """
+    blk = _day_blocks(t0, n_splits)
+    emb = pd.Timedelta(embargo).value
+    dt = _index_dtype(len(t0))
+    folds: Folds = []
+    for k in range(n_splits):
+        test = blk == k
+        a, b = t0[test].min(), t1[test].max()
+        drop = test | ((t0 <= b) & (t1 >= a)) | ((t0 > b) & (t0 <= b + emb))
+        folds.append((np.flatnonzero(~drop).astype(dt), np.flatnonzero(test).astype(dt)))
+    return folds
+
+
+def walk_forward(
+    t0: np.ndarray,
+    t1: np.ndarray,
+    n_splits: int = 5,
+    max_train_blocks: int | None = None,
+    embargo: str | pd.Timedelta = "0min",
+) -> Folds:
+    """
+    Walk-forward over n_splits + 1 contiguous day blocks: fold k tests on block k + 1 and
+    trains on the blocks before it (all of them, or the last max_train_blocks).
+
+    Training rows whose label ends at or after the test start (t1 >= a) are purged, and rows
+    starting within `embargo` before it (t0 >= a - embargo) are embargoed.
+    """
+    blk = _day_blocks(t0, n_splits + 1)
+    emb = pd.Timedelta(embargo).value
+    dt = _index_dtype(len(t0))
+    folds: Folds = []
+    for k in range(1, n_splits + 1):
+        test = blk == k
+        a = t0[test].min()
+        first = 0 if max_train_blocks is None else max(0, k - max_train_blocks)
+        train = (blk >= first) & (blk < k) & (t1 < a) & (t0 < a - emb)
+        folds.append((np.flatnonzero(train).astype(dt), np.flatnonzero(test).astype(dt)))
+    return folds
+
+
+def _tag(dataset: Path) -> str:
+    return dataset.name[: -len(".parquet")] if dataset.suffix == ".parquet" else dataset.name
+
+
+def splits_path(dataset: Path, scheme: str) -> Path:
+    """
+    {tag}.{scheme}.splits.npz next to {tag}.parquet or the {tag}/ shard directory.
+    """
+    dataset = Path(dataset)
+    return dataset.parent / f"{_tag(dataset)}.{scheme}.splits.npz"
+
+
+def save_splits(dataset: Path, folds: Folds, scheme: str, params: dict, n_rows: int) -> Path:
+    """
+    Writes folds as train_K / test_K arrays (compressed) plus a JSON 'meta' entry with the
+    scheme, params, row count and the dataset's content_sha1, to check splits against it.
+    """
+    dataset = Path(dataset)
+    ds_meta_path = dataset.parent / f"{_tag(dataset)}.metadata.json"
+    ds_meta = json.loads(ds_meta_path.read_text()) if ds_meta_path.exists() else {}
+    meta = {
+        "scheme": scheme,
+        "params": params,
+        "n_rows": n_rows,
+        "n_folds": len(folds),
+        "content_sha1": ds_meta.get("content_sha1", ""),
+    }
+    arrays = {}
+    for k, (train, test) in enumerate(folds):
+        arrays[f"train_{k}"] = train
+        arrays[f"test_{k}"] = test
+    out = splits_path(dataset, scheme)
+    tmp = out.with_name(out.name + ".tmp.npz")
+    np.savez_compressed(tmp, meta=np.array(json.dumps(meta)), **arrays)
+    tmp.replace(out)
+    return out
+
+
+def load_splits(path: Path) -> tuple[Folds, dict]:
+    with np.load(path) as z:
+        meta = json.loads(str(z["meta"]))
+        folds = [(z[f"train_{k}"], z[f"test_{k}"]) for k in range(meta["n_folds"])]
+    return folds, meta
+
+
+def make_splits(
+    dataset: Path,
+    scheme: str = "purged_kfold",
+    n_splits: int = 5,
+    embargo: str = "0min",
+    t1_col: str = "tb_t1",
+    horizon: str | None = None,
+    max_train_blocks: int | None = None,
+) -> Path:
+    """
+    Computes one of SPLIT_SCHEMES for a built dataset (file or shard directory) and stores
+    it beside the dataset (splits_path). Only timestamp_utc and t1_col are read; label
+    end times are the later of t1_col and t0 + horizon (see load_split_times).
+    """
+    if scheme not in SPLIT_SCHEMES:
+        raise ValueError(f"scheme must be one of {SPLIT_SCHEMES}, got {scheme!r}")
+    t0, t1 = load_split_times(dataset, t1_col=t1_col, horizon=horizon)
+    params = {"n_splits": n_splits, "embargo": str(embargo), "t1_col": t1_col, "horizon": horizon}
+    if scheme == "purged_kfold":
+        folds = purged_kfold(t0, t1, n_splits=n_splits, embargo=embargo)
+    else:
+        params["max_train_blocks"] = max_train_blocks
+        folds = walk_forward(t0, t1, n_splits=n_splits, max_train_blocks=max_train_blocks, embargo=embargo)
+    for k, (train, test) in enumerate(folds):
+        logger.info("Split %s fold %d: train=%d test=%d", scheme, k, len(train), len(test))
+    return save_splits(dataset, folds, scheme, params, n_rows=len(t0))
+
+
+def row_runs(rows: np.ndarray) -> np.ndarray:
+    """
+    Sorted row indices -> (k, 2) array of contiguous [start, stop) runs, so a fold can be
+    walked as slices (views) of memmapped arrays instead of a fancy-indexed copy.
+    """
+    rows = np.asarray(rows, dtype=np.int64)
+    if rows.size == 0:
+        return np.zeros((0, 2), dtype=np.int64)
+    brk = np.flatnonzero(np.diff(rows) != 1) + 1
+    starts = rows[np.r_[0, brk]]
+    stops = rows[np.r_[brk - 1, rows.size - 1]] + 1
+    return np.column_stack([starts, stops])
+
+
+def iter_views(arrays: dict[str, np.ndarray], rows: np.ndarray):
+    """
+    Yields {name: arr[start:stop]} views for each contiguous run of `rows`, e.g. over the
+    X/y arrays of export_memmap opened with mmap_mode="r".
+    """
+    for a, b in row_runs(rows):
+        yield {k: v[a:b] for k, v in arrays.items()}
+
+
+def read_rows(dataset: Path, rows: np.ndarray, columns: list[str] | None = None) -> pa.Table:
+    """
+    Rows (global, sorted) of a dataset as one Arrow table, reading only the row groups that
+    contain them (offsets from the parquet footers) and taking the rows out of each.
+    """
+    rows = np.asarray(rows, dtype=np.int64)
+    parts = []
+    offset = 0
+    for p in shard_paths(dataset):
+        pf = pq.ParquetFile(p)
+        for rg in range(pf.num_row_groups):
+            n = pf.metadata.row_group(rg).num_rows
+            lo, hi = np.searchsorted(rows, [offset, offset + n])
+            if hi > lo:
+                tbl = pf.read_row_group(rg, columns=columns)
+                parts.append(tbl if hi - lo == n else tbl.take(pa.array(rows[lo:hi] - offset)))
+            offset += n
+    if not parts:
+        empty = pq.read_schema(shard_paths(dataset)[0]).empty_table()
+        return empty.select(columns) if columns else empty
+    return pa.concat_tables(parts)
@@ -5,11 +5,30 @@ from pathlib import Path
 
 import pandas as pd
 
+from src.utils.fingerprint import VOLATILE_COLS, record_bars_content
+
 
 def _ensure_dir(p: Path) -> None:
     p.mkdir(parents=True, exist_ok=True)
 
 
+def _same_bars(old: pd.DataFrame, new: pd.DataFrame) -> bool:
+    """
+    True when two partitions hold the same bars, ignoring VOLATILE_COLS.
+    """
+    a = old.drop(columns=[c for c in VOLATILE_COLS if c in old.columns]).reset_index(drop=True)
+    b = new.drop(columns=[c for c in VOLATILE_COLS if c in new.columns]).reset_index(drop=True)
+    if sorted(a.columns) != sorted(b.columns) or len(a) != len(b):
+        return False
+    b = b[list(a.columns)]
+    for c in a.columns:
+        # parquet round trips may change the datetime unit, not the instants
+        if isinstance(a[c].dtype, pd.DatetimeTZDtype) and isinstance(b[c].dtype, pd.DatetimeTZDtype):
+            a[c] = a[c].dt.as_unit("ns")
+            b[c] = b[c].dt.as_unit("ns")
+    return a.equals(b)
+
+
 def write_daily_partitioned(
     df: pd.DataFrame,
     root_dir: Path,
@@ -21,7 +40,10 @@ def write_daily_partitioned(
     Writes df into Parquet partitions:
       root_dir / symbol=XYZ / date=YYYY-MM-DD / bars.parquet
 
-    If file exists, merges + de-dupes by timestamp.
+    If file exists, merges + de-dupes by timestamp. A partition whose bars are unchanged
+    (only VOLATILE_COLS such as fetched_at_utc differ) is not rewritten, so its content
+    hash and everything derived from it stay valid. The content hash of every written
+    partition is recorded in its sidecar (record_bars_content).
     Uses atomic write (temp file + os.replace) to avoid partial parquet corruption.
     Returns list of paths written.
     """
@@ -54,6 +76,7 @@ def write_daily_partitioned(
 
         new_chunk = g.drop(columns=["__date"])
 
+        old = None
         if out.exists():
             old = pd.read_parquet(out)
 
@@ -71,11 +94,15 @@ def write_daily_partitioned(
         merged = merged.dropna(subset=[ts_col])
         merged = merged.sort_values(ts_col).drop_duplicates(subset=[ts_col], keep="last")
 
+        if old is not None and _same_bars(old.sort_values(ts_col).drop_duplicates(subset=[ts_col], keep="last"), merged):
+            continue
+
         # Atomic write
         if tmp.exists():
             tmp.unlink()
         merged.to_parquet(tmp, index=False)
         os.replace(tmp, out)
+        record_bars_content(out)
 
         written.append(out)
 
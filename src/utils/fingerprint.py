@@ -0,0 +1,244 @@
+from __future__ import annotations
+
+import hashlib
+import importlib
+import json
+from dataclasses import dataclass, asdict, is_dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Any
+
+import pandas as pd
+
+FINGERPRINT_FILE = "_fingerprint.json"
+CONTENT_STAGE = "content"  # sidecar record of a bars partition's own content hash
+
+# Bookkeeping columns left out of bars content hashes (rewritten by every refetch)
+VOLATILE_COLS = ("fetched_at_utc",)
+
+
+def _sha1_bytes(b: bytes) -> str:
+    return hashlib.sha1(b).hexdigest()
+
+
+def _sha1_json(obj: Any) -> str:
+    return _sha1_bytes(json.dumps(obj, sort_keys=True, default=str).encode("utf-8"))
+
+
+@lru_cache(maxsize=65536)
+def _file_sha1_cached(path: str, size: int, mtime_ns: int) -> str:
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def file_sha1(path: Path) -> str:
+    """
+    Content hash of a file. Memoized per (path, size, mtime) so the same bars
+    partition read as lookback by several day builds is only hashed once.
+    """
+    st = path.stat()
+    return _file_sha1_cached(str(path), st.st_size, st.st_mtime_ns)
+
+
+def _hash_bars_file(path: Path) -> str:
+    df = pd.read_parquet(path)
+    df = df.drop(columns=[c for c in VOLATILE_COLS if c in df.columns])
+    for c in df.columns:
+        if isinstance(df[c].dtype, pd.DatetimeTZDtype) or pd.api.types.is_datetime64_dtype(df[c]):
+            df[c] = df[c].dt.as_unit("ns")
+    h = hashlib.sha1(json.dumps([[str(c), str(df[c].dtype)] for c in df.columns]).encode("utf-8"))
+    h.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return h.hexdigest()
+
+
+def record_bars_content(path: Path) -> str:
+    """
+    Hashes a bars partition file (see bars_content_sha1) and records the hash, with the
+    file's size and mtime, in the partition's sidecar. Called by the bars writers right
+    after a write, so planning never has to decode the file again.
+    """
+    st = path.stat()
+    sha1 = _hash_bars_file(path)
+    try:
+        _write_sidecar(path.parent, CONTENT_STAGE, {"sha1": sha1, "size": st.st_size, "mtime_ns": st.st_mtime_ns})
+    except OSError:
+        pass  # read-only store: hashed again next time
+    return sha1
+
+
+@lru_cache(maxsize=65536)
+def _bars_content_sha1_cached(path: str, size: int, mtime_ns: int) -> str:
+    rec = read_fingerprint(Path(path).parent, CONTENT_STAGE)
+    if rec is not None and rec.get("size") == size and rec.get("mtime_ns") == mtime_ns and rec.get("sha1"):
+        return rec["sha1"]
+    return record_bars_content(Path(path))
+
+
+def bars_content_sha1(path: Path) -> str:
+    """
+    Content hash of a bars partition over its columns and values, without VOLATILE_COLS, so
+    a refetch that only stamps a new fetched_at_utc does not invalidate derived partitions.
+
+    Read from the partition sidecar when it was recorded for the file as it is now (same
+    size and mtime); otherwise (older stores, out-of-band writes) the file is hashed once
+    and the record is written. Memoized like file_sha1.
+    """
+    st = path.stat()
+    return _bars_content_sha1_cached(str(path), st.st_size, st.st_mtime_ns)
+
+
+def partition_content_key(path: Path, stages: tuple[str, ...]) -> str:
+    """
+    Content key of a derived partition file: the `stages` records of its sidecar (digest,
+    plus the build id a stage stamps on every write), which change whenever the file is
+    rewritten by a stage. Falls back to file_sha1 when the sidecar is missing, holds none of
+    `stages`, or is older than the file (rewritten out of band).
+    """
+    side = path.parent / FINGERPRINT_FILE
+    try:
+        obj = json.loads(side.read_text()) if side.stat().st_mtime_ns >= path.stat().st_mtime_ns else {}
+    except (OSError, ValueError):
+        obj = {}
+    recs = {}
+    for stage in stages:
+        rec = obj.get(stage) if isinstance(obj, dict) else None
+        if isinstance(rec, dict) and rec.get("digest"):
+            recs[stage] = {k: rec[k] for k in ("digest", "build") if k in rec}
+    if not recs:
+        return file_sha1(path)
+    return _sha1_json(recs)
+
+
+def find_metadata_by_digest(meta_dir: Path, digest: str) -> list[tuple[str, dict]]:
+    """
+    (tag, metadata) of every {tag}.metadata.json in meta_dir whose 'content_sha1' is `digest`.
+    """
+    out = []
+    for p in sorted(meta_dir.glob("*.metadata.json")):
+        try:
+            obj = json.loads(p.read_text())
+        except (OSError, ValueError):
+            continue
+        if isinstance(obj, dict) and obj.get("content_sha1") == digest:
+            out.append((p.name[: -len(".metadata.json")], obj))
+    return out
+
+
+def partition_inputs(paths: list[Path]) -> dict[str, str]:
+    """
+    {partition dir name (e.g. 'date=2024-01-02') -> bars_content_sha1} for upstream bars
+    partition files.
+    """
+    return {p.parent.name: bars_content_sha1(p) for p in paths}
+
+
+@lru_cache(maxsize=None)
+def code_version(*module_names: str) -> str:
+    """
+    Hash of the source files of the given modules (the code that shapes a derived partition).
+    """
+    h = hashlib.sha1()
+    for name in module_names:
+        mod = importlib.import_module(name)
+        h.update(name.encode("utf-8"))
+        h.update(Path(mod.__file__).read_bytes())
+    return h.hexdigest()
+
+
+def config_sha1(cfg: Any, **extra: Any) -> str:
+    obj = asdict(cfg) if is_dataclass(cfg) else cfg
+    return _sha1_json({"cfg": obj, "extra": extra})
+
+
+@dataclass(frozen=True)
+class PartitionFingerprint:
+    """
+    Inputs of one derived (symbol, date) partition:
+      inputs: upstream partition key -> content sha1 (incl. lookback/lookahead partitions)
+      config: sha1 of the stage config
+      code:   sha1 of the stage source
+    """
+    inputs: dict[str, str]
+    config: str
+    code: str
+
+    @property
+    def digest(self) -> str:
+        return _sha1_json({"inputs": self.inputs, "config": self.config, "code": self.code})
+
+    def to_dict(self) -> dict:
+        return {"digest": self.digest, "inputs": self.inputs, "config": self.config, "code": self.code}
+
+
+def read_fingerprint(part_dir: Path, stage: str) -> dict | None:
+    p = part_dir / FINGERPRINT_FILE
+    if not p.exists():
+        return None
+    try:
+        obj = json.loads(p.read_text())
+    except (OSError, ValueError):
+        return None
+    rec = obj.get(stage)
+    return rec if isinstance(rec, dict) else None
+
+
+def write_fingerprint(part_dir: Path, stage: str, fp: PartitionFingerprint, **info: Any) -> None:
+    """
+    Records `fp` under `stage` in the partition sidecar (other stages are kept).
+    """
+    _write_sidecar(part_dir, stage, {**fp.to_dict(), **info})
+
+
+def _write_sidecar(part_dir: Path, stage: str, rec: dict) -> None:
+    part_dir.mkdir(parents=True, exist_ok=True)
+    p = part_dir / FINGERPRINT_FILE
+    obj: dict = {}
+    if p.exists():
+        try:
+            obj = json.loads(p.read_text())
+        except (OSError, ValueError):
+            obj = {}
+    obj[stage] = rec
+    tmp = p.with_suffix(p.suffix + ".tmp")
+    tmp.write_text(json.dumps(obj, indent=2, sort_keys=True))
+    tmp.replace(p)
+
+
+def rebuild_reason(old: dict | None, new: PartitionFingerprint, output_exists: bool) -> str | None:
+    """
+    Returns why a partition must be rebuilt, or None when it is up to date.
+    """
+    if old is None:
+        return "no fingerprint" if output_exists else "new"
+    if old.get("digest") == new.digest:
+        if output_exists or old.get("rows", 1) == 0:
+            return None
+        return "output missing"
+
+    reasons = []
+    old_inputs = old.get("inputs") or {}
+    changed = sorted(k for k in new.inputs if k in old_inputs and old_inputs[k] != new.inputs[k])
+    added = sorted(k for k in new.inputs if k not in old_inputs)
+    removed = sorted(k for k in old_inputs if k not in new.inputs)
+    if changed:
+        reasons.append("inputs changed: " + ",".join(changed))
+    if added:
+        reasons.append("inputs added: " + ",".join(added))
+    if removed:
+        reasons.append("inputs removed: " + ",".join(removed))
+    if old.get("config") != new.config:
+        reasons.append("config changed")
+    if old.get("code") != new.code:
+        reasons.append("code changed")
+    return "; ".join(reasons) or "fingerprint changed"
+
+
+@dataclass(frozen=True)
+class PartitionTask:
+    symbol: str
+    day: str
+    reason: str
+    fingerprint: PartitionFingerprint
@@ -1,6 +1,9 @@
 from __future__ import annotations
 
+import os
+import shutil
 from pathlib import Path
+
 import pandas as pd
 
 
@@ -9,3 +12,17 @@ def atomic_write_parquet(df: pd.DataFrame, out_path: Path) -> None:
     tmp = out_path.with_suffix(out_path.suffix + ".tmp")
     df.to_parquet(tmp, index=False)  # store keys as COLUMNS (scales better)
     tmp.replace(out_path)
+
+
+def link_or_copy(src: Path, dst: Path) -> None:
+    """
+    Hard-links src to dst (copies across filesystems). Safe for our outputs because they
+    are only ever replaced via tmp + rename, never modified in place.
+    """
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    if dst.exists():
+        dst.unlink()
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)